@@ -0,0 +1,8 @@
+"""
+LEWA backend
+Settings are read from the environment when each module is imported, so
+backend/.env is loaded here, once, before any of them.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
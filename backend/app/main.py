@@ -1,29 +1,109 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Import routers
-from app.routers import chemistry, economics, geography, religious_studies, french, research, mathematics, english, physics, biology, history, literature, messenger
+from app.routers import analytics, chat, corpus, research, messenger, solver, subjects
+from app.services import metrics
+from app.services.admission import AdmissionRejected
+from app.services.analytics import expression_cache
+from app.services.announcements import announcement_store
+from app.services.answers import response_cache
+from app.services.compression import CompressionMiddleware
+from app.services.gemini import gemini_service
+from app.services.http_pools import http_pools
+from app.services.rate_limit import RateLimitMiddleware, rate_limiter
+from app.services.retrieval import retriever
+from app.services.semantic_cache import semantic_cache
+from app.services.sessions import session_store
+from app.services.solver import solver as solver_service
+from app.services.streams import stream_registry
+from app.services.subjects import subject_registry
+from app.services.topic_classifier import topic_guard
+
+# Browser origins allowed to call the API, comma-separated ("*" for any)
+CORS_ORIGINS = [
+    origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000").split(",")
+    if origin.strip()
+]
+
+metrics.watch_caches(
+    answers=response_cache,
+    semantic=semantic_cache,
+    research=research.research_cache,
+    messenger=messenger.messenger_cache,
+    announcements=announcement_store,
+    expressions=expression_cache,
+    solver=solver_service,
+)
+metrics.watch_llm(gemini_service)
+metrics.watch_sessions(session_store)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    topic_guard.warm()
+    # Connections to SerpApi and Groq are up before the first question needs them
+    http_pools.start()
+    solver_service.warm()
+    announcement_store.start()
+    snapshots = asyncio.create_task(metrics.registry.snapshot_loop()) if metrics.METRICS_MULTIPROC_DIR else None
+    yield
+    solver_service.close()
+    await announcement_store.stop()
+    if snapshots:
+        snapshots.cancel()
+    if gemini_service.backend:
+        await gemini_service.backend.aclose()
+    # Release pooled upstream connections on shutdown
+    await http_pools.aclose()
+
 
 app = FastAPI(
     title="LEWA - AI Tutor",
     description="AI-powered educational assistant for GCE OL & AL students",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Per-client token buckets; inside CORS so browsers can read 429s and the RateLimit headers
+app.add_middleware(RateLimitMiddleware)
 # Add CORS middleware to allow frontend requests
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Stream-Id", "X-Session-Id", "Retry-After", "RateLimit-Limit", "RateLimit-Remaining",
+                    "RateLimit-Reset", "RateLimit-Policy"],
 )
+# Compress inside the metrics middleware, so latency covers compression too
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Saturated LLM: fail fast and tell the client when to come back
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Service busy", "detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "service": "LEWA Backend"}
+    return {"status": "ok", "service": "LEWA Backend", "llm": gemini_service.stats(), "sessions": session_store.stats(), "subjects": subject_registry.stats(), "retrieval": retriever.stats(), "streams": stream_registry.stats(), "http": http_pools.stats(), "rate_limits": rate_limiter.stats()}
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 # Root endpoint
 @app.get("/")
@@ -32,33 +112,24 @@ async def root():
         "message": "Welcome to LEWA - AI Tutor API",
         "docs": "/docs",
         "health": "/health",
+        "metrics": "/metrics",
         "endpoints": {
-            "geography": "/api/geography",
-            "chemistry": "/api/chemistry",
-            "economics": "/api/economics",
-            "religious_studies": "/api/religious_studies",
-            "french": "/api/french",
-            "mathematics": "/api/mathematics",
-            "english": "/api/english",
-            "physics": "/api/physics",
-            "biology": "/api/biology",
-            "history": "/api/history",
-            "literature": "/api/literature",
-            "research": "/api/research"
+            **{subject.slug: f"/api/{subject.slug}" for subject in subject_registry.all()},
+            "research": "/api/research",
+            "messenger": "/api/messenger",
+            "search": "/api/search",
+            "analytics": "/api/analytics",
+            "solve": "/api/solve",
+            "chat": "/api/chat",
+            "subjects": "/api/subjects"
         }
     }
 
-# Include subject routers
-app.include_router(geography.router, prefix="/api", tags=["Geography"])
-app.include_router(chemistry.router, prefix="/api", tags=["Chemistry"])
-app.include_router(economics.router, prefix="/api", tags=["Economics"])
-app.include_router(religious_studies.router, prefix="/api", tags=["Religious Studies"])
-app.include_router(french.router, prefix="/api", tags=["French"])
-app.include_router(mathematics.router, prefix="/api", tags=["Mathematics"])
-app.include_router(english.router, prefix="/api", tags=["English"])
-app.include_router(physics.router, prefix="/api", tags=["Physics"])
-app.include_router(biology.router, prefix="/api", tags=["Biology"])
-app.include_router(history.router, prefix="/api", tags=["History"])
-app.include_router(literature.router, prefix="/api", tags=["Literature"])
+# Tool routers go first: the generic subject route would otherwise match their paths
 app.include_router(research.router, prefix="/api", tags=["Research"])
-app.include_router(messenger.router, prefix="/api", tags=["Messenger"])
\ No newline at end of file
+app.include_router(messenger.router, prefix="/api", tags=["Messenger"])
+app.include_router(corpus.router, prefix="/api", tags=["Search"])
+app.include_router(analytics.router, prefix="/api", tags=["Analytics"])
+app.include_router(solver.router, prefix="/api", tags=["Solver"])
+app.include_router(chat.router, prefix="/api", tags=["Chat"])
+app.include_router(subjects.router, prefix="/api", tags=["Subjects"])
@@ -0,0 +1,95 @@
+"""
+Analytics Router
+Backend for the "Analytics - Math visualizations" tool: plots and analyses
+a function of one variable typed by the student
+"""
+import asyncio
+import math
+import time
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import BaseModel, Field
+
+from app.services.analytics import (
+    ANALYTICS_MAX_POINTS, ANALYTICS_MAX_WIDTH, ExpressionError, analyse, expression_cache, pack_points, plot_json,
+)
+
+router = APIRouter()
+
+
+class AnalyticsRequest(BaseModel):
+    expression: str = Field(..., max_length=500)
+    variable: str = Field(default="x", pattern=r"^[a-z]$")
+    x_min: float = -10.0
+    x_max: float = 10.0
+    points: int = Field(default=1000, ge=2, le=ANALYTICS_MAX_POINTS)
+    # Plot width in pixels: sample adaptively and return about two points per pixel
+    width: Optional[int] = Field(default=None, ge=16, le=ANALYTICS_MAX_WIDTH)
+    # Visible y range, if the client has zoomed; defaults to the suggested y_range
+    y_min: Optional[float] = None
+    y_max: Optional[float] = None
+    # "json", or binary "f32" / "i16" (see pack_points)
+    format: str = Field(default="json", pattern=r"^(json|f32|i16)$")
+
+
+@router.post("/analytics", summary="Plot and analyse a function")
+async def analytics(payload: AnalyticsRequest):
+    """
+    Example:
+        POST /api/analytics
+        {
+            "expression": "tan x",
+            "x_min": -5,
+            "x_max": 5,
+            "points": 2000
+        }
+
+        Compact payload for a 360px wide phone plot:
+        {"expression": "tan x", "width": 360, "format": "i16"}
+    """
+    if not (math.isfinite(payload.x_min) and math.isfinite(payload.x_max)) or payload.x_min >= payload.x_max:
+        raise HTTPException(status_code=400, detail="x_min must be smaller than x_max")
+    if not math.isfinite(payload.x_max - payload.x_min):
+        raise HTTPException(status_code=400, detail="The domain is too wide")
+    view = None
+    if payload.y_min is not None or payload.y_max is not None:
+        if payload.y_min is None or payload.y_max is None or not payload.y_min < payload.y_max:
+            raise HTTPException(status_code=400, detail="y_min and y_max must be given together, y_min < y_max")
+        if not (math.isfinite(payload.y_min) and math.isfinite(payload.y_max) and math.isfinite(payload.y_max - payload.y_min)):
+            raise HTTPException(status_code=400, detail="y_min and y_max must be finite numbers")
+        view = (payload.y_min, payload.y_max)
+    try:
+        function = expression_cache.get(payload.expression, payload.variable)
+    except ExpressionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    started = time.perf_counter()
+    # Sampling 100k points and building the JSON lists is CPU work; keep it off the event loop
+    result = await asyncio.to_thread(
+        analyse, function, payload.x_min, payload.x_max, payload.points, payload.width, view
+    )
+    fields = {
+        "expression": payload.expression,
+        "parsed": function.source,
+        "variable": payload.variable,
+        "domain": [payload.x_min, payload.x_max],
+    }
+    if payload.format == "json":
+        result = await asyncio.to_thread(plot_json, result)
+        return {**fields, **result, "took_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    x, y = result.pop("x"), result.pop("y")
+    header = {**fields, **result, "took_ms": round((time.perf_counter() - started) * 1000, 2)}
+    body = pack_points(x, y, payload.format, header, view or result["y_range"] or (-1.0, 1.0))
+    return Response(content=body, media_type="application/octet-stream")
+
+
+@router.get("/analytics/health")
+async def analytics_health():
+    """Health check for analytics endpoint"""
+    return {
+        "status": "ok",
+        "tool": "Analytics",
+        "cache": expression_cache.stats()
+    }
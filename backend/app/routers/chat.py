@@ -0,0 +1,152 @@
+"""
+Chat Router
+One round-trip for a subject question with tools: the web search and GCE
+announcement lookups, the solver and the local index run concurrently on
+the server, their context is packed under CHAT_CONTEXT_TOKENS, and the
+answer streams as Server-Sent Events (see app/services/streams.py) with a
+citations event first, so clients can show sources before the first token.
+"""
+import asyncio
+import os
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from app.routers import messenger, research
+from app.routers.subjects import checked_subject, prepare_answer, redirect
+from app.schemas import ChatRequest
+from app.services.admission import AdmissionRejected, estimate_tokens
+from app.services.gemini import GenerationError
+from app.services.search import SearchError
+from app.services.streams import SSE_HEADERS, StreamEvent, stream_registry
+
+router = APIRouter()
+
+# Token budget for all tool snippets together, on top of the subject prompt
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "1200"))
+# A slow search is dropped rather than holding up the answer
+CHAT_TOOL_TIMEOUT = float(os.getenv("CHAT_TOOL_TIMEOUT", "4"))
+
+TOOLS = {
+    "researcher": (research.lookup, research.SearchQuery, "[CONTEXT FROM WEB SEARCH]"),
+    "messenger": (messenger.lookup, messenger.MessengerQuery, "[CONTEXT FROM GCE ANNOUNCEMENTS]"),
+}
+
+
+async def _lookup_tools(payload: ChatRequest) -> tuple:
+    """
+    Runs the requested tool searches concurrently and packs their snippets.
+
+    Returns:
+        (system-prompt context or "", citations event data)
+    """
+    names = list(dict.fromkeys(payload.tools))
+    lookups = [
+        asyncio.wait_for(TOOLS[name][0](TOOLS[name][1](query=payload.question, num_results=payload.num_results)),
+                         CHAT_TOOL_TIMEOUT)
+        for name in names
+    ]
+    responses = await asyncio.gather(*lookups, return_exceptions=True)
+
+    sections, citations, failed = [], [], []
+    budget = CHAT_CONTEXT_TOKENS
+    for name, response in zip(names, responses):
+        if isinstance(response, (SearchError, asyncio.TimeoutError)):
+            failed.append(name)
+            continue
+        if isinstance(response, BaseException):
+            raise response
+        lines = []
+        for result in response.get("results", []):
+            number = len(citations) + 1
+            date = f"[{result['date']}] " if result.get("date") else ""
+            line = f"- [{number}] {date}{result.get('title') or ''}: {result.get('snippet') or ''}"
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            budget -= cost
+            lines.append(line)
+            citation = {"n": number, "tool": name, "title": result.get("title"), "link": result.get("link")}
+            if result.get("date"):
+                citation["date"] = result["date"]
+            citations.append(citation)
+        if lines:
+            sections.append(TOOLS[name][2] + "\n" + "\n".join(lines))
+
+    context = ""
+    if sections:
+        context = "\n\n".join(sections) + (
+            "\n\nUse the context above where it helps answer the question, "
+            "and cite the sources you use by number, e.g. [1]."
+        )
+    return context, {"citations": citations, "failed": failed}
+
+
+async def _context(tools: asyncio.Future) -> str:
+    context, _ = await tools
+    return context
+
+
+async def _pipeline(entry, payload: ChatRequest, usage: dict):
+    """Citations, then the answer; runs inside the stream buffer so the response starts at once."""
+    # Announcement questions are about the exam board, not the subject: don't redirect them
+    reply = None if "messenger" in payload.tools else redirect(entry, payload)
+    if reply:
+        yield StreamEvent("citations", {"citations": [], "failed": []})
+        yield reply
+        return
+
+    tools = asyncio.ensure_future(_lookup_tools(payload))
+    answer = asyncio.ensure_future(prepare_answer(entry, payload, _context(tools)))
+    try:
+        _, citations = await tools
+        yield StreamEvent("citations", citations)
+        reply, stream, usage["prompt_tokens"] = await answer
+    except AdmissionRejected as e:
+        yield GenerationError(f"The tutor is busy right now; please try again in {e.retry_after}s")
+        return
+    finally:
+        for task in (tools, answer):
+            task.cancel()
+
+    if reply is not None:
+        yield reply
+        return
+    async for chunk in stream:
+        yield chunk
+
+
+@router.post("/chat", summary="Answer a subject question, consulting tools server-side")
+async def chat(payload: ChatRequest):
+    """
+    Subject chat with tools in one request, as Server-Sent Events: citations,
+    then token, heartbeat, usage, done or error (see app/services/streams.py).
+
+    Example:
+        POST /api/chat
+        {
+            "subject": "chemistry",
+            "mode": "AL",
+            "question": "Latest uses of graphene in batteries",
+            "tools": ["researcher"]
+        }
+    """
+    entry = checked_subject(payload.subject, payload)
+    usage = {"prompt_tokens": 0}
+    buffered = stream_registry.start(_pipeline(entry, payload, usage), usage)
+    return StreamingResponse(
+        stream_registry.events(buffered),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Stream-Id": buffered.id}
+    )
+
+
+@router.get("/chat/health")
+async def chat_health():
+    """Health check for the chat endpoint"""
+    return {
+        "status": "ok",
+        "tools": list(TOOLS),
+        "context_tokens": CHAT_CONTEXT_TOKENS,
+        "tool_timeout": CHAT_TOOL_TIMEOUT,
+    }
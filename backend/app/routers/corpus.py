@@ -0,0 +1,48 @@
+"""
+Corpus Search Router
+Looks up syllabus, textbook and past-paper passages in the local retrieval
+index (BM25 + vector search, fused by reciprocal rank)
+"""
+import asyncio
+import time
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services.retrieval import retriever, SEARCH_MODES
+from app.services.subjects import subject_registry, MODES
+
+router = APIRouter()
+
+
+@router.get("/search", summary="Search the syllabus, textbook and past-paper corpus")
+async def search_corpus(
+    q: str = Query(..., max_length=1000, description="Question or exact past-paper wording"),
+    subject: Optional[str] = Query(None, description="Subject slug, e.g. physics"),
+    level: Optional[str] = Query(None, description="OL or AL"),
+    k: int = Query(5, ge=1, le=20),
+    mode: str = Query("hybrid", description="hybrid, vector or lexical"),
+):
+    """
+    Example:
+        GET /api/search?q=GCE June 2019 Paper 2 Q3&subject=physics&level=AL
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    if subject is not None and subject_registry.get(subject) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown subject '{subject}'")
+    if level is not None and level not in MODES:
+        raise HTTPException(status_code=400, detail="Level must be 'OL' or 'AL'")
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Mode must be one of: {', '.join(SEARCH_MODES)}")
+
+    started = time.perf_counter()
+    results = await asyncio.to_thread(retriever.search, q, subject, level, k, mode)
+    return {
+        "query": q,
+        "subject": subject,
+        "level": level,
+        "mode": mode,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -1,124 +0,0 @@
-"""
-Economics Subject Router
-Handles economics questions for both OL (Ordinary Level) and AL (Advanced Level)
-"""
-from fastapi import APIRouter, HTTPException
-from app.schemas import SubjectRequest, SubjectResponse
-
-router = APIRouter()
-
-# System prompts for Economics tutor
-ECONOMICS_PROMPTS = {
-    "OL": """You are an expert Economics Tutor for the Cameroon GCE Ordinary Level (OL).
-Your expertise covers:
-- Basic economic concepts (scarcity, opportunity cost, production possibility curve)
-- Demand and supply
-- Price mechanism and market structures
-- Production and productivity
-- National income and living standards
-- Money and banking
-- Government economic policies
-- International trade
-
-RULES:
-1. Answer ONLY Economics questions. If the user asks about Geography, Math, History, etc., politely refuse and tell them to switch subjects.
-2. Use simple, clear explanations with real-world examples.
-3. Keep answers concise (2-3 paragraphs max) but educational.
-4. Explain concepts clearly for OL level (simpler, more foundational).
-5. Use Cameroon examples where possible (e.g., cocoa production, FCFA currency, SONARA refinery).
-6. Use monetary amounts in FCFA (Central African CFA franc) when relevant.
-7. If unsure, say "I'm not certain about that specific detail, but..."
-
-EXAMPLE TOPICS:
-- Types of economic systems
-- Factors of production
-- Elasticity of demand and supply
-- Perfect and imperfect competition
-- Economic growth and development
-- Inflation and deflation
-- Government taxation and spending""",
-    
-    "AL": """You are an expert Economics Tutor for the Cameroon GCE Advanced Level (AL).
-Your expertise covers:
-- Microeconomic theory (utility, production, cost analysis)
-- Market structures and firm behavior
-- Macroeconomic principles (GDP, inflation, unemployment, balance of payments)
-- International economics and trade
-- Economic growth and development
-- Monetary and fiscal policy
-- Public finance and taxation
-- Development economics
-
-RULES:
-1. Answer ONLY Economics questions. If the user asks about Geography, Math, History, etc., politely refuse and tell them to switch subjects.
-2. Provide detailed, analytical responses (3-4 paragraphs).
-3. Include economic models, diagrams (in text form), and mathematical reasoning where relevant.
-4. Use proper economic terminology and concepts.
-5. Encourage critical thinking and policy analysis.
-6. Include Cameroon and African economic context.
-7. Use FCFA and international currency examples.
-8. If unsure, say "That's an interesting question; here's what we know..."
-
-EXAMPLE TOPICS:
-- Consumer and producer surplus
-- Marginal analysis and optimization
-- Long-run equilibrium in different market structures
-- Phillips Curve and stagflation
-- IS-LM model and aggregate demand
-- Monetary transmission mechanism
-- Exchange rates and balance of payments
-- Structural adjustment and economic reform
-- Poverty and inequality in developing economies"""
-}
-
-from app.services.gemini import gemini_service
-
-from fastapi.responses import StreamingResponse
-
-@router.post("/economics")
-async def chat_economics(payload: SubjectRequest):
-    """
-    Economics subject endpoint
-    
-    Args:
-        payload: SubjectRequest with 'question' and 'mode' (OL or AL)
-    
-    Returns:
-        StreamingResponse with AI-generated text
-    
-    Example:
-        POST /api/economics
-        {
-            "question": "What is the relationship between demand and price?",
-            "mode": "OL"
-        }
-    """
-    
-    if payload.mode not in ["OL", "AL"]:
-        raise HTTPException(status_code=400, detail="Mode must be 'OL' or 'AL'")
-    
-    if not payload.question.strip():
-        raise HTTPException(status_code=400, detail="Question cannot be empty")
-    
-    # Get the appropriate system prompt based on mode
-    system_prompt = ECONOMICS_PROMPTS[payload.mode]
-    
-    # Return streaming response
-    return StreamingResponse(
-        gemini_service.generate_content_stream(
-            system_prompt=system_prompt,
-            user_prompt=payload.question
-        ),
-        media_type="text/plain"
-    )
-
-
-@router.get("/economics/health")
-async def economics_health():
-    """Health check for economics endpoint"""
-    return {
-        "status": "ok",
-        "subject": "Economics",
-        "modes": ["OL", "AL"],
-        "message": "Economics endpoint is ready"
-    }
\ No newline at end of file
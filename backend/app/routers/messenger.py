@@ -1,60 +1,130 @@
 import os
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from serpapi import GoogleSearch
-from dotenv import load_dotenv
-
-load_dotenv()
+from app.schemas import result_fields, select_fields
+from app.services.announcements import SEARCH_PREFIX, announcement_store
+from app.services.cache import TTLCache, normalize_query
+from app.services.search import SearchError, SearchService, get_search_service, search_service
+from app.services.streams import SSE_HEADERS, STREAM_HEARTBEAT, STREAM_RETRY_MS, sse
 
 router = APIRouter()
 
+# Announcements change often around exam dates, so keep entries short-lived
+messenger_cache = TTLCache(
+    "messenger",
+    maxsize=int(os.getenv("MESSENGER_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("MESSENGER_CACHE_TTL", "300")),
+    stale_ttl=float(os.getenv("MESSENGER_CACHE_STALE_TTL", "300")),
+)
+
 class MessengerQuery(BaseModel):
     query: str
     num_results: int = 5
 
+async def _search_announcements(query_data: MessengerQuery, tbs: str, search: SearchService) -> dict:
+    # bias search towards Cameroon GCE Board announcements
+    search_term = f"{SEARCH_PREFIX} {query_data.query}".strip()
+    
+    params = {
+        "q": search_term,
+        "num": query_data.num_results,
+        "tbs": tbs
+    }
+
+    results = await search.search(params)
+
+    organic_results = results.get("organic_results", [])
+    
+    formatted_results = []
+    for result in organic_results:
+        formatted_results.append({
+            "title": result.get("title"),
+            "link": result.get("link"),
+            "snippet": result.get("snippet"),
+            "date": result.get("date", "Recent")
+        })
+
+    return {
+        "query": search_term,
+        "results": formatted_results,
+        "topic": "GCE Announcements"
+    }
+
+async def lookup(query_data: MessengerQuery, search: SearchService = search_service) -> dict:
+    """
+    Announcement search, shared by this endpoint and /api/chat: answered from
+    the prefetched store when it has matches, else a cached live search.
+
+    Raises:
+        SearchError: SerpApi isn't configured or the search failed
+    """
+    results = announcement_store.search(query_data.query, query_data.num_results)
+    if results:
+        return {
+            "query": f"{SEARCH_PREFIX} {query_data.query}".strip(),
+            "results": results,
+            "topic": "GCE Announcements",
+            "cursor": announcement_store.cursor
+        }
+
+    if not search.configured:
+        raise SearchError("SERPAPI_API_KEY not configured on server")
+
+    tbs = "qdr:m" # limit to past month for relevance, or maybe remove strict time filter
+    key = (normalize_query(query_data.query), query_data.num_results, tbs)
+    return await messenger_cache.get_or_load(key, lambda: _search_announcements(query_data, tbs, search))
+
+
 @router.post("/messenger", summary="Get GCE Announcements")
-async def get_gce_announcements(query_data: MessengerQuery):
+async def get_gce_announcements(query_data: MessengerQuery, search: SearchService = Depends(get_search_service),
+                                fields: Optional[tuple] = Depends(result_fields)):
     """
     Search for Cameroon GCE Board announcements using SerpApi.
     """
-    api_key = os.getenv("SERPAPI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="SERPAPI_API_KEY not configured on server")
-
     try:
-        # bias search towards Cameroon GCE Board announcements
-        search_term = f"Cameroon GCE Board announcements {query_data.query}".strip()
-        
-        params = {
-            "engine": "google",
-            "q": search_term,
-            "api_key": api_key,
-            "num": query_data.num_results,
-            "tbs": "qdr:m" # limit to past month for relevance, or maybe remove strict time filter
-        }
+        response = await lookup(query_data, search)
 
-        search = GoogleSearch(params)
-        results = search.get_dict()
+    except SearchError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
-        if "error" in results:
-            raise HTTPException(status_code=500, detail=f"SerpApi error: {results['error']}")
+    return {**response, "results": select_fields(response["results"], fields)}
 
-        organic_results = results.get("organic_results", [])
-        
-        formatted_results = []
-        for result in organic_results:
-            formatted_results.append({
-                "title": result.get("title"),
-                "link": result.get("link"),
-                "snippet": result.get("snippet"),
-                "date": result.get("date", "Recent")
-            })
 
-        return {
-            "query": search_term,
-            "results": formatted_results,
-            "topic": "GCE Announcements"
-        }
+async def _feed(cursor: int):
+    yield f"retry: {STREAM_RETRY_MS}\n\n" + sse("start", {"cursor": cursor})
+    while True:
+        if not await announcement_store.wait(cursor, STREAM_HEARTBEAT):
+            yield sse("heartbeat", {"cursor": cursor})
+            continue
+        for item in announcement_store.since(cursor):
+            yield sse("announcement", item, event_id=item["seq"])
+            cursor = item["seq"]
+
+
+@router.get("/messenger/feed", summary="Follow new GCE announcements")
+async def announcement_feed(
+    since: Optional[int] = Query(None, ge=0, description="Sequence number of the last announcement received"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events: an announcement event (id: its sequence number) for
+    every stored announcement after the cursor, then for each new or changed
+    one as the background refresh finds it. Without a cursor, everything
+    stored; EventSource resumes by itself through Last-Event-ID.
+    """
+    if since is None:
+        since = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    return StreamingResponse(_feed(since), media_type="text/event-stream", headers=SSE_HEADERS)
+
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@router.get("/messenger/health")
+async def messenger_health():
+    """Health check for messenger endpoint"""
+    return {
+        "status": "ok",
+        "tool": "Messenger",
+        "cache": messenger_cache.stats(),
+        "store": announcement_store.stats()
+    }
@@ -1,56 +1,84 @@
 import os
-from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from serpapi import GoogleSearch
-from dotenv import load_dotenv
-
-load_dotenv()
+from app.schemas import result_fields, select_fields
+from app.services.cache import TTLCache, normalize_query
+from app.services.search import SearchError, SearchService, get_search_service, search_service
 
 router = APIRouter()
 
+# Research results stay useful for a while; serve stale for a bit longer while refreshing
+research_cache = TTLCache(
+    "research",
+    maxsize=int(os.getenv("RESEARCH_CACHE_SIZE", "2000")),
+    ttl=float(os.getenv("RESEARCH_CACHE_TTL", "3600")),
+    stale_ttl=float(os.getenv("RESEARCH_CACHE_STALE_TTL", "1800")),
+)
+
 class SearchQuery(BaseModel):
     query: str
     num_results: int = 5
 
+async def _search(search_query: SearchQuery, search: SearchService) -> dict:
+    params = {
+        "q": search_query.query,
+        "num": search_query.num_results
+    }
+
+    results = await search.search(params)
+
+    organic_results = results.get("organic_results", [])
+    
+    formatted_results = []
+    for result in organic_results:
+        formatted_results.append({
+            "title": result.get("title"),
+            "link": result.get("link"),
+            "snippet": result.get("snippet"),
+            "source": result.get("source")
+        })
+
+    # SerpApi's search_metadata is left out: no client renders it, and it's most of the payload
+    return {
+        "query": search_query.query,
+        "results": formatted_results
+    }
+
+async def lookup(search_query: SearchQuery, search: SearchService = search_service) -> dict:
+    """
+    Cached web search, shared by this endpoint and /api/chat.
+
+    Raises:
+        SearchError: SerpApi isn't configured or the search failed
+    """
+    if not search.configured:
+        raise SearchError("SERPAPI_API_KEY not configured on server")
+    key = (normalize_query(search_query.query), search_query.num_results, None)
+    return await research_cache.get_or_load(key, lambda: _search(search_query, search))
+
+
 @router.post("/research", summary="Perform a web search using SerpApi")
-async def research(search_query: SearchQuery):
+async def research(search_query: SearchQuery, search: SearchService = Depends(get_search_service),
+                   fields: Optional[tuple] = Depends(result_fields)):
     """
     Perform a Google search using SerpApi and return structured results.
     """
-    api_key = os.getenv("SERPAPI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="SERPAPI_API_KEY not configured on server")
-
     try:
-        params = {
-            "engine": "google",
-            "q": search_query.query,
-            "api_key": api_key,
-            "num": search_query.num_results
-        }
-
-        search = GoogleSearch(params)
-        results = search.get_dict()
-
-        if "error" in results:
-            raise HTTPException(status_code=500, detail=f"SerpApi error: {results['error']}")
-
-        organic_results = results.get("organic_results", [])
-        
-        formatted_results = []
-        for result in organic_results:
-            formatted_results.append({
-                "title": result.get("title"),
-                "link": result.get("link"),
-                "snippet": result.get("snippet"),
-                "source": result.get("source")
-            })
-
-        return {
-            "query": search_query.query,
-            "results": formatted_results,
-            "raw_metadata": results.get("search_metadata", {})
-        }
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        response = await lookup(search_query, search)
+
+    except SearchError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    # Entries are shared across differently-cased queries; echo the caller's own text
+    return {**response, "query": search_query.query, "results": select_fields(response["results"], fields)}
+
+
+@router.get("/research/health")
+async def research_health():
+    """Health check for research endpoint"""
+    return {
+        "status": "ok",
+        "tool": "Researcher",
+        "cache": research_cache.stats()
+    }
@@ -0,0 +1,56 @@
+"""
+Solver Router
+Exact answers for equations, derivatives, integrals, simplification,
+matrices and statistics, computed locally (see app/services/solver.py)
+"""
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from app.services.solver import OPERATIONS, SOLVER_MAX_INPUT, SolverError, SolverUnavailable, solver
+
+router = APIRouter()
+
+
+class SolveRequest(BaseModel):
+    operation: str = Field(..., pattern=f"^({'|'.join(OPERATIONS)})$")
+    expression: str = Field(..., max_length=SOLVER_MAX_INPUT)
+    # Unknowns to solve for / differentiate or integrate by; inferred when omitted
+    variables: Optional[List[str]] = Field(default=None, max_length=6)
+    order: int = Field(default=1, ge=1, le=10)
+    # Bounds of a definite integral, e.g. "0" and "pi"
+    lower: Optional[str] = Field(default=None, max_length=50)
+    upper: Optional[str] = Field(default=None, max_length=50)
+
+
+@router.post("/solve", summary="Solve, differentiate, integrate or simplify exactly")
+async def solve(payload: SolveRequest):
+    """
+    Example:
+        POST /api/solve
+        {"operation": "solve", "expression": "2x^2 + 5x - 3 = 0"}
+
+        {"operation": "integrate", "expression": "x sin x", "lower": "0", "upper": "pi"}
+        {"operation": "matrix", "expression": "[[1, 2], [3, 4]]"}
+        {"operation": "statistics", "expression": "2, 4, 4, 5, 7"}
+    """
+    started = time.perf_counter()
+    try:
+        result = await solver.solve(payload.model_dump(exclude_none=True))
+    except SolverError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SolverUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {**result, "took_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+@router.get("/solve/health")
+async def solve_health():
+    """Health check for the solver endpoint"""
+    return {
+        "status": "ok",
+        "tool": "Solver",
+        "solver": solver.stats()
+    }
@@ -0,0 +1,223 @@
+"""
+Subject Router
+Handles questions for every subject in the catalogue (app/prompts/subjects.yaml),
+for both OL (Ordinary Level) and AL (Advanced Level)
+"""
+import asyncio
+from typing import Awaitable, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from app.schemas import SubjectRequest
+from app.services.admission import estimate_tokens
+from app.services.answers import answer_stream, prompt_hash
+from app.services.retrieval import retriever
+from app.services.sessions import session_store
+from app.services.solver import prompt_note, solver
+from app.services.streams import SSE_HEADERS, stream_registry
+from app.services.subjects import subject_registry, MODES
+from app.services.topic_classifier import topic_guard
+
+router = APIRouter()
+
+
+def _get_subject(slug: str):
+    subject = subject_registry.get(slug)
+    if subject is None:
+        raise HTTPException(status_code=404, detail=f"Unknown subject '{slug}'")
+    return subject
+
+
+@router.get("/subjects")
+async def list_subjects():
+    """Subjects currently in the catalogue"""
+    return {
+        "subjects": [
+            {"slug": s.slug, "name": s.name, "modes": list(MODES), "endpoint": f"/api/{s.slug}"}
+            for s in subject_registry.all()
+        ]
+    }
+
+
+def checked_subject(subject: str, payload: SubjectRequest):
+    """
+    Validates a question before anything is started.
+
+    Returns:
+        The subject's catalogue entry
+
+    Raises:
+        HTTPException: Unknown subject (404), bad mode or empty question (400)
+    """
+    entry = _get_subject(subject)
+
+    if payload.mode not in MODES:
+        raise HTTPException(status_code=400, detail="Mode must be 'OL' or 'AL'")
+
+    if not payload.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    return entry
+
+
+def redirect(entry, payload: SubjectRequest) -> Optional[str]:
+    """Instant reply for a clearly wrong-subject question, or None."""
+    # Follow-ups are left alone: "and for sodium?" only makes sense with the history.
+    if payload.session_id and (payload.session_id, entry.slug, payload.mode) in session_store:
+        return None
+    return topic_guard.check(entry.slug, payload.question)
+
+
+async def _no_tools() -> str:
+    return ""
+
+
+async def prepare_answer(entry, payload: SubjectRequest, tools: Awaitable = None) -> tuple:
+    """
+    Prepares the answer to a validated question. The solver, the local index and
+    the caller's tool lookups run concurrently.
+
+    Args:
+        entry: Catalogue entry from checked_subject()
+        payload: The question
+        tools: Awaitable of extra system-prompt context (e.g. search snippets), "" for none
+
+    Returns:
+        (reply, None, 0) when no LLM is needed (bare arithmetic),
+        else (None, answer chunk iterator, estimated prompt tokens)
+    """
+    # Exact results from the local solver: bare arithmetic needs no LLM at all, and for
+    # equations, derivatives etc. the model explains the verified result instead of computing it.
+    # Meanwhile, ground the answer in the local syllabus/textbook/past-paper index, if there is one
+    solved, context, tool_context = await asyncio.gather(
+        solver.verified(entry.slug, payload.question),
+        retriever.context(entry.slug, payload.mode, payload.question),
+        tools if tools is not None else _no_tools(),
+    )
+    if solved and solved["job"].get("direct"):
+        return solved["summary"], None, 0
+
+    system_prompt = entry.prompts[payload.mode]
+    prompt_key = entry.prompt_hashes[payload.mode]
+    if context:
+        system_prompt = f"{system_prompt}\n\n{context}"
+        prompt_key = f"{prompt_key}:rag{retriever.index.version}"
+    if solved:
+        system_prompt = f"{system_prompt}\n\n{prompt_note(solved)}"
+        prompt_key = f"{prompt_key}:solved"
+    if tool_context:
+        system_prompt = f"{system_prompt}\n\n{tool_context}"
+        prompt_key = f"{prompt_key}:tools{prompt_hash(tool_context)}"
+
+    stream = await answer_stream(
+        subject=entry.slug,
+        mode=payload.mode,
+        system_prompt=system_prompt,
+        question=payload.question,
+        session_id=payload.session_id,
+        prompt_key=prompt_key
+    )
+    return None, stream, estimate_tokens(system_prompt) + estimate_tokens(payload.question)
+
+
+async def _answer(subject: str, payload: SubjectRequest) -> tuple:
+    """
+    Validates a question and prepares its answer.
+
+    Returns:
+        (reply, None, 0) when no LLM is needed (a wrong-subject redirect, bare arithmetic),
+        else (None, answer chunk iterator, estimated prompt tokens)
+    """
+    entry = checked_subject(subject, payload)
+    # Clearly wrong-subject questions get an instant redirect instead of an LLM refusal
+    reply = redirect(entry, payload)
+    if reply:
+        return reply, None, 0
+    return await prepare_answer(entry, payload)
+
+
+async def _text(reply: str):
+    yield reply
+
+
+@router.post("/{subject}")
+async def chat_subject(subject: str, payload: SubjectRequest):
+    """
+    Subject chat endpoint
+
+    Args:
+        subject: Subject slug from the catalogue, e.g. "mathematics"
+        payload: SubjectRequest with 'question' and 'mode' (OL or AL)
+
+    Returns:
+        StreamingResponse with AI-generated text
+
+    Example:
+        POST /api/mathematics
+        {
+            "question": "Solve for x: 2x^2 + 5x - 3 = 0",
+            "mode": "OL"
+        }
+    """
+    reply, stream, _ = await _answer(subject, payload)
+    if reply is not None:
+        return PlainTextResponse(reply)
+
+    # Return streaming response
+    return StreamingResponse(stream, media_type="text/plain")
+
+
+@router.post("/{subject}/stream")
+async def stream_subject(subject: str, payload: SubjectRequest):
+    """
+    Subject chat as Server-Sent Events (token, heartbeat, usage, done, error; see
+    app/services/streams.py). The start event carries a stream_id for resuming.
+
+    Example:
+        POST /api/physics/stream
+        {"question": "State Newton's second law", "mode": "OL"}
+    """
+    with stream_registry.reservation():
+        reply, stream, prompt_tokens = await _answer(subject, payload)
+        buffered = stream_registry.start(_text(reply) if reply is not None else stream,
+                                         {"prompt_tokens": prompt_tokens}, reserved=True)
+    return StreamingResponse(
+        stream_registry.events(buffered),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Stream-Id": buffered.id}
+    )
+
+
+@router.get("/streams/{stream_id}")
+async def resume_stream(
+    stream_id: str,
+    offset: Optional[int] = Query(None, ge=0, description="Events with an id already received"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Continues a stream from where the client left off, from the server-side
+    buffer. EventSource sends Last-Event-ID on reconnect by itself; other
+    clients pass ?offset=<events with an id received>.
+    """
+    buffered = stream_registry.get(stream_id)
+    if buffered is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired stream; please ask again")
+    if offset is None:
+        offset = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+    return StreamingResponse(
+        stream_registry.events(buffered, offset),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.get("/{subject}/health")
+async def subject_health(subject: str):
+    """Health check for a subject endpoint"""
+    entry = _get_subject(subject)
+    return {
+        "status": "ok",
+        "subject": entry.name,
+        "modes": list(MODES),
+        "message": f"{entry.name} endpoint is ready"
+    }
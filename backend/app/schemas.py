@@ -1,10 +1,21 @@
-from pydantic import BaseModel
-from typing import Literal
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+# Everything a /api/research or /api/messenger result can carry
+RESULT_FIELDS = ("title", "link", "snippet", "source", "date")
 
 class SubjectRequest(BaseModel):
     """Request body for subject-specific chat endpoints"""
     question: str
     mode: Literal["OL", "AL"]  # Ordinary Level or Advanced Level
+    session_id: Optional[str] = Field(default=None, max_length=128)  # Enables follow-up questions
+
+class ChatRequest(SubjectRequest):
+    """Request body for /api/chat: a subject question plus the tools to consult first"""
+    subject: str
+    tools: List[Literal["researcher", "messenger"]] = Field(default_factory=list, max_length=2)
+    num_results: int = Field(default=3, ge=1, le=10)  # Search results per tool
 
 class SubjectResponse(BaseModel):
     """Response from subject-specific chat endpoints"""
@@ -15,4 +26,23 @@ class SubjectResponse(BaseModel):
 class ErrorResponse(BaseModel):
     """Error response structure"""
     error: str
-    detail: str
\ No newline at end of file
+    detail: str
+
+def result_fields(
+    fields: Optional[str] = Query(None, description="Comma-separated result fields to return, e.g. title,link")
+) -> Optional[tuple]:
+    """Dependency parsing ?fields=; None means every field."""
+    if fields is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in RESULT_FIELDS]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"fields must be some of: {', '.join(RESULT_FIELDS)}")
+    return names
+
+def select_fields(results: list, fields: Optional[tuple]) -> list:
+    """Results with only the requested fields, leaving out empty ones."""
+    return [
+        {key: value for key, value in result.items() if value is not None and (fields is None or key in fields)}
+        for result in results
+    ]
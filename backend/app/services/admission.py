@@ -0,0 +1,232 @@
+"""
+Admission Control
+Bounds concurrent LLM calls globally and per model, queues the overflow in
+FIFO order with a deadline, and keeps token usage under a per-minute quota.
+Requests that cannot be admitted fail fast with a Retry-After hint.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MODEL_MAX_CONCURRENCY = int(os.getenv("LLM_MODEL_MAX_CONCURRENCY", str(LLM_MAX_CONCURRENCY)))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "128"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+# Provider quota per model; 0 disables token accounting
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; mapped to 503 + Retry-After."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters = deque()
+        self.rejected = 0
+        # Moving average of how long a slot is held, used for Retry-After
+        self.avg_hold = 5.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def saturated(self) -> bool:
+        return self.active >= self.max_concurrency
+
+    def retry_after(self) -> float:
+        return self.avg_hold * (self.queued + 1) / self.max_concurrency
+
+    async def acquire(self, timeout: float):
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(f"{self.name}: queue is full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise AdmissionRejected(f"{self.name}: timed out waiting for a slot", self.retry_after())
+            raise
+
+    def release(self, held: float = None):
+        if held is not None:
+            self.avg_hold = 0.9 * self.avg_hold + 0.1 * held
+        # Hand the slot straight to the oldest live waiter (FIFO)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "rejected": self.rejected,
+        }
+
+
+class TokenBudget:
+    def __init__(self, tokens_per_minute: int, window: float = 60.0):
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self._spent = deque()  # [timestamp, tokens, in_window] per admitted request
+        self.used = 0
+
+    def _expire(self, now: float):
+        while self._spent and now - self._spent[0][0] >= self.window:
+            entry = self._spent.popleft()
+            entry[2] = False
+            self.used -= entry[1]
+
+    def wait_time(self, tokens: int) -> float:
+        """Seconds until `tokens` fit in the window (0 if they fit now)."""
+        now = time.monotonic()
+        self._expire(now)
+        if self.used + tokens <= self.tokens_per_minute:
+            return 0.0
+        freed = self.tokens_per_minute - tokens
+        for stamp, spent, _ in self._spent:
+            freed += spent
+            if self.used <= freed:
+                return stamp + self.window - now
+        return self.window
+
+    def reserve(self, tokens: int) -> list:
+        entry = [time.monotonic(), tokens, True]
+        self._spent.append(entry)
+        self.used += tokens
+        return entry
+
+    def settle(self, entry: list, tokens: int):
+        """Replaces a reservation's estimate with the tokens actually used."""
+        if entry[2]:
+            self.used += tokens - entry[1]
+        entry[1] = tokens
+
+
+class Ticket:
+    def __init__(self, controller, model: str, reservation, started: float):
+        self.controller = controller
+        self.model = model
+        self.reservation = reservation
+        self.started = started
+        self.released = False
+
+    def release(self, tokens_used: int = None):
+        if not self.released:
+            self.released = True
+            self.controller._release(self, tokens_used)
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, model_max_concurrency: int = LLM_MODEL_MAX_CONCURRENCY,
+                 max_queue: int = LLM_MAX_QUEUE, queue_timeout: float = LLM_QUEUE_TIMEOUT,
+                 tokens_per_minute: int = LLM_TOKENS_PER_MINUTE):
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.model_max_concurrency = model_max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.global_limiter = ConcurrencyLimiter("global", max_concurrency, max_queue)
+        self.model_limiters = {}  # model -> ConcurrencyLimiter
+        self.budgets = {}  # model -> TokenBudget
+        self.admitted = 0
+
+    def _limiter(self, model: str) -> ConcurrencyLimiter:
+        limiter = self.model_limiters.get(model)
+        if limiter is None:
+            limiter = self.model_limiters[model] = ConcurrencyLimiter(model, self.model_max_concurrency, self.max_queue)
+        return limiter
+
+    def saturated(self, model: str) -> bool:
+        """True when a new request for this model would have to queue."""
+        return self.global_limiter.saturated or self._limiter(model).saturated
+
+    async def admit(self, model: str, tokens: int) -> Ticket:
+        """
+        Waits for a slot to call `model` with an estimated `tokens` (prompt + completion).
+
+        Raises:
+            AdmissionRejected: the queue is full, the deadline passed, or the
+                token quota cannot make room in time
+        """
+        deadline = time.monotonic() + self.queue_timeout
+
+        reservation = None
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+            budget = self.budgets.get(model)
+            if budget is None:
+                budget = self.budgets[model] = TokenBudget(self.tokens_per_minute)
+            wait = budget.wait_time(tokens)
+            while wait:
+                if wait > deadline - time.monotonic():
+                    raise AdmissionRejected(f"{model}: token quota exhausted", wait)
+                await asyncio.sleep(wait)
+                wait = budget.wait_time(tokens)
+            reservation = budget.reserve(tokens)
+
+        model_limiter = self._limiter(model)
+        try:
+            await self.global_limiter.acquire(deadline - time.monotonic())
+            try:
+                await model_limiter.acquire(deadline - time.monotonic())
+            except BaseException:
+                self.global_limiter.release()
+                raise
+        except BaseException:
+            if reservation is not None:
+                self.budgets[model].settle(reservation, 0)
+            raise
+
+        self.admitted += 1
+        return Ticket(self, model, reservation, time.monotonic())
+
+    def _release(self, ticket: Ticket, tokens_used: int):
+        held = time.monotonic() - ticket.started
+        self._limiter(ticket.model).release(held)
+        self.global_limiter.release(held)
+        if ticket.reservation is not None and tokens_used is not None:
+            self.budgets[ticket.model].settle(ticket.reservation, tokens_used)
+
+    def stats(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "global": self.global_limiter.stats(),
+            "models": {model: limiter.stats() for model, limiter in self.model_limiters.items()},
+            "tokens_last_minute": {model: budget.used for model, budget in self.budgets.items()},
+        }
+
+
+# Singleton instance
+admission = AdmissionController()
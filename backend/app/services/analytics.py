@@ -0,0 +1,644 @@
+"""
+Analytics Service
+Plots and analyses functions typed by students ("2x^2 + 5x - 3", "sin(x)/x",
+"tan x") without eval: the expression is parsed with the ast module, checked
+against a whitelist and compiled once into a tree of NumPy calls, which then
+evaluates every sample point in a single vectorized pass. Compiled
+expressions are kept in an LRU cache.
+
+Discontinuities are found by bisecting the few intervals with a suspicious
+jump, all at once: a jump that survives halving the interval is real, a
+steep but continuous stretch shrinks away.
+"""
+import ast
+import json
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+ANALYTICS_MAX_POINTS = int(os.getenv("ANALYTICS_MAX_POINTS", "100000"))
+ANALYTICS_MAX_EXPRESSION = int(os.getenv("ANALYTICS_MAX_EXPRESSION", "200"))
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "512"))
+# Significant digits kept in the returned points
+ANALYTICS_DIGITS = int(os.getenv("ANALYTICS_DIGITS", "6"))
+# Adaptive plots: points returned per pixel of plot width, and samples taken per returned point
+ANALYTICS_POINTS_PER_PIXEL = float(os.getenv("ANALYTICS_POINTS_PER_PIXEL", "2"))
+ANALYTICS_OVERSAMPLING = int(os.getenv("ANALYTICS_OVERSAMPLING", "8"))
+ANALYTICS_MAX_WIDTH = int(os.getenv("ANALYTICS_MAX_WIDTH", "4096"))
+
+PLOT_ENCODINGS = ("json", "f32", "i16")
+
+
+class ExpressionError(ValueError):
+    """The expression can't be parsed or uses something outside the whitelist."""
+
+
+def _reciprocal(function):
+    return lambda v: 1.0 / function(v)
+
+
+FUNCTIONS = {
+    "sin": np.sin, "cos": np.cos, "tan": np.tan,
+    "sec": _reciprocal(np.cos), "csc": _reciprocal(np.sin), "cosec": _reciprocal(np.sin), "cot": _reciprocal(np.tan),
+    "asin": np.arcsin, "acos": np.arccos, "atan": np.arctan,
+    "arcsin": np.arcsin, "arccos": np.arccos, "arctan": np.arctan,
+    "sinh": np.sinh, "cosh": np.cosh, "tanh": np.tanh,
+    "exp": np.exp, "ln": np.log, "log": np.log10, "log10": np.log10, "log2": np.log2,
+    "sqrt": np.sqrt, "cbrt": np.cbrt, "abs": np.abs, "sign": np.sign,
+    "floor": np.floor, "ceil": np.ceil, "round": np.round,
+}
+BINARY_FUNCTIONS = {
+    "atan2": np.arctan2, "min": np.minimum, "max": np.maximum, "pow": np.power, "mod": np.mod, "hypot": np.hypot,
+}
+CONSTANTS = {"pi": np.pi, "e": np.e, "tau": 2 * np.pi}
+
+_OPERATORS = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide,
+    ast.Pow: np.power, ast.Mod: np.mod,
+    ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+    ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+_POWERS = {
+    2: np.square, 3: lambda v: v * v * v, 4: lambda v: np.square(np.square(v)),
+    0.5: np.sqrt, -1: np.reciprocal, 1: lambda v: v,
+}
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)|([A-Za-z_]\w*)|(\*\*|[<>=!]=|[-+*/^%(),<>]))")
+
+
+def _tokens(text: str) -> list:
+    tokens, position = [], 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match:
+            raise ExpressionError(f"Unexpected character {text[position:].strip()[0]!r}")
+        number, name, operator = match.groups()
+        tokens.append(("number", number) if number else ("name", name) if name else ("op", operator))
+        position = match.end()
+    return tokens
+
+
+_FUNCTION_NAMES = FUNCTIONS.keys() | BINARY_FUNCTIONS.keys() | {"where"}
+
+
+def _is_operand(token) -> bool:
+    return token[0] == "number" or (token[0] == "name" and token[1] not in _FUNCTION_NAMES)
+
+
+def _group_end(tokens: list, i: int) -> int:
+    """Index after the parenthesized group starting at tokens[i]."""
+    depth = 0
+    for j in range(i, len(tokens)):
+        depth += (tokens[j][1] == "(") - (tokens[j][1] == ")")
+        if depth == 0:
+            return j + 1
+    raise ExpressionError("Unbalanced parentheses")
+
+
+def _argument_end(tokens: list, i: int) -> int:
+    """
+    Index after the argument of a call without parentheses starting at
+    tokens[i]: the implicit product that follows, with its powers, so
+    "sin 2x" is sin(2x) and "sin x^2" is sin(x^2). It stops at an operator
+    or another function: "sin x cos x" is sin(x)*cos(x).
+    """
+    if not _is_operand(tokens[i]):
+        raise ExpressionError(f"Write {tokens[i - 1][1]}(...) with parentheses")
+    j = i + 1
+    while j < len(tokens):
+        if tokens[j][1] == "^" and j + 1 < len(tokens) and _is_operand(tokens[j + 1]):
+            j += 2
+        elif tokens[j][1] == "^" and j + 1 < len(tokens) and tokens[j + 1][1] == "(":
+            j = _group_end(tokens, j + 1)
+        elif _is_operand(tokens[j]):
+            j += 1
+        elif tokens[j][1] == "(":
+            # "sin 2(x + 1)"
+            j = _group_end(tokens, j)
+        else:
+            break
+    return j
+
+
+def _rewrite(tokens: list) -> list:
+    out = []
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        if out:
+            previous_kind, previous = out[-1]
+            ends_value = previous_kind == "number" or previous == ")" or (previous_kind == "name" and previous not in _FUNCTION_NAMES)
+            if ends_value and (kind in ("number", "name") or value == "("):
+                out.append(("op", "*"))
+        if kind == "name" and value in _FUNCTION_NAMES and i + 1 < len(tokens) and tokens[i + 1][1] != "(":
+            # "tan x", "sin 2x" -> tan(x), sin(2*x)
+            end = _argument_end(tokens, i + 1)
+            out += [(kind, value), ("op", "("), *_rewrite(tokens[i + 1:end]), ("op", ")")]
+            i = end
+            continue
+        out.append(("op", "**") if value == "^" else (kind, value))
+        i += 1
+    return out
+
+
+def to_python(expression: str) -> str:
+    """
+    Rewrites school notation into Python syntax: ^ for powers, implicit
+    multiplication ("2x", "3(x+1)", "x sin x") and calls without parentheses ("tan x").
+    """
+    return " ".join(value for _, value in _rewrite(_tokens(expression)))
+
+
+class CompiledExpression:
+    def __init__(self, source: str, variable: str, function, constant: bool):
+        self.source = source  # normalized Python form, e.g. "2 * x ** 2 + 5 * x - 3"
+        self.variable = variable
+        self._function = function
+        self.constant = constant
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        """Values at every point of x as float64; NaN where undefined."""
+        x = np.asarray(x, dtype=np.float64)
+        with np.errstate(all="ignore"):
+            y = np.asarray(self._function(x), dtype=np.float64)
+        y = np.array(np.broadcast_to(y, x.shape)) if y.shape != x.shape else y
+        y[~np.isfinite(y)] = np.nan
+        return y
+
+
+def _compile_node(node, variable: str):
+    """Returns (function of x, is constant); constant subtrees are folded immediately."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        value = float(node.value)
+        return (lambda x: value), True
+    if isinstance(node, ast.Name):
+        if node.id == variable:
+            return (lambda x: x), False
+        if node.id in CONSTANTS:
+            value = CONSTANTS[node.id]
+            return (lambda x: value), True
+        raise ExpressionError(f"Unknown name '{node.id}' (the variable is '{variable}')")
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand, constant = _compile_node(node.operand, variable)
+        function = (lambda x: np.negative(operand(x))) if isinstance(node.op, ast.USub) else operand
+        return _fold(function, constant)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow) and isinstance(node.right, ast.Constant) \
+            and node.right.value in _POWERS:
+        # x^2 as a multiply is several times faster than the general np.power
+        base, constant = _compile_node(node.left, variable)
+        power = _POWERS[node.right.value]
+        return _fold(lambda x: power(base(x)), constant)
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _apply(_OPERATORS[type(node.op)], [node.left, node.right], variable)
+    if isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in _OPERATORS:
+        return _apply(_OPERATORS[type(node.ops[0])], [node.left, node.comparators[0]], variable)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name, arity = node.func.id, len(node.args)
+        if name in FUNCTIONS and arity == 1:
+            return _apply(FUNCTIONS[name], node.args, variable)
+        if name in BINARY_FUNCTIONS and arity == 2:
+            return _apply(BINARY_FUNCTIONS[name], node.args, variable)
+        if name == "where" and arity == 3:
+            return _apply(np.where, node.args, variable)
+        if name in FUNCTIONS or name in BINARY_FUNCTIONS or name == "where":
+            raise ExpressionError(f"Wrong number of arguments for {name}()")
+        raise ExpressionError(f"Unknown function '{name}'")
+    raise ExpressionError(f"'{ast.unparse(node)}' is not allowed in an expression")
+
+
+def _apply(operation, arguments: list, variable: str):
+    compiled = [_compile_node(argument, variable) for argument in arguments]
+    functions = [function for function, _ in compiled]
+    if len(functions) == 1:
+        (only,) = functions
+        function = lambda x: operation(only(x))
+    elif len(functions) == 2:
+        left, right = functions
+        function = lambda x: operation(left(x), right(x))
+    else:
+        function = lambda x: operation(*(f(x) for f in functions))
+    return _fold(function, all(constant for _, constant in compiled))
+
+
+def _fold(function, constant: bool):
+    if not constant:
+        return function, False
+    with np.errstate(all="ignore"):
+        value = float(np.asarray(function(None), dtype=np.float64))
+    return (lambda x: value), True
+
+
+def compile_expression(expression: str, variable: str = "x") -> CompiledExpression:
+    """
+    Raises:
+        ExpressionError: Syntax errors, unknown names, or anything but arithmetic and whitelisted functions
+    """
+    if len(expression) > ANALYTICS_MAX_EXPRESSION:
+        raise ExpressionError(f"Expression is longer than {ANALYTICS_MAX_EXPRESSION} characters")
+    if not expression.strip():
+        raise ExpressionError("Expression is empty")
+    # "y = x^2" and "f(x) = x^2" both mean x^2
+    expression = re.sub(r"^\s*(?:[a-z]\s*\(\s*[a-z]\s*\)|y)\s*=(?!=)", "", expression)
+    source = to_python(expression)
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError:
+        raise ExpressionError("Could not parse the expression")
+    function, constant = _compile_node(tree.body, variable)
+    return CompiledExpression(ast.unparse(tree), variable, function, constant)
+
+
+class ExpressionCache:
+    """LRU cache of compiled expressions; compiling costs far more than a cached lookup."""
+
+    def __init__(self, maxsize: int = ANALYTICS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # (expression, variable) -> CompiledExpression or ExpressionError
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, expression: str, variable: str = "x") -> CompiledExpression:
+        key = (" ".join(expression.split()), variable)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            self.misses += 1
+            try:
+                entry = compile_expression(expression, variable)
+            except ExpressionError as e:
+                entry = e  # the same typo tends to be resubmitted
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        if isinstance(entry, ExpressionError):
+            raise entry
+        return entry
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _span(values: np.ndarray) -> float:
+    """Robust height of a curve: asymptotes and outliers don't flatten everything else."""
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return 1.0
+    low, high = np.percentile(finite, [5, 95])
+    # Never below rounding noise: sin(x)^2 + cos(x)^2 is flat, not full of jumps
+    # Python floats: a curve spanning more than the largest float is inf, without an overflow warning
+    return max(float(high) - float(low), 1e-9 * max(float(np.abs(finite).max()), 1.0))
+
+
+_GOLDEN = (np.sqrt(5) - 1) / 2
+
+
+def _pole_search(function: CompiledExpression, a: np.ndarray, b: np.ndarray, rounds: int) -> tuple:
+    """
+    Golden-section search for the largest |f| in each interval, all at once. |f| over a
+    sample interval holding a pole rises to infinity and falls again, so the search
+    closes in on the pole; undefined points are stepped around.
+
+    Returns:
+        (a, f(a), b, f(b) of the final brackets, largest |f| seen by halfway, largest |f| seen)
+    """
+    def height(values):
+        return np.nan_to_num(np.abs(values), nan=-1.0, posinf=np.finfo(float).max)
+
+    c, d = b - _GOLDEN * (b - a), a + _GOLDEN * (b - a)
+    yc, yd = function(c), function(d)
+    peak = np.maximum(height(yc), height(yd))
+    halfway = peak
+    for step in range(rounds):
+        # The largest |f| is on the side of the larger inner point: keep [a, d] or [c, b],
+        # whose other inner point is the one already evaluated
+        left = height(yc) >= height(yd)
+        a, b = np.where(left, a, c), np.where(left, d, b)
+        kept, y_kept = np.where(left, c, d), np.where(left, yc, yd)
+        new = np.where(left, b - _GOLDEN * (b - a), a + _GOLDEN * (b - a))
+        y_new = function(new)
+        c, d = np.where(left, new, kept), np.where(left, kept, new)
+        yc, yd = np.where(left, y_new, y_kept), np.where(left, y_kept, y_new)
+        peak = np.maximum(peak, height(y_new))
+        if step == rounds // 2:
+            halfway = peak
+    return a, function(a), b, function(b), halfway, peak
+
+
+def find_discontinuities(function: CompiledExpression, x: np.ndarray, y: np.ndarray, jump: float = 0.05,
+                         rounds: int = 12, limit: int = 2000, pole_rounds: int = 30, growth: float = 10.0) -> tuple:
+    """
+    Intervals between consecutive samples that contain a jump or an asymptote.
+
+    Args:
+        jump: Steps bigger than this share of the curve's height are checked
+        rounds: Bisection steps per checked interval (all intervals are bisected together)
+        limit: Most intervals checked (the biggest steps)
+        pole_rounds: Golden-section steps looking for a pole in each checked interval and
+            its neighbours; an even pole like 1/x^2 has equal ends, so no step of its own
+        growth: A pole's |f| grows at least this much over the second half of those steps,
+            while a finite peak or a steep end has settled
+
+    Returns:
+        (indices i of intervals [x[i], x[i+1]], x positions, kinds "jump" or "asymptote",
+         (n, 4) array of the bracket around each break: a, f(a), b, f(b))
+    """
+    steps = np.abs(np.diff(y))
+    span = _span(y)
+    # A big step relative to the curve's height, or a spike among its neighbours' steps
+    # (floor(x) over a wide domain jumps by 1 where its height is 100); NaN steps compare False
+    neighbours = np.maximum(np.concatenate(([0.0], steps[:-1])), np.concatenate((steps[1:], [0.0])))
+    stepped = np.flatnonzero((steps > jump * span) | ((steps > 10 * neighbours) & (steps > 1e-6 * span)))
+    if len(stepped) > limit:
+        stepped = stepped[np.argsort(steps[stepped])[-limit:]]
+    if not len(stepped):
+        return stepped, np.zeros(0), [], np.zeros((0, 4))
+    # A pole between two samples is in a stepped interval or right next to one
+    candidates = np.union1d(stepped, np.concatenate((stepped - 1, stepped + 1)))
+    candidates = candidates[(candidates >= 0) & (candidates < len(steps))]
+    candidates = candidates[np.isfinite(steps[candidates])]
+    checked = np.isin(candidates, stepped)
+
+    a, b = x[candidates].copy(), x[candidates + 1].copy()
+    ya, yb = y[candidates].copy(), y[candidates + 1].copy()
+    initial = np.abs(yb - ya)
+    for _ in range(rounds):
+        middle = (a + b) / 2
+        ym = function(middle)
+        # Follow the half with the bigger change; an undefined midpoint counts as the break
+        left = ~(np.abs(ym - ya) < np.nan_to_num(np.abs(yb - ym), nan=np.inf))
+        b = np.where(left, middle, b)
+        yb = np.where(left, ym, yb)
+        a = np.where(left, a, middle)
+        ya = np.where(left, ya, ym)
+    final = np.abs(yb - ya)
+
+    pole_a, pole_ya, pole_b, pole_yb, halfway, peak = _pole_search(
+        function, x[candidates], x[candidates + 1], pole_rounds
+    )
+    pole = (peak > growth * np.maximum(halfway, 0.0)) | (peak == np.finfo(float).max)
+    broken = (checked & ~(final < 0.5 * initial)) | pole
+    kinds = ["asymptote" if blown_up else "jump" for blown_up in (pole | ~(final < 2 * initial))[broken].tolist()]
+    brackets = np.where(pole[:, None], np.column_stack((pole_a, pole_ya, pole_b, pole_yb)),
+                        np.column_stack((a, ya, b, yb)))
+    return candidates[broken], ((brackets[:, 0] + brackets[:, 2]) / 2)[broken], kinds, brackets[broken]
+
+
+def _runs(mask: np.ndarray) -> tuple:
+    """(first, last) indices of every run of True in mask."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+
+def _singular_points(x: np.ndarray, y: np.ndarray, span: float) -> list:
+    """
+    Single undefined samples inside the domain: an asymptote if the curve
+    blows up next to them (1/x at 0), otherwise a removable hole (sin(x)/x at 0).
+    """
+    points = []
+    for first, last in zip(*_runs(np.isnan(y))):
+        if first != last or first == 0 or last == len(y) - 1:
+            continue
+        near = max(abs(y[first - 1]), abs(y[last + 1]))
+        points.append({"x": float(x[first]), "kind": "asymptote" if near > 2 * span else "hole"})
+    return points
+
+
+def _roots(function: CompiledExpression, x: np.ndarray, y: np.ndarray, breaks: np.ndarray, limit: int = 100,
+           rounds: int = 40) -> list:
+    """Zeros at sign changes, refined by bisecting every bracket at once; intervals with a discontinuity are skipped."""
+    sign = np.sign(y)
+    crossing = np.setdiff1d(np.flatnonzero(sign[:-1] * sign[1:] < 0), breaks)[:limit]
+    a, b, sign_a = x[crossing], x[crossing + 1], sign[crossing]
+    for _ in range(rounds if len(crossing) else 0):
+        middle = (a + b) / 2
+        same = np.sign(function(middle)) == sign_a
+        a, b = np.where(same, middle, a), np.where(same, b, middle)
+    # A sample that is exactly zero counts once; a flat run of zeros (floor(x) on [0, 1)) has no single root
+    first, last = _runs(y == 0)
+    exact = x[first[first == last]]
+    return np.unique(np.concatenate(((a + b) / 2, exact)))[:limit].tolist()
+
+
+def _round(values: np.ndarray, span: float) -> np.ndarray:
+    if not np.isfinite(span):
+        # A domain or curve wider than the largest float: nothing sensible to round to
+        return values
+    decimals = max(0, ANALYTICS_DIGITS - int(np.ceil(np.log10(max(span, 1e-300)))))
+    return np.round(values, min(decimals, 15))
+
+
+def _json_floats(values: np.ndarray) -> list:
+    return [None if value != value else value for value in values.tolist()]
+
+
+def decimate(x: np.ndarray, y: np.ndarray, target: int) -> np.ndarray:
+    """
+    LTTB-style decimation of one continuous stretch of a curve: keeps the end
+    points and, from each of target - 2 equal-count buckets, the point spanning
+    the largest triangle with its neighbouring buckets. Classic LTTB anchors on
+    the point kept in the previous bucket; anchoring on that bucket's average
+    instead makes buckets independent, so all of them are picked in one pass.
+
+    Args:
+        x, y: Finite points in screen units, sorted by x
+
+    Returns:
+        Sorted indices of the kept points
+    """
+    n = len(x)
+    if n <= max(target, 2):
+        return np.arange(n)
+    if target < 3:
+        return np.array([0, n - 1])
+    # Bucket b holds the inner points [edges[b], edges[b + 1]); n > target keeps every bucket non-empty
+    edges = np.linspace(1, n - 1, target - 1).astype(np.int64)
+    starts, counts = edges[:-1], np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], starts) / counts
+    mean_y = np.add.reduceat(y[:-1], starts) / counts
+    bucket = np.repeat(np.arange(len(starts)), counts)
+    ax = np.concatenate(([x[0]], mean_x[:-1]))[bucket]
+    ay = np.concatenate(([y[0]], mean_y[:-1]))[bucket]
+    cx = np.concatenate((mean_x[1:], [x[-1]]))[bucket]
+    cy = np.concatenate((mean_y[1:], [y[-1]]))[bucket]
+    px, py = x[1:-1], y[1:-1]
+    area = np.abs((ax - cx) * (py - ay) - (ax - px) * (cy - ay))
+    best = np.flatnonzero(area == np.maximum.reduceat(area, starts - 1)[bucket])
+    # First point reaching its bucket's maximum
+    best = best[np.concatenate(([True], bucket[best][1:] != bucket[best][:-1]))]
+    return np.concatenate(([0], best + 1, [n - 1]))
+
+
+def _adaptive_points(x: np.ndarray, y: np.ndarray, pinned_x: np.ndarray, pinned_y: np.ndarray, view: tuple,
+                     target: int) -> tuple:
+    """
+    Reduces a dense uniform sampling to about target points for a plot of the given viewport.
+
+    Decimation keeps the points where the curve bends most on screen, so straight
+    stretches get few points and turns many; y is clipped to a viewport's height
+    beyond each edge first, so wiggles far off-screen (next to an asymptote) don't
+    take up the budget. Pinned points (roots, extremes, the bisected sides of every
+    discontinuity) are merged in and always kept, as is one NaN at the start of
+    every undefined stretch to break the line.
+    """
+    xs = np.concatenate((x, pinned_x))
+    ys = np.concatenate((y, pinned_y))
+    order = np.argsort(xs, kind="stable")
+    xs, ys = xs[order], ys[order]
+    keep = (np.arange(len(xs)) >= len(x))[order]
+
+    finite = np.isfinite(ys)
+    keep |= ~finite & np.concatenate(([True], finite[:-1]))
+    low, high = view
+    # In halves, so a view as tall as the largest float doesn't overflow
+    half = (high / 2 - low / 2) or 0.5
+    # Triangle areas only compare within a bucket, so the aspect ratio doesn't matter
+    screen_x = (xs - xs[0]) / ((xs[-1] - xs[0]) or 1.0)
+    screen_y = np.clip(ys / 2 - low / 2, -half, 2 * half) / half
+    firsts, lasts = _runs(finite)
+    total = max(int(finite.sum()), 1)
+    for first, last in zip(firsts.tolist(), lasts.tolist()):
+        budget = max(2, round(target * (last - first + 1) / total))
+        keep[first + decimate(screen_x[first:last + 1], screen_y[first:last + 1], budget)] = True
+    return xs[keep], ys[keep]
+
+
+def analyse(function: CompiledExpression, x_min: float, x_max: float, points: int = 1000, width: int = None,
+            view: tuple = None) -> dict:
+    """
+    Samples function uniformly over [x_min, x_max] and describes the curve.
+
+    Args:
+        points: Samples taken
+        width: Plot width in pixels; when set, at least ANALYTICS_OVERSAMPLING samples are
+            taken per returned point and the curve is decimated to about
+            ANALYTICS_POINTS_PER_PIXEL points per pixel, denser where it turns
+        view: (y_min, y_max) of the plot; defaults to the suggested y_range
+
+    Returns:
+        {"x", "y", "y_range", "discontinuities", "undefined", "roots", "minimum", "maximum"};
+        discontinuity kinds are "jump", "asymptote" and "hole" (a single undefined point);
+        x and y are float64 arrays (see plot_json() and pack_points()), y is NaN where the
+        function is undefined, and a NaN point separates the two sides of every
+        discontinuity so plotting libraries don't draw a vertical line
+    """
+    target = max(3, round(width * ANALYTICS_POINTS_PER_PIXEL)) if width else None
+    if target:
+        points = min(max(points, ANALYTICS_OVERSAMPLING * target), ANALYTICS_MAX_POINTS)
+    x = np.linspace(x_min, x_max, points)
+    y = function(x)
+    if function.constant:
+        intervals, positions, kinds, brackets = [], [], [], np.zeros((0, 4))
+    else:
+        intervals, positions, kinds, brackets = find_discontinuities(function, x, y)
+
+    finite = np.isfinite(y)
+    y_span = _span(y)
+    if finite.any():
+        # Python floats: past the largest float the padding is inf, clipped to the data below
+        low, high = (float(value) for value in np.percentile(y[finite], [1, 99]))
+        padding = 0.1 * (high - low or max(abs(high), 1.0))
+        y_range = [float(max(low - padding, np.nanmin(y))), float(min(high + padding, np.nanmax(y)))]
+        lowest, highest = int(np.nanargmin(y)), int(np.nanargmax(y))
+        minimum = {"x": float(x[lowest]), "y": float(y[lowest])}
+        maximum = {"x": float(x[highest]), "y": float(y[highest])}
+    else:
+        y_range, minimum, maximum = None, None, None
+
+    roots = _roots(function, x, y, np.asarray(intervals, dtype=np.int64))
+    discontinuities = [{"x": float(p), "kind": kind} for p, kind in zip(np.asarray(positions).tolist(), kinds)]
+    discontinuities = sorted(discontinuities + _singular_points(x, y, y_span), key=lambda point: point["x"])
+    plot_x = np.insert(x, np.asarray(intervals, dtype=np.int64) + 1, positions)
+    plot_y = np.insert(y, np.asarray(intervals, dtype=np.int64) + 1, np.nan)
+    if target and len(plot_x) > target:
+        pinned_x = [roots, brackets[:, 0], brackets[:, 2]]
+        pinned_y = [np.zeros(len(roots)), brackets[:, 1], brackets[:, 3]]
+        if minimum:
+            pinned_x.append([minimum["x"], maximum["x"]])
+            pinned_y.append([minimum["y"], maximum["y"]])
+        plot_x, plot_y = _adaptive_points(plot_x, plot_y, np.concatenate(pinned_x), np.concatenate(pinned_y),
+                                          view or y_range or (-1.0, 1.0), target)
+    return {
+        "x": plot_x,
+        "y": plot_y,
+        "y_range": y_range,
+        "discontinuities": discontinuities,
+        "undefined": [[float(x[first]), float(x[last])] for first, last in zip(*_runs(np.isnan(y)))],
+        "roots": [float(root) for root in _round(np.asarray(roots), x_max - x_min).tolist()],
+        "minimum": minimum,
+        "maximum": maximum,
+    }
+
+
+def plot_json(result: dict) -> dict:
+    """analyse() result with x and y as lists rounded to ANALYTICS_DIGITS significant digits (None for gaps)."""
+    x, y = result["x"], result["y"]
+    return {
+        **result,
+        "x": _json_floats(_round(x, float(x[-1] - x[0]) if len(x) else 1.0)),
+        "y": _json_floats(_round(y, _span(y))),
+    }
+
+
+def _quantize(values: np.ndarray, low: float, high: float) -> tuple:
+    """
+    Codes in [-32767, 32767] with value = offset + code * step, -32768 for NaN,
+    delta-encoded as int16 (the running sum wraps at 16 bits).
+    """
+    # In halves, so a range as wide as the largest float doesn't overflow
+    step = ((high / 2 - low / 2) or 0.5) / 32767
+    offset = low / 2 + high / 2
+    codes = np.round((np.clip(values, low, high) - offset) / step)
+    codes = np.where(np.isnan(values), -32768, codes).astype(np.int64)
+    deltas = np.diff(codes, prepend=0)
+    return ((deltas + 32768) % 65536 - 32768).astype("<i2"), [offset, step]
+
+
+def pack_points(x: np.ndarray, y: np.ndarray, encoding: str, header: dict, view: tuple) -> bytes:
+    """
+    Binary plot payload, several times smaller than the JSON lists:
+
+        uint32 LE     length H of the header
+        H bytes       UTF-8 JSON header: the given fields plus "count" and "encoding"
+        0-3 bytes     padding, so the arrays start 4-byte aligned
+        "f32":        count x then count y values, float32 LE; NaN y marks a gap
+        "i16":        count x then count y deltas, int16 LE. Their running sum, wrapped
+                      to int16 (in JS: c = (c + d) << 16 >> 16), is a code c; the value is
+                      offset + c * step with [offset, step] from the header's "x_scale"
+                      and "y_scale", and c == -32768 marks a gap. x is exact to 1/65534
+                      of the domain, y to 1/65534 of the viewport's height, clipped to
+                      one height beyond each edge of view
+
+    Args:
+        view: (y_min, y_max) of the plot, used to quantize y for "i16"
+    """
+    if encoding not in PLOT_ENCODINGS[1:]:
+        raise ValueError(f"Unknown plot encoding '{encoding}'")
+    header = {**header, "count": len(x), "encoding": encoding}
+    if encoding == "f32":
+        largest = float(np.finfo(np.float32).max)
+        arrays = [np.clip(x, -largest, largest).astype("<f4"), np.clip(y, -largest, largest).astype("<f4")]
+    else:
+        low, high = view
+        height = (high - low) or 1.0
+        largest = float(np.finfo(np.float64).max)
+        x_deltas, header["x_scale"] = _quantize(x, float(x[0]), float(x[-1]))
+        y_deltas, header["y_scale"] = _quantize(y, max(low - height, -largest), min(high + height, largest))
+        arrays = [x_deltas, y_deltas]
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    padding = b"\0" * (-(4 + len(encoded)) % 4)
+    return b"".join([np.uint32(len(encoded)).astype("<u4").tobytes(), encoded, padding] + [a.tobytes() for a in arrays])
+
+
+# Singleton instance
+expression_cache = ExpressionCache()
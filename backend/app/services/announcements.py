@@ -0,0 +1,377 @@
+"""
+GCE Announcements
+A background job refreshes a canonical set of Cameroon GCE Board announcements
+from SerpApi every ANNOUNCEMENTS_REFRESH_INTERVAL seconds, deduplicates it by
+canonical URL and content hash, and keeps it in a small SQLite store:
+
+    items(url, content_hash, seq, title, snippet, date, first_seen)
+    meta(key, value)                  last_refresh, claimed by one worker at a time
+
+Messenger queries are answered from an in-memory copy, without a SerpApi call,
+when stored items match at least ANNOUNCEMENTS_MIN_MATCH of the query's terms;
+terms every announcement shares ("GCE", "board", ...) don't count. Items are
+dropped ANNOUNCEMENTS_MAX_AGE after they were first seen. Every new or changed
+item gets the next sequence number, so clients follow the store with a
+since-cursor feed (GET /api/messenger/feed) instead of polling. Workers sharing the file take
+turns refreshing and pick up each other's items every ANNOUNCEMENTS_SYNC_INTERVAL.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import suppress
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.services.lexical import terms
+from app.services.search import SearchError, search_service
+
+ANNOUNCEMENTS_DB = os.getenv(
+    "ANNOUNCEMENTS_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "announcements.sqlite3")
+)
+# 0 disables the background job; /api/messenger then searches live as before
+ANNOUNCEMENTS_REFRESH_INTERVAL = float(os.getenv("ANNOUNCEMENTS_REFRESH_INTERVAL", "1800"))
+ANNOUNCEMENTS_SYNC_INTERVAL = float(os.getenv("ANNOUNCEMENTS_SYNC_INTERVAL", "10"))
+# Searches whose union is the canonical announcement set
+ANNOUNCEMENTS_QUERIES = [
+    query.strip() for query in
+    os.getenv("ANNOUNCEMENTS_QUERIES", "results,timetable,registration,examination dates,certificates,news").split(",")
+    if query.strip()
+]
+ANNOUNCEMENTS_RESULTS_PER_QUERY = int(os.getenv("ANNOUNCEMENTS_RESULTS_PER_QUERY", "10"))
+ANNOUNCEMENTS_MAX_ITEMS = int(os.getenv("ANNOUNCEMENTS_MAX_ITEMS", "2000"))
+ANNOUNCEMENTS_TBS = os.getenv("ANNOUNCEMENTS_TBS", "qdr:m")
+# Seconds an item is kept after it was first seen, like the past-month search window; 0 keeps them
+ANNOUNCEMENTS_MAX_AGE = float(os.getenv("ANNOUNCEMENTS_MAX_AGE", str(31 * 86400)))
+# Share of a query's terms a stored item must contain to answer it; below that, search live
+ANNOUNCEMENTS_MIN_MATCH = float(os.getenv("ANNOUNCEMENTS_MIN_MATCH", "0.6"))
+
+# Biases every search towards the GCE Board
+SEARCH_PREFIX = "Cameroon GCE Board announcements"
+# In nearly every stored item, so they say nothing about which one a query wants
+_CONTEXT_TERMS = frozenset(terms(f"{SEARCH_PREFIX} announcement exam exams examination examinations"))
+
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "ref")
+
+
+def canonical_url(url: str) -> str:
+    """Same page, same key: lowercase host, no fragment, tracking parameters or trailing slash."""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(_TRACKING_PARAMS)
+    ))
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return urlunsplit((parts.scheme.lower() or "https", host, parts.path.rstrip("/") or "/", query, ""))
+
+
+def content_hash(title: str, snippet: str) -> str:
+    """Digest of the content words, so the same notice reposted elsewhere is a duplicate."""
+    text = " ".join(terms(f"{title or ''} {snippet or ''}"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class Announcement:
+    __slots__ = ("seq", "url", "title", "snippet", "date", "first_seen", "terms")
+
+    def __init__(self, seq: int, url: str, title: str, snippet: str, date: str, first_seen: float):
+        self.seq = seq
+        self.url = url
+        self.title = title
+        self.snippet = snippet
+        self.date = date
+        self.first_seen = first_seen
+        self.terms = frozenset(terms(f"{title or ''} {snippet or ''}"))
+
+    def result(self) -> dict:
+        """Same shape as a live /api/messenger result."""
+        return {"title": self.title, "link": self.url, "snippet": self.snippet, "date": self.date or "Recent"}
+
+    def feed_item(self) -> dict:
+        return {**self.result(), "seq": self.seq, "first_seen": self.first_seen}
+
+
+class AnnouncementStore:
+    def __init__(self, path: str = ANNOUNCEMENTS_DB, interval: float = ANNOUNCEMENTS_REFRESH_INTERVAL,
+                 queries: list = None, max_items: int = ANNOUNCEMENTS_MAX_ITEMS,
+                 max_age: float = ANNOUNCEMENTS_MAX_AGE):
+        """
+        Args:
+            path: SQLite file, shared by every worker
+            interval: Seconds between refreshes; 0 disables the background job
+            queries: Searches making up the canonical set, after SEARCH_PREFIX
+            max_items: Items kept; the oldest sequence numbers are pruned
+            max_age: Seconds an item is kept after it was first seen; 0 keeps them
+        """
+        self.path = path
+        self.interval = interval
+        self.queries = queries if queries is not None else ANNOUNCEMENTS_QUERIES
+        self.max_items = max_items
+        self.max_age = max_age
+        self._items = {}  # canonical url -> Announcement, in sequence order
+        self.cursor = 0  # highest sequence number loaded
+        self._db = None
+        self._lock = threading.Lock()  # the connection is used from worker threads
+        self._changed = asyncio.Event()  # replaced after every set()
+        self._task = None
+        self._claimed = None  # (our last_refresh stamp, the one it replaced) while refreshing
+        self.refreshes = 0
+        self.failures = 0
+        self.added = 0
+        self.updated = 0
+        self.duplicates = 0
+        self.last_refresh = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS items (
+                url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, seq INTEGER NOT NULL UNIQUE,
+                title TEXT, snippet TEXT, date TEXT, first_seen REAL NOT NULL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS items_content_hash ON items (content_hash)")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._db = db
+        return self._db
+
+    def _changes(self) -> list:
+        """Rows added or changed in the file since the last sync."""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT seq, url, title, snippet, date, first_seen FROM items WHERE seq > ? ORDER BY seq",
+                (self.cursor,)
+            ).fetchall()
+
+    def _apply(self, rows: list):
+        # On the event loop, so searches never see the dict change under them
+        for row in rows:
+            item = Announcement(*row)
+            self._items.pop(item.url, None)  # a changed item moves to the end
+            self._items[item.url] = item
+            self.cursor = item.seq
+        while len(self._items) > self.max_items:
+            del self._items[next(iter(self._items))]
+        if self.max_age:
+            oldest = time.time() - self.max_age
+            for url in [url for url, item in self._items.items() if item.first_seen < oldest]:
+                del self._items[url]
+
+    def _claim(self, force: bool) -> bool:
+        """Marks a refresh as started unless another worker refreshed within the interval."""
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT value FROM meta WHERE key = 'last_refresh'").fetchone()
+                now = time.time()
+                if not force and row and now - float(row[0]) < self.interval:
+                    db.execute("ROLLBACK")
+                    return False
+                db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_refresh', ?)", (str(now),))
+                db.execute("COMMIT")
+                self._claimed = (str(now), row[0] if row else None)
+                return True
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def _release(self):
+        """Undoes a claim after a failed refresh, so the next worker retries now rather than an interval later."""
+        stamp, previous = self._claimed
+        self._claimed = None
+        with self._lock:
+            db = self._connect()
+            # Only if no other worker has claimed since
+            if previous is None:
+                db.execute("DELETE FROM meta WHERE key = 'last_refresh' AND value = ?", (stamp,))
+            else:
+                db.execute("UPDATE meta SET value = ? WHERE key = 'last_refresh' AND value = ?", (previous, stamp))
+
+    def _store(self, results: list):
+        """Upserts search results, skipping ones already stored under their URL or content."""
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                seq = db.execute("SELECT COALESCE(MAX(seq), 0) FROM items").fetchone()[0]
+                for result in results:
+                    if not result.get("link"):
+                        continue
+                    url = canonical_url(result["link"])
+                    digest = content_hash(result.get("title"), result.get("snippet"))
+                    # Unchanged, or the same notice under another URL
+                    if db.execute("SELECT 1 FROM items WHERE content_hash = ? LIMIT 1", (digest,)).fetchone():
+                        self.duplicates += 1
+                        continue
+                    seq += 1
+                    cursor = db.execute(
+                        """INSERT INTO items (url, content_hash, seq, title, snippet, date, first_seen)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)
+                           ON CONFLICT (url) DO UPDATE SET content_hash = excluded.content_hash, seq = excluded.seq,
+                               title = excluded.title, snippet = excluded.snippet, date = excluded.date
+                           RETURNING first_seen""",
+                        (url, digest, seq, result.get("title"), result.get("snippet"), result.get("date"), now)
+                    )
+                    if cursor.fetchone()[0] == now:
+                        self.added += 1
+                    else:
+                        self.updated += 1
+                db.execute("DELETE FROM items WHERE seq <= ?", (seq - self.max_items,))
+                if self.max_age:
+                    # first_seen is never before the page's date, so the search window no longer returns these
+                    db.execute("DELETE FROM items WHERE first_seen < ?", (now - self.max_age,))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    async def _fetch(self, query: str) -> list:
+        results = await search_service.search({
+            "q": f"{SEARCH_PREFIX} {query}".strip(),
+            "num": ANNOUNCEMENTS_RESULTS_PER_QUERY,
+            "tbs": ANNOUNCEMENTS_TBS,
+        })
+        return results.get("organic_results", [])
+
+    async def refresh(self, force: bool = False) -> bool:
+        """
+        Fetches the canonical set, unless another worker refreshed within the interval.
+
+        Returns:
+            Whether this call refreshed
+        """
+        if not search_service.configured or not await asyncio.to_thread(self._claim, force):
+            return False
+        try:
+            fetched = await asyncio.gather(*(self._fetch(query) for query in self.queries), return_exceptions=True)
+            for outcome in fetched:
+                if isinstance(outcome, BaseException) and not isinstance(outcome, SearchError):
+                    raise outcome
+            if all(isinstance(outcome, SearchError) for outcome in fetched):
+                self.failures += 1
+                await asyncio.to_thread(self._release)
+                return False
+            await asyncio.to_thread(self._store, [
+                result for outcome in fetched if not isinstance(outcome, SearchError) for result in outcome
+            ])
+        except BaseException:
+            # Also on cancellation. In a thread: a _store still running in one may hold the lock
+            if self._claimed is not None:
+                with suppress(sqlite3.Error):
+                    await asyncio.to_thread(self._release)
+            raise
+        self._claimed = None
+        self.refreshes += 1
+        self.last_refresh = time.time()
+        return True
+
+    async def sync(self) -> int:
+        """Picks up new items from the file and wakes feed readers; returns how many."""
+        rows = await asyncio.to_thread(self._changes)
+        self._apply(rows)
+        if rows:
+            changed, self._changed = self._changed, asyncio.Event()
+            changed.set()
+        return len(rows)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+                await self.sync()
+            except (sqlite3.Error, OSError):
+                self.failures += 1
+            await asyncio.sleep(ANNOUNCEMENTS_SYNC_INTERVAL)
+
+    def start(self):
+        """Starts the background job (from the app lifespan)."""
+        if self.enabled and self._task is None:
+            self._apply(self._changes())
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def search(self, query: str, limit: int = 5) -> Optional[list]:
+        """
+        Stored announcements matching a query, best first, then newest.
+
+        Returns:
+            Results like a live search, or None when no stored item has
+            ANNOUNCEMENTS_MIN_MATCH of the query's terms
+        """
+        if not self._items:
+            self.misses += 1
+            return None
+        wanted = frozenset(terms(query)) - _CONTEXT_TERMS
+        if wanted:
+            needed = ANNOUNCEMENTS_MIN_MATCH * len(wanted)
+            scored = [(len(wanted & item.terms), item.seq, item) for item in self._items.values()]
+            matches = [entry for entry in scored if entry[0] and entry[0] >= needed]
+            if not matches:
+                self.misses += 1
+                return None
+            matches.sort(key=lambda entry: entry[:2], reverse=True)
+            ranked = [item for _, _, item in matches[:limit]]
+        else:
+            ranked = list(self._items.values())[:-limit - 1:-1]
+        self.hits += 1
+        return [item.result() for item in ranked]
+
+    def since(self, cursor: int, limit: int = 100) -> list:
+        """Items added or changed after a cursor, oldest first."""
+        return [item.feed_item() for item in self._items.values() if item.seq > cursor][:limit]
+
+    async def wait(self, cursor: int, timeout: float) -> bool:
+        """Waits until there are items after cursor; False on timeout."""
+        if self.cursor > cursor:
+            return True
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self.cursor > cursor
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._items),
+            "cursor": self.cursor,
+            "refreshes": self.refreshes,
+            "last_refresh": self.last_refresh,
+            "added": self.added,
+            "updated": self.updated,
+            "duplicates": self.duplicates,
+            "failures": self.failures,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Singleton instance
+announcement_store = AnnouncementStore()
@@ -0,0 +1,154 @@
+"""
+Answer Service
+Streams subject chat answers, replaying cached generations when the same
+(subject, mode, system prompt, question) was already answered. Follow-ups in
+a session are generated with the conversation history instead.
+"""
+import hashlib
+import os
+
+from app.services.cache import SizedLRUCache, normalize_query
+from app.services.gemini import gemini_service, GenerationError
+from app.services.metrics import answers_served, time_to_first_token, tokens_streamed, timer
+from app.services.semantic_cache import semantic_cache
+from app.services.sessions import session_store
+from app.services.singleflight import SingleFlight
+
+# Replayed answers are sent in chunks of this many characters
+REPLAY_CHUNK_SIZE = int(os.getenv("ANSWER_REPLAY_CHUNK_SIZE", "64"))
+
+response_cache = SizedLRUCache(
+    "answers",
+    max_bytes=int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "86400")),
+)
+
+# Identical questions asked while an answer is still streaming share that stream
+inflight_answers = SingleFlight()
+
+
+def prompt_hash(system_prompt: str) -> str:
+    """Short stable digest of a system prompt, so prompt edits invalidate cached answers."""
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def answer_key(subject: str, mode: str, system_prompt: str, question: str, prompt_key: str = None) -> tuple:
+    return (subject, mode, prompt_key or prompt_hash(system_prompt), normalize_query(question))
+
+
+async def answer_stream(subject: str, mode: str, system_prompt: str, question: str, session_id: str = None,
+                        prompt_key: str = None):
+    """
+    Prepares the answer stream for a subject question.
+
+    Args:
+        subject: Subject slug, e.g. "mathematics"
+        mode: "OL" or "AL"
+        system_prompt: Subject/mode system prompt
+        question: The student's question
+        session_id: Optional conversation id; earlier turns are sent as context
+        prompt_key: Precomputed prompt_hash(system_prompt), if the caller has one
+
+    Returns:
+        An async iterator of text chunks for StreamingResponse
+
+    Raises:
+        AdmissionRejected: a new generation is needed but the LLM is saturated
+    """
+    received = timer()
+    session = (session_id, subject, mode) if session_id else None
+    history = session_store.history(session) if session else []
+
+    if history:
+        # A follow-up depends on the conversation so far, so it is never cached or shared
+        ticket = await gemini_service.admit(system_prompt, question, history)
+        stream = gemini_service.generate_content_stream(
+            system_prompt=system_prompt,
+            user_prompt=question,
+            ticket=ticket,
+            history=history
+        )
+        source = "session"
+    else:
+        stream, source = await _shared_stream(answer_key(subject, mode, system_prompt, question, prompt_key), system_prompt, question)
+
+    stream = _observed(stream, subject, mode, source, received)
+    return _remembered(stream, session, question) if session else stream
+
+
+async def _shared_stream(key: tuple, system_prompt: str, question: str):
+    """Cached, near-duplicate or in-flight answer if there is one, else a new generation."""
+    cached = response_cache.get(key)
+    if cached is not None:
+        return _replay(cached), "cache"
+    # Near-duplicate wording of an answered question (no-op unless enabled)
+    cached = semantic_cache.lookup(key[:3], question)
+    if cached is not None:
+        return _replay(cached), "semantic"
+
+    # Joining an identical in-flight generation costs no upstream capacity
+    ticket = None
+    if key not in inflight_answers:
+        ticket = await gemini_service.admit(system_prompt, question)
+
+    stream, started = _generate(key, system_prompt, question, ticket)
+    return stream, "generated" if started else "coalesced"
+
+
+async def _remembered(stream, session: tuple, question: str):
+    """Passes the stream through and records the turn once it completed without errors."""
+    chunks = []
+    try:
+        async for text in stream:
+            chunks.append(text)
+            yield text
+    finally:
+        await stream.aclose()
+    if chunks and not any(isinstance(text, GenerationError) for text in chunks):
+        session_store.record(session, question, "".join(chunks))
+
+
+async def _observed(stream, subject: str, mode: str, source: str, received: float):
+    """Passes the stream through, recording time-to-first-token and streamed volume."""
+    answers_served.inc(subject, mode, source)
+    chars = 0
+    first = True
+    try:
+        async for text in stream:
+            if first:
+                time_to_first_token.observe(subject, mode, value=timer() - received)
+                first = False
+            chars += len(text)
+            yield text
+    finally:
+        tokens_streamed.inc(subject, mode, amount=chars // 4)
+        await stream.aclose()
+
+
+async def _replay(text: str):
+    for start in range(0, len(text), REPLAY_CHUNK_SIZE):
+        yield text[start:start + REPLAY_CHUNK_SIZE]
+
+
+def _generate(key: tuple, system_prompt: str, question: str, ticket=None):
+    started = False
+
+    def start():
+        nonlocal started
+        started = True
+        return gemini_service.generate_content_stream(
+            system_prompt=system_prompt,
+            user_prompt=question,
+            ticket=ticket
+        )
+
+    def fill(answer: str):
+        # Only called when the generation ran to the end without errors
+        response_cache.set(key, answer)
+        semantic_cache.add(key[:3], key[3], answer)
+
+    stream = inflight_answers.subscribe(key, start, on_complete=fill)
+    if ticket and not started:
+        # Someone else started the same generation while we were queued
+        ticket.release(0)
+    return stream, started
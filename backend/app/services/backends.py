@@ -0,0 +1,367 @@
+"""
+LLM Backends
+Engines behind LLMService. Each backend streams text chunks for a chat
+request through the same async-iterator contract:
+
+    async for text in backend.stream(model, messages, temperature, max_tokens): ...
+
+- GroqBackend: hosted models over the network (default)
+- LocalBackend: quantized GGUF models on the CPU via llama.cpp, for schools
+  with poor connectivity (pip install llama-cpp-python)
+"""
+import asyncio
+import codecs
+import os
+import queue
+import threading
+
+from groq import AsyncGroq
+
+from app.services.http_pools import http_pools
+
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com")
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "50"))
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "")
+LOCAL_MODEL_THREADS = int(os.getenv("LOCAL_MODEL_THREADS", str(os.cpu_count() or 4)))
+# Context window of each sequence; the KV cache holds LOCAL_MODEL_CTX x LOCAL_MODEL_SLOTS tokens
+LOCAL_MODEL_CTX = int(os.getenv("LOCAL_MODEL_CTX", "4096"))
+# Sequences decoded together, one token each per forward pass
+LOCAL_MODEL_SLOTS = int(os.getenv("LOCAL_MODEL_SLOTS", "4"))
+# Tokens per forward pass; longer prompts are fed over several passes
+LOCAL_MODEL_BATCH = int(os.getenv("LOCAL_MODEL_BATCH", "512"))
+
+
+class LLMBackend:
+    name = "base"
+
+    async def stream(self, model: str, messages: list, temperature: float, max_tokens: int):
+        """Yields the text of the completion as it is generated."""
+        raise NotImplementedError
+        yield  # pragma: no cover - makes this an async generator
+
+    async def aclose(self):
+        pass
+
+
+class GroqBackend(LLMBackend):
+    name = "groq"
+
+    def __init__(self, api_key: str, timeout: float, base_url: str = GROQ_BASE_URL,
+                 max_connections: int = GROQ_MAX_CONNECTIONS):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.base_url = base_url
+        self._client = None
+        self._http_client = None
+        http_pools.register("groq", base_url, timeout, max_connections)
+
+    @property
+    def client(self) -> AsyncGroq:
+        # Built on the shared pool, and rebuilt if the lifespan closed that pool
+        http_client = http_pools.client("groq")
+        if self._client is None or self._http_client is not http_client:
+            # Retries are handled by LLMService so they can stop once tokens have been streamed
+            self._client = AsyncGroq(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                     timeout=self.timeout, http_client=http_client)
+            self._http_client = http_client
+        return self._client
+
+    async def stream(self, model: str, messages: list, temperature: float, max_tokens: int):
+        stream = await self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+
+        async for chunk in stream:
+            if chunk.choices[0].delta.content is not None:
+                yield chunk.choices[0].delta.content
+
+    async def aclose(self):
+        # The connection pool belongs to http_pools, which closes it
+        self._client = None
+
+
+class _LocalRequest:
+    def __init__(self, messages, temperature, max_tokens, loop):
+        self.messages = messages
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.loop = loop
+        self.output = asyncio.Queue()
+        self.cancelled = False
+
+    def emit(self, item):
+        # Called from the decode thread
+        self.loop.call_soon_threadsafe(self.output.put_nowait, item)
+
+
+class _Sequence:
+    """Decode state of one request in its KV cache sequence."""
+
+    def __init__(self, request: _LocalRequest, sampler, fed: list, feed: list):
+        self.request = request
+        self.sampler = sampler
+        self.fed = fed    # tokens already in the KV cache, position i at index i
+        self.feed = feed  # tokens still to go into the next forward passes
+        self.logits = -1  # batch index of this sequence's last token in the current pass
+        self.generated = 0
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+_DONE = object()
+
+
+class LocalBackend(LLMBackend):
+    name = "local"
+
+    def __init__(self, model_path: str = LOCAL_MODEL_PATH, threads: int = LOCAL_MODEL_THREADS,
+                 n_ctx: int = LOCAL_MODEL_CTX, slots: int = LOCAL_MODEL_SLOTS, batch: int = LOCAL_MODEL_BATCH):
+        """
+        Args:
+            model_path: Path to a quantized GGUF file (e.g. Q4_K_M)
+            threads: CPU threads used for decoding; defaults to the core count
+            n_ctx: Context window per sequence
+            slots: Maximum sequences in progress at once, decoded in the same batch
+            batch: Tokens per forward pass
+        """
+        try:
+            import llama_cpp
+        except ImportError:
+            raise RuntimeError("LocalBackend needs llama-cpp-python: pip install llama-cpp-python")
+        if not model_path or not os.path.exists(model_path):
+            raise RuntimeError(f"LOCAL_MODEL_PATH does not point to a GGUF file: {model_path!r}")
+
+        self._llama = llama_cpp
+        self.model_path = model_path
+        self.threads = threads
+        self.n_ctx = n_ctx
+        self.slots = slots
+        self.batch_size = max(batch, slots)
+        self._model = None
+        self._context = None
+        self._batch = None
+        self._format = None
+        self._cached = {}  # seq id -> tokens left in its KV cache by the last request on it
+        self._pending = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.tokens_generated = 0
+        self.prompt_tokens_reused = 0
+        self.decode_calls = 0
+
+    def load(self):
+        """Maps the weights and allocates the shared KV cache; otherwise done by the first request."""
+        with self._lock:
+            if self._context is not None:
+                return
+            from llama_cpp import _internals
+            from llama_cpp.llama_chat_format import Jinja2ChatFormatter
+
+            llama_cpp = self._llama
+            model_params = llama_cpp.llama_model_default_params()
+            # mmap keeps the weights in the page cache, shared with any other process mapping the file
+            model_params.use_mmap = True
+            model_params.use_mlock = False
+            model = _internals.LlamaModel(path_model=self.model_path, params=model_params, verbose=False)
+            template = model.metadata().get("tokenizer.chat_template")
+            if not template:
+                raise RuntimeError(f"{self.model_path} has no chat template")
+
+            params = llama_cpp.llama_context_default_params()
+            params.n_ctx = self.n_ctx * self.slots
+            params.n_batch = params.n_ubatch = self.batch_size
+            params.n_seq_max = self.slots
+            # A separate n_ctx of KV cells per sequence; requests seldom share more than the system prompt
+            params.kv_unified = False
+            params.n_threads = params.n_threads_batch = self.threads
+            context = _internals.LlamaContext(model=model, params=params, verbose=False)
+
+            eos, bos = model.token_eos(), model.token_bos()
+            self._format = Jinja2ChatFormatter(
+                template=template,
+                eos_token=model.token_get_text(eos) if eos != -1 else "",
+                bos_token=model.token_get_text(bos) if bos != -1 else "",
+            )
+            self._batch = _internals.LlamaBatch(n_tokens=self.batch_size, embd=0, n_seq_max=1, verbose=False)
+            self._model, self._context = model, context
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._batch_loop, name="local-llm", daemon=True)
+                self._thread.start()
+
+    def _batch_loop(self):
+        """
+        Continuous batching over one llama_context: every forward pass carries
+        the next token of each generating sequence, tagged with its sequence id,
+        so N streams cost about one pass per token instead of N. Queued requests
+        join at the next pass, and new prompts fill the rest of the batch, so a
+        long prompt holds live streams up by at most one pass per LOCAL_MODEL_BATCH
+        tokens.
+        """
+        sequences = {}  # seq id -> _Sequence
+        while True:
+            free = [seq_id for seq_id in range(self.slots) if seq_id not in sequences]
+            while free:
+                try:
+                    # Block only when there is nothing to decode
+                    request = self._pending.get(block=not sequences)
+                except queue.Empty:
+                    break
+                if request is None:
+                    for seq_id in list(sequences):
+                        self._finish(seq_id, sequences, keep=False)
+                    return
+                self._start(request, free, sequences)
+
+            for seq_id, sequence in list(sequences.items()):
+                if sequence.request.cancelled:
+                    self._finish(seq_id, sequences)
+            if sequences:
+                self._step(sequences)
+
+    def _start(self, request: _LocalRequest, free: list, sequences: dict):
+        if request.cancelled:
+            return
+        try:
+            self.load()
+            prompt = self._format(messages=request.messages).prompt
+            # The chat template adds BOS itself
+            tokens = self._model.tokenize(prompt.encode("utf-8"), add_bos=False, special=True)
+            if len(tokens) >= self.n_ctx:
+                raise ValueError(f"Prompt of {len(tokens)} tokens does not fit the {self.n_ctx}-token context")
+        except Exception as e:
+            request.emit(e)
+            return
+
+        # Take the free sequence whose cache shares the longest prefix (the system prompt, usually)
+        def shared(seq_id):
+            cached = self._cached.get(seq_id, ())
+            n = 0
+            while n < min(len(cached), len(tokens) - 1) and cached[n] == tokens[n]:
+                n += 1
+            return n
+
+        seq_id = max(free, key=shared)
+        reused = shared(seq_id)
+        free.remove(seq_id)
+        self._cached.pop(seq_id, None)
+        self._llama.llama_memory_seq_rm(self._context.memory, seq_id, reused, -1)
+        self.prompt_tokens_reused += reused
+        sequences[seq_id] = _Sequence(request, self._sampler(request.temperature), tokens[:reused], tokens[reused:])
+
+    def _sampler(self, temperature: float):
+        llama_cpp = self._llama
+        chain = llama_cpp.llama_sampler_chain_init(llama_cpp.llama_sampler_chain_default_params())
+        if temperature <= 0:
+            llama_cpp.llama_sampler_chain_add(chain, llama_cpp.llama_sampler_init_greedy())
+            return chain
+        llama_cpp.llama_sampler_chain_add(chain, llama_cpp.llama_sampler_init_top_k(40))
+        llama_cpp.llama_sampler_chain_add(chain, llama_cpp.llama_sampler_init_top_p(0.95, 1))
+        llama_cpp.llama_sampler_chain_add(chain, llama_cpp.llama_sampler_init_min_p(0.05, 1))
+        llama_cpp.llama_sampler_chain_add(chain, llama_cpp.llama_sampler_init_temp(temperature))
+        llama_cpp.llama_sampler_chain_add(chain, llama_cpp.llama_sampler_init_dist(llama_cpp.LLAMA_DEFAULT_SEED))
+        return chain
+
+    def _step(self, sequences: dict):
+        """One forward pass for every sequence, then one sampled token for each that finished its prompt."""
+        batch = self._batch.batch
+        batch.n_tokens = 0
+        # Generating sequences first: they need one slot each, prompts take what is left
+        for seq_id, sequence in sorted(sequences.items(), key=lambda item: len(item[1].feed) > 1):
+            take = sequence.feed[:self.batch_size - batch.n_tokens]
+            sequence.feed = sequence.feed[len(take):]
+            for token in take:
+                i = batch.n_tokens
+                batch.token[i] = token
+                batch.pos[i] = len(sequence.fed)
+                batch.n_seq_id[i] = 1
+                batch.seq_id[i][0] = seq_id
+                batch.logits[i] = False
+                sequence.fed.append(token)
+                batch.n_tokens += 1
+            sequence.logits = -1
+            if take and not sequence.feed:
+                batch.logits[batch.n_tokens - 1] = True
+                sequence.logits = batch.n_tokens - 1
+
+        status = self._llama.llama_decode(self._context.ctx, batch)
+        self.decode_calls += 1
+        if status != 0:
+            error = RuntimeError(f"llama_decode failed with status {status}")
+            for seq_id in list(sequences):
+                sequences[seq_id].request.emit(error)
+                self._finish(seq_id, sequences, keep=False, emit=False)
+            return
+
+        for seq_id, sequence in list(sequences.items()):
+            if sequence.logits < 0:
+                continue
+            token = self._llama.llama_sampler_sample(sequence.sampler, self._context.ctx, sequence.logits)
+            if self._llama.llama_vocab_is_eog(self._model.vocab, token):
+                self._finish(seq_id, sequences)
+                continue
+            self.tokens_generated += 1
+            sequence.generated += 1
+            text = sequence.decoder.decode(self._model.detokenize([token]))
+            if text:
+                sequence.request.emit(text)
+            if sequence.generated >= sequence.request.max_tokens or len(sequence.fed) >= self.n_ctx:
+                self._finish(seq_id, sequences)
+            else:
+                sequence.feed = [token]
+
+    def _finish(self, seq_id: int, sequences: dict, keep: bool = True, emit: bool = True):
+        """
+        Ends a sequence and frees its slot.
+
+        Args:
+            keep: Leave its tokens in the KV cache for the next request to share a prefix with
+            emit: Tell the client the answer is complete
+        """
+        sequence = sequences.pop(seq_id)
+        self._llama.llama_sampler_free(sequence.sampler)
+        if keep:
+            self._cached[seq_id] = sequence.fed
+        else:
+            self._llama.llama_memory_seq_rm(self._context.memory, seq_id, -1, -1)
+        if emit and not sequence.request.cancelled:
+            tail = sequence.decoder.decode(b"", final=True)
+            if tail:
+                sequence.request.emit(tail)
+            sequence.request.emit(_DONE)
+
+    async def stream(self, model: str, messages: list, temperature: float, max_tokens: int):
+        request = _LocalRequest(messages, temperature, max_tokens, asyncio.get_running_loop())
+        self._ensure_worker()
+        self._pending.put(request)
+        try:
+            while True:
+                item = await request.output.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            request.cancelled = True
+
+    async def aclose(self):
+        self._pending.put(None)
+
+    def stats(self) -> dict:
+        return {
+            "model_path": self.model_path,
+            "threads": self.threads,
+            "slots": self.slots,
+            "batch": self.batch_size,
+            "loaded": self._context is not None,
+            "queued": self._pending.qsize(),
+            "tokens_generated": self.tokens_generated,
+            "prompt_tokens_reused": self.prompt_tokens_reused,
+            "decode_calls": self.decode_calls,
+        }
@@ -0,0 +1,178 @@
+"""
+Cache Service
+In-memory TTL + LRU cache with stale-while-revalidate refresh and
+coalescing of identical concurrent misses.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used in cache keys."""
+    return " ".join(text.lower().split())
+
+
+class TTLCache:
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300.0, stale_ttl: float = 0.0):
+        """
+        Args:
+            name: Label reported in stats()
+            maxsize: Maximum number of entries kept (least recently used are evicted)
+            ttl: Seconds an entry is served as fresh
+            stale_ttl: Extra seconds an expired entry is still served while it is
+                refreshed in the background
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._inflight = {}  # key -> asyncio.Task loading that key
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def set(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, key, loader):
+        """
+        Returns the cached value for key, calling loader() on a miss.
+
+        Args:
+            key: Hashable cache key
+            loader: Zero-argument coroutine function producing the value
+
+        Returns:
+            The cached or freshly loaded value. Loader exceptions propagate to
+            every caller waiting on that load and nothing is cached.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self._start_load(key, loader)
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start_load(key, loader)
+
+        # Shield so one caller disconnecting does not cancel the shared load
+        return await asyncio.shield(task)
+
+    def _start_load(self, key, loader) -> asyncio.Task:
+        task = asyncio.ensure_future(loader())
+        self._inflight[key] = task
+
+        def _finish(done: asyncio.Task):
+            self._inflight.pop(key, None)
+            if not done.cancelled() and done.exception() is None:
+                self.set(key, done.result())
+
+        task.add_done_callback(_finish)
+        return task
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.stale_hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SizedLRUCache:
+    def __init__(self, name: str, max_bytes: int = 64 * 1024 * 1024, ttl: float = 86400.0,
+                 max_entry_bytes: int = 256 * 1024):
+        """
+        LRU cache of text values bounded by total encoded size rather than entry count.
+
+        Args:
+            name: Label reported in stats()
+            max_bytes: Total UTF-8 size of cached values before eviction kicks in
+            ttl: Seconds an entry stays valid
+            max_entry_bytes: Values larger than this are never cached
+        """
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, size, stored_at = entry
+            if time.monotonic() - stored_at < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            self._remove(key)
+        self.misses += 1
+        return None
+
+    def set(self, key, value: str) -> bool:
+        size = len(value.encode("utf-8"))
+        if size > self.max_entry_bytes:
+            return False
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, size, time.monotonic())
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return True
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
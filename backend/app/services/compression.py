@@ -0,0 +1,143 @@
+"""
+Response Compression
+Streaming-safe gzip and brotli for students on metered 2G/3G data, chosen per
+request from Accept-Encoding (brotli needs the optional brotli package).
+
+Streamed bodies (answer text, SSE) are flushed after every chunk, so each
+token still reaches the client the moment it is generated, while one
+compressor spans the whole stream: the repeated "event: token" framing and
+words already sent cost a few bytes each time. Whole bodies smaller than
+COMPRESSION_MIN_SIZE are sent as they are.
+"""
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Brotli's dense high qualities are too slow to run per token
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+COMPRESSIBLE_TYPES = ("text/", "application/json")
+
+# Most effective first
+ENCODINGS = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts (q > 0), or None for identity."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Z_SYNC_FLUSH ends on a byte boundary: everything so far can be decoded now
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+COMPRESSORS = {"gzip": _Gzip, "br": _Brotli}
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware, like MetricsMiddleware: it compresses each body
+    message as it passes instead of buffering the response.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message  # held until the first body message shows the response's size
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                content_type = headers.get("content-type", "")
+                if ("content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES)
+                        or (not more_body and len(body) < self.minimum_size)):
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                compressor = COMPRESSORS[encoding]()
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                if not more_body:
+                    data = compressor.finish(body)
+                    headers["Content-Length"] = str(len(data))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send(start)
+                start = None
+            elif compressor is None:
+                await send(message)
+                return
+
+            data = compressor.chunk(body) if more_body else compressor.finish(body)
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
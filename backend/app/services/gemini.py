@@ -2,77 +2,215 @@
 LLM Service
 Handles interactions with Groq API (replacing Gemini).
 """
+import asyncio
 import os
-from groq import AsyncGroq
-from dotenv import load_dotenv
+from collections import Counter
 
-# Load environment variables
-load_dotenv()
+import groq
+from app.services.admission import admission, estimate_tokens, AdmissionRejected
+from app.services.backends import GroqBackend, LocalBackend, LOCAL_MODEL_PATH
+from app.services.metrics import llm_errors, llm_first_token, llm_latency, timer
+from app.services.resilience import CircuitBreaker, backoff_delay
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# "groq" (hosted) or "local" (GGUF model on this machine's CPU)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq").lower()
+# Preferred model first; later models are fallbacks under saturation or failure
+DEFAULT_MODELS = os.path.basename(LOCAL_MODEL_PATH) if LLM_BACKEND == "local" else "llama-3.3-70b-versatile,llama-3.1-8b-instant"
+LLM_MODELS = [m.strip() for m in os.getenv("LLM_MODELS", DEFAULT_MODELS).split(",") if m.strip()] or ["local"]
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+# Transient failures worth retrying on the same model
+RETRYABLE_ERRORS = (groq.APIConnectionError, groq.InternalServerError)
+
+
+class GenerationError(str):
+    """
+    In-band error text yielded by generate_content_stream.
+    Still a plain str for the client, but lets callers tell it apart from answer tokens.
+    """
+
+
+def _is_upstream_fault(error: Exception) -> bool:
+    """Errors that say the model is unhealthy, as opposed to a bad request (400, 401, ...)."""
+    if isinstance(error, groq.APIStatusError):
+        return isinstance(error, (groq.RateLimitError, groq.InternalServerError))
+    return True
+
+
+def create_backend():
+    """Builds the configured backend, or returns None (with a warning) if it cannot run."""
+    if LLM_BACKEND == "local":
+        try:
+            return LocalBackend()
+        except RuntimeError as e:
+            print(f"WARNING: local LLM backend unavailable: {e}")
+            return None
+
+    if not GROQ_API_KEY:
+        print("WARNING: GROQ_API_KEY not found in environment variables.")
+        return None
+    return GroqBackend(api_key=GROQ_API_KEY, timeout=LLM_TIMEOUT)
+
 
 class LLMService:
-    def __init__(self):
-        if not GROQ_API_KEY:
-            print("WARNING: GROQ_API_KEY not found in environment variables.")
-            self.client = None
-        else:
-            self.client = AsyncGroq(api_key=GROQ_API_KEY)
-            self.model = "llama-3.3-70b-versatile"  # High performance model
+    def __init__(self, backend=None):
+        self.backend = backend or create_backend()
+        self.models = LLM_MODELS
+        self.model = self.models[0]  # High performance model
+        self.max_tokens = 1024
+        self.max_retries = LLM_MAX_RETRIES
+        self.breakers = {
+            model: CircuitBreaker(model, LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET) for model in self.models
+        }
+        self.retries = Counter()
+        self.saturation_fallbacks = Counter()
+        self.failure_fallbacks = Counter()
+
+    async def admit(self, system_prompt: str, user_prompt: str, history: list = None):
+        """
+        Waits for an admission slot for one generation, picking the first model
+        in the chain whose breaker is closed and that has free capacity.
+
+        Returns:
+            A Ticket to pass to generate_content_stream, which releases it
+
+        Raises:
+            AdmissionRejected: when the service is saturated or every model is failing
+        """
+        tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt) + self.max_tokens
+        tokens += sum(estimate_tokens(message["content"]) for message in history or ())
+
+        candidates = [model for model in self.models if self.breakers[model].available]
+        if not candidates:
+            retry_after = min(breaker.retry_after() for breaker in self.breakers.values())
+            raise AdmissionRejected("All models are temporarily unavailable", retry_after)
+
+        # Fall back to a smaller model rather than queue behind a saturated one
+        model = next((m for m in candidates if not admission.saturated(m)), candidates[0])
+        if model != self.model:
+            # Skipped because its breaker is open, or because it is busy
+            fallbacks = self.failure_fallbacks if self.model not in candidates else self.saturation_fallbacks
+            fallbacks[model] += 1
+        return await admission.admit(model, tokens)
 
     async def generate_content(self, system_prompt: str, user_prompt: str) -> str:
         """
         Generates content using Groq (Llama 3.3).
         """
-        if not self.client:
+        if not self.backend:
             return "Error: GROQ_API_KEY is missing. Please configure it in the .env file."
-        
-        try:
-            chat_completion = await self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": user_prompt,
-                    }
-                ],
-                model=self.model,
-                temperature=0.7,
-                max_tokens=1024,
-            )
-            return chat_completion.choices[0].message.content
-        except Exception as e:
-            return f"Error generating response: {str(e)}"
-
-    async def generate_content_stream(self, system_prompt: str, user_prompt: str):
+
+        ticket = await self.admit(system_prompt, user_prompt)
+        chunks = [chunk async for chunk in self.generate_content_stream(system_prompt, user_prompt, ticket)]
+        return "".join(chunks)
+
+    def _stream(self, model: str, messages: list):
+        return self.backend.stream(model, messages, temperature=0.7, max_tokens=self.max_tokens)
+
+    async def generate_content_stream(self, system_prompt: str, user_prompt: str, ticket=None, history: list = None):
         """
-        Generates streaming content using Groq.
+        Generates streaming content using the configured backend (Groq by default).
+
+        Failures before the first token are retried with jittered backoff and
+        then handed to the next model in the chain, which is admitted like a new
+        request when a ticket was given; once text has been sent the error is
+        reported in-band as a GenerationError.
+
+        Args:
+            ticket: Admission ticket from admit(); released when the stream ends
+            history: Earlier conversation as chat messages, sent between the system prompt and the question
         """
-        if not self.client:
-            yield "Error: GROQ_API_KEY is missing."
+        if not self.backend:
+            if ticket:
+                ticket.release(0)
+            yield GenerationError("Error: GROQ_API_KEY is missing." if LLM_BACKEND == "groq" else "Error: the local model is not available.")
             return
 
+        messages = [
+            {"role": "system", "content": system_prompt},
+            *(history or ()),
+            {"role": "user", "content": user_prompt}
+        ]
+        first_model = ticket.model if ticket else self.model
+        chain = self.models[self.models.index(first_model):] if first_model in self.models else [first_model]
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        admitted = ticket is not None
+
+        streamed = 0
+        error = "no model is currently available"
         try:
-            stream = await self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                model=self.model,
-                temperature=0.7,
-                max_tokens=1024,
-                stream=True,
-            )
-
-            async for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
-
-        except Exception as e:
-            yield f"Error generating response: {str(e)}"
+            for model in chain:
+                breaker = self.breakers.get(model) or self.breakers.setdefault(model, CircuitBreaker(model))
+                if not breaker.allow():
+                    continue
+                if model != first_model:
+                    self.failure_fallbacks[model] += 1
+                    if admitted:
+                        # The fallback has its own limits: queue for it like a new request
+                        ticket.release(prompt_tokens)
+                        ticket = None
+                        try:
+                            ticket = await admission.admit(model, prompt_tokens + self.max_tokens)
+                        except AdmissionRejected as e:
+                            error = e
+                            break
+
+                settled = False
+                try:
+                    for attempt in range(self.max_retries + 1):
+                        if attempt:
+                            self.retries[model] += 1
+                            await asyncio.sleep(backoff_delay(attempt - 1))
+                        called = timer()
+                        first = True
+                        try:
+                            async for text in self._stream(model, messages):
+                                if first:
+                                    llm_first_token.observe(model, value=timer() - called)
+                                    first = False
+                                streamed += len(text)
+                                yield text
+                            llm_latency.observe(model, "ok", value=timer() - called)
+                            breaker.record_success()
+                            settled = True
+                            return
+                        except Exception as e:
+                            llm_latency.observe(model, "error", value=timer() - called)
+                            llm_errors.inc(model, type(e).__name__)
+                            error = e
+                            if not _is_upstream_fault(e):
+                                break
+                            breaker.record_failure()
+                            settled = True
+                            if streamed or not isinstance(e, RETRYABLE_ERRORS) or breaker.state == breaker.OPEN:
+                                break
+                finally:
+                    if not settled:
+                        breaker.record_abandoned()
+
+                # Never switch models half way through an answer, or for a bad request
+                if streamed or not _is_upstream_fault(error):
+                    break
+
+            yield GenerationError(f"Error generating response: {str(error)}")
+        finally:
+            if ticket:
+                ticket.release(prompt_tokens + streamed // 4)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name if self.backend else None,
+            "models": self.models,
+            "breakers": {model: breaker.stats() for model, breaker in self.breakers.items()},
+            "retries": dict(self.retries),
+            "saturation_fallbacks": dict(self.saturation_fallbacks),
+            "failure_fallbacks": dict(self.failure_fallbacks),
+            "admission": admission.stats(),
+        }
 
 # Singleton instance (keeping the name gemini_service to avoid refactoring all routers)
 gemini_service = LLMService()
@@ -0,0 +1,127 @@
+"""
+HTTP Pools
+One long-lived, tuned httpx connection pool per upstream (SerpApi, Groq),
+shared by every request. HTTP/2 is used when the optional h2 package is
+installed, so concurrent calls to one upstream multiplex over a single TLS
+connection. The app lifespan warms the pools (DNS, TCP and TLS to every
+configured upstream) at startup and closes them on shutdown.
+"""
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401 - only needed by httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP2 = os.getenv("HTTP2", "1") == "1" and HTTP2_AVAILABLE
+# Idle connections kept open this long (httpx's default of 5s drops them between most requests)
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_WARMUP_TIMEOUT = float(os.getenv("HTTP_WARMUP_TIMEOUT", "5"))
+
+
+class Upstream:
+    __slots__ = ("name", "base_url", "timeout", "max_connections", "warm", "client", "warmed_ms", "warm_error")
+
+    def __init__(self, name: str, base_url: str, timeout: float, max_connections: int, warm: bool):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.warm = warm
+        self.client = None
+        self.warmed_ms = None
+        self.warm_error = None
+
+
+class HTTPPools:
+    def __init__(self):
+        self._upstreams = {}  # name -> Upstream
+        self._warming = None
+
+    def register(self, name: str, base_url: str, timeout: float, max_connections: int = 20, warm: bool = True):
+        """
+        Declares an upstream; its pool is created on first use.
+
+        Args:
+            name: Key for client(), e.g. "serpapi"
+            base_url: Scheme and host every request goes to
+            timeout: Default read/write/pool timeout in seconds
+            max_connections: Connection (HTTP/1.1) or stream (HTTP/2) cap
+            warm: Connect at startup; False for upstreams that aren't configured
+        """
+        self._upstreams[name] = Upstream(name, base_url, timeout, max_connections, warm)
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        """
+        The shared client of an upstream.
+
+        Raises:
+            KeyError: The upstream was never registered
+        """
+        upstream = self._upstreams[name]
+        # Created lazily so the pool is bound to the running event loop
+        if upstream.client is None or upstream.client.is_closed:
+            upstream.client = httpx.AsyncClient(
+                base_url=upstream.base_url,
+                http2=HTTP2,
+                limits=httpx.Limits(
+                    max_connections=upstream.max_connections,
+                    max_keepalive_connections=upstream.max_connections,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(upstream.timeout, connect=min(upstream.timeout, HTTP_CONNECT_TIMEOUT)),
+            )
+        return upstream.client
+
+    async def _warm_one(self, upstream: Upstream):
+        started = time.perf_counter()
+        try:
+            # Any response will do: the point is a resolved, handshaken connection left in the pool
+            await asyncio.wait_for(self.client(upstream.name).head("/"), HTTP_WARMUP_TIMEOUT)
+            upstream.warmed_ms = round((time.perf_counter() - started) * 1000, 1)
+            upstream.warm_error = None
+        except (httpx.HTTPError, asyncio.TimeoutError, OSError) as e:
+            upstream.warm_error = type(e).__name__
+
+    async def warm(self):
+        """Connects to every configured upstream concurrently; failures only show in stats()."""
+        await asyncio.gather(*(self._warm_one(upstream) for upstream in self._upstreams.values() if upstream.warm))
+
+    def start(self):
+        """Warms the pools in the background (from the app lifespan), so startup never waits on an upstream."""
+        self._warming = asyncio.create_task(self.warm())
+
+    async def aclose(self):
+        if self._warming is not None:
+            self._warming.cancel()
+            self._warming = None
+        for upstream in self._upstreams.values():
+            if upstream.client is not None:
+                await upstream.client.aclose()
+                upstream.client = None
+
+    def stats(self) -> dict:
+        return {
+            "http2": HTTP2,
+            "keepalive_expiry": HTTP_KEEPALIVE_EXPIRY,
+            "upstreams": {
+                upstream.name: {
+                    "host": urlsplit(upstream.base_url).netloc,
+                    "open": upstream.client is not None and not upstream.client.is_closed,
+                    "warmed_ms": upstream.warmed_ms,
+                    "warm_error": upstream.warm_error,
+                }
+                for upstream in self._upstreams.values()
+            },
+        }
+
+
+# Singleton instance
+http_pools = HTTPPools()
@@ -0,0 +1,540 @@
+"""
+Ingest Pipeline
+Chunks a corpus of GCE syllabi, textbooks and past papers and writes it into
+the retrieval index (see app/services/retrieval.py).
+
+Corpus layout, one folder per subject slug and level:
+
+    corpus/<subject>/<OL|AL|ALL>/**/*.txt|.md|.pdf
+
+ALL documents are indexed for both levels. PDFs need the optional pypdf package.
+
+Runs are incremental. Every document is fingerprinted by content hash
+(SHA-256, recomputed only when its size or mtime changed), and only new or
+changed documents are re-chunked and re-embedded, in a process pool with a
+bounded number of documents in flight. Their chunks are appended to the
+index as new segments; the old versions are hidden through the manifest's
+"removed" ids, and a background compaction merges a partition's segments
+once it has too many or too much of it is removed.
+
+Usage (from backend/):
+    python -m app.services.ingest corpus/ --index data/index --workers 4
+    python -m app.services.ingest corpus/ --watch 300    # pick up new past papers as they land
+    python -m app.services.ingest corpus/ --full         # re-embed everything, e.g. after changing --dim
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+from app.services.lexical import postings_from_texts, write_postings
+from app.services.retrieval import (
+    Embedder, MANIFEST, META_DTYPE, RAG_EMBED_DIM, RAG_INDEX_DIR, SEGMENT_FILES, Segment, write_header, write_segment,
+)
+
+RAG_CHUNK_WORDS = int(os.getenv("RAG_CHUNK_WORDS", "180"))
+RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "30"))
+RAG_INGEST_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", str(os.cpu_count() or 1)))
+# Chunks per appended segment; also bounds what a run buffers per partition
+RAG_SEGMENT_CHUNKS = int(os.getenv("RAG_SEGMENT_CHUNKS", "20000"))
+# Compact a partition with more segments than this...
+RAG_COMPACT_SEGMENTS = int(os.getenv("RAG_COMPACT_SEGMENTS", "8"))
+# ...or with more than this share of its chunks removed
+RAG_COMPACT_REMOVED = float(os.getenv("RAG_COMPACT_REMOVED", "0.2"))
+
+LEVELS = ("OL", "AL")
+TEXT_EXTENSIONS = (".txt", ".md")
+_PARAGRAPH = re.compile(r"\n\s*\n")
+_manifest_lock = threading.Lock()
+
+
+def read_pages(path: str):
+    """Yields the text of a document page by page (a text file is one page)."""
+    if path.lower().endswith(".pdf"):
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise RuntimeError("pypdf is not installed; run `pip install pypdf` to ingest PDFs")
+        for page in PdfReader(path).pages:
+            yield page.extract_text() or ""
+    else:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield f.read()
+
+
+def chunk_words(pages, size: int = RAG_CHUNK_WORDS, overlap: int = RAG_CHUNK_OVERLAP):
+    """
+    Splits text into chunks of about size words, breaking at paragraph ends
+    where possible and repeating the last overlap words of each chunk.
+    """
+    window, fresh = [], 0  # fresh: words not yet part of any yielded chunk
+    for page in pages:
+        for paragraph in _PARAGRAPH.split(page):
+            words = paragraph.split()
+            if not words:
+                continue
+            # Flush before a paragraph that would overflow, unless the chunk is still small
+            if window and len(window) + len(words) > size and len(window) >= size // 2:
+                yield " ".join(window)
+                window, fresh = (window[-overlap:] if overlap else []), 0
+            window.extend(words)
+            fresh += len(words)
+            while len(window) >= size:
+                yield " ".join(window[:size])
+                window, fresh = (window[size - overlap:] if overlap else window[size:]), max(len(window) - size, 0)
+    if fresh:
+        yield " ".join(window)
+
+
+def embed_document(path: str, dim: int, size: int = RAG_CHUNK_WORDS, overlap: int = RAG_CHUNK_OVERLAP) -> tuple:
+    """
+    Worker: pages are read and chunked as a stream, so only the chunks of one
+    document (not its extracted text) are held at a time.
+
+    Returns:
+        (chunk texts, (N, dim) float32 embeddings)
+    """
+    embedder = Embedder(dim)
+    texts = list(chunk_words(read_pages(path), size, overlap))
+    return texts, embedder.embed_many(texts)
+
+
+def discover(corpus: str) -> dict:
+    """{(subject, level): [document path, ...]} for every supported file in the corpus."""
+    partitions = {}
+    for subject in sorted(os.listdir(corpus)):
+        subject_dir = os.path.join(corpus, subject)
+        if not os.path.isdir(subject_dir):
+            continue
+        for level_name in sorted(os.listdir(subject_dir)):
+            level_dir = os.path.join(subject_dir, level_name)
+            levels = LEVELS if level_name.upper() == "ALL" else (level_name.upper(),)
+            if not os.path.isdir(level_dir) or not set(levels) <= set(LEVELS):
+                continue
+            for root, _, files in os.walk(level_dir):
+                for name in sorted(files):
+                    if name.lower().endswith(TEXT_EXTENSIONS + (".pdf",)):
+                        for level in levels:
+                            partitions.setdefault((subject, level), []).append(os.path.join(root, name))
+    return partitions
+
+
+def fingerprint(path: str, known: dict = None) -> dict:
+    """Size, mtime and SHA-256 of a file; the hash is reused while size and mtime are unchanged."""
+    stat = os.stat(path)
+    if known and known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": known["sha256"]}
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+
+
+@contextmanager
+def _file_lock(path: str, blocking: bool = True):
+    with open(path, "a") as f:
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                raise RuntimeError(f"{path} is held by another ingest run")
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def manifest_lock(index_dir: str):
+    """Serializes read-modify-write of the manifest between ingest and compaction, in and across processes."""
+    with _manifest_lock, _file_lock(os.path.join(index_dir, ".manifest.lock")):
+        yield
+
+
+def read_manifest(index_dir: str) -> dict:
+    try:
+        with open(os.path.join(index_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def publish_manifest(index_dir: str, manifest: dict):
+    """Atomically replaces the manifest, which is what makes running servers switch segments."""
+    manifest["generation"] = manifest.get("generation", 0) + 1
+    path = os.path.join(index_dir, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+def remove_segments(index_dir: str, names):
+    for name in names:
+        for extension in SEGMENT_FILES:
+            try:
+                os.remove(os.path.join(index_dir, name + extension))
+            except FileNotFoundError:
+                pass
+
+
+def new_segment_name(subject: str, level: str) -> str:
+    # Random rather than sequential, so ingest and compaction never need to agree on a counter
+    return f"{subject}/{level}/seg-{uuid.uuid4().hex[:12]}"
+
+
+class SegmentWriter:
+    """Buffers embedded chunks per partition and writes a segment whenever one fills up."""
+
+    def __init__(self, index_dir: str, dtype: str, segment_chunks: int = RAG_SEGMENT_CHUNKS):
+        self.index_dir = index_dir
+        self.dtype = dtype
+        self.segment_chunks = segment_chunks
+        self.buffers = {}  # (subject, level) -> {"vectors", "texts", "chunks", "documents"}
+        self.written = []
+
+    def add(self, partition: tuple, document: dict, texts: list, vectors: np.ndarray):
+        buffer = self.buffers.setdefault(partition, {"vectors": [], "texts": [], "chunks": [], "documents": []})
+        doc = len(buffer["documents"])
+        buffer["documents"].append(document)
+        buffer["vectors"].append(vectors)
+        buffer["texts"].extend(texts)
+        buffer["chunks"].extend((doc, position) for position in range(len(texts)))
+        if len(buffer["texts"]) >= self.segment_chunks:
+            self.flush(partition)
+        # Many partitions filling slowly at once: write the biggest one early
+        elif sum(len(b["texts"]) for b in self.buffers.values()) >= 2 * self.segment_chunks:
+            self.flush(max(self.buffers, key=lambda p: len(self.buffers[p]["texts"])))
+
+    def flush(self, partition: tuple):
+        buffer = self.buffers.pop(partition, None)
+        if not buffer or not buffer["texts"]:
+            return
+        name = new_segment_name(*partition)
+        os.makedirs(os.path.join(self.index_dir, *partition), exist_ok=True)
+        write_segment(os.path.join(self.index_dir, name), np.concatenate(buffer["vectors"]), buffer["texts"],
+                      buffer["chunks"], buffer["documents"], self.dtype)
+        self.written.append(name)
+
+    def close(self) -> list:
+        for partition in list(self.buffers):
+            self.flush(partition)
+        return self.written
+
+
+class Progress:
+    def __init__(self, documents: int, interval: float = 2.0):
+        self.documents = documents
+        self.interval = interval
+        self.done = 0
+        self.chunks = 0
+        self.started = time.perf_counter()
+        self._printed = self.started
+
+    @property
+    def rate(self) -> float:
+        return self.chunks / max(time.perf_counter() - self.started, 1e-9)
+
+    def update(self, chunks: int):
+        self.done += 1
+        self.chunks += chunks
+        now = time.perf_counter()
+        if now - self._printed >= self.interval or self.done == self.documents:
+            self._printed = now
+            print(f"  {self.done}/{self.documents} documents, {self.chunks} chunks, {self.rate:.0f} chunks/s", flush=True)
+
+
+def _embedded(jobs: list, dim: int, workers: int):
+    """
+    Yields (job, texts, vectors, error) as documents finish. At most 2 x workers
+    documents are in flight, which bounds memory however large the corpus is.
+    """
+    if workers <= 1:
+        for job in jobs:
+            try:
+                yield (job, *embed_document(job["path"], dim), None)
+            except Exception as e:
+                yield job, None, None, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        queue = iter(jobs)
+        pending = {}
+
+        def submit():
+            job = next(queue, None)
+            if job is not None:
+                pending[pool.submit(embed_document, job["path"], dim)] = job
+
+        for _ in range(2 * workers):
+            submit()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = pending.pop(future)
+                submit()
+                try:
+                    yield (job, *future.result(), None)
+                except Exception as e:
+                    yield job, None, None, e
+
+
+def ingest(corpus: str, index_dir: str = RAG_INDEX_DIR, dtype: str = "int8", dim: int = RAG_EMBED_DIM,
+           workers: int = RAG_INGEST_WORKERS, full: bool = False, segment_chunks: int = RAG_SEGMENT_CHUNKS) -> dict:
+    """
+    Brings the index up to date with the corpus, embedding only new and changed documents.
+
+    Args:
+        full: Ignore fingerprints and rebuild every segment (needed to change dim or dtype)
+
+    Returns:
+        {"documents", "embedded", "unchanged", "removed", "failed", "chunks", "seconds", "chunks_per_second"}
+    """
+    started = time.perf_counter()
+    os.makedirs(index_dir, exist_ok=True)
+    with _file_lock(os.path.join(index_dir, ".ingest.lock"), blocking=False):
+        with manifest_lock(index_dir):
+            previous = read_manifest(index_dir)
+        if previous.get("segments") and not full and (previous.get("dim"), previous.get("dtype")) != (dim, dtype):
+            raise ValueError(f"index was built with dim={previous.get('dim')} dtype={previous.get('dtype')}; "
+                             f"rerun with --full to rebuild it with dim={dim} dtype={dtype}")
+        # Indexes written before fingerprinting have nothing to compare against
+        full = full or "documents" not in previous
+        known = {} if full else previous["documents"]
+
+        sources = {}
+        for (subject, level), paths in discover(corpus).items():
+            for path in paths:
+                source = os.path.relpath(path, corpus).replace(os.sep, "/")
+                sources.setdefault(source, {"path": path, "partitions": []})["partitions"].append((subject, level))
+
+        documents, jobs = {}, []
+        for source, job in sources.items():
+            job["source"] = source
+            job["fingerprint"] = fingerprint(job["path"], known.get(source))
+            if source in known and known[source]["sha256"] == job["fingerprint"]["sha256"]:
+                documents[source] = {**known[source], **job["fingerprint"]}
+            else:
+                jobs.append(job)
+
+        print(f"{len(sources)} documents, {len(jobs)} to embed with {workers} worker(s)", flush=True)
+        writer = SegmentWriter(index_dir, dtype, segment_chunks)
+        progress = Progress(len(jobs))
+        failed = 0
+        for job, texts, vectors, error in _embedded(jobs, dim, workers):
+            source = job["source"]
+            if error is not None:
+                failed += 1
+                print(f"  skipped {source}: {error}", flush=True)
+                if source in known:
+                    documents[source] = known[source]  # keep serving the previous version
+                progress.update(0)
+                continue
+            document_id = uuid.uuid4().hex[:16]
+            title = os.path.splitext(os.path.basename(source))[0].replace("_", " ")
+            for partition in job["partitions"]:
+                writer.add(partition, {"source": source, "title": title, "id": document_id}, texts, vectors)
+            documents[source] = {**job["fingerprint"], "id": document_id, "chunks": len(texts)}
+            progress.update(len(texts) * len(job["partitions"]))
+        written = writer.close()
+
+        # Changed and deleted documents: hide the old chunks until compaction drops them
+        removed = {entry["id"] for source, entry in known.items() if documents.get(source, {}).get("id") != entry["id"]}
+        with manifest_lock(index_dir):
+            manifest = read_manifest(index_dir)
+            replaced = manifest.get("segments", []) if full else []
+            manifest.update({
+                "dim": dim,
+                "dtype": dtype,
+                "segments": [name for name in manifest.get("segments", []) if name not in replaced] + written,
+                "removed": [] if full else sorted(set(manifest.get("removed", [])) | removed),
+                "documents": documents,
+            })
+            publish_manifest(index_dir, manifest)
+        # Servers still holding the old segments keep their mappings; unlinking is safe
+        remove_segments(index_dir, replaced)
+
+    seconds = time.perf_counter() - started
+    return {
+        "documents": len(documents),
+        "embedded": len(jobs) - failed,
+        "unchanged": len(sources) - len(jobs),
+        "removed": len(set(known) - set(sources)),
+        "failed": failed,
+        "chunks": progress.chunks,
+        "seconds": seconds,
+        "chunks_per_second": progress.rate,
+    }
+
+
+def merge_segments(prefix: str, segments: list, block: int = 65536) -> int:
+    """
+    Writes the live chunks of segments into one new segment at prefix,
+    copying the quantized vectors, sign bits, texts and postings as they are.
+    Vectors and texts are copied block by block; the postings of the merged
+    segment are held in memory while they are re-sorted.
+
+    Returns:
+        Number of chunks written (0 writes nothing)
+    """
+    rows = [segment.live_rows() for segment in segments]
+    total = sum(len(live) for live in rows)
+    if not total:
+        return 0
+    dim, dtype = segments[0].dim, segments[0].dtype
+    vectors = np.memmap(prefix + ".vec", dtype=segments[0].vectors.dtype, mode="w+", shape=(total, dim))
+    bits = np.memmap(prefix + ".bits", dtype=np.uint64, mode="w+", shape=(dim // 64, total))
+    meta = np.memmap(prefix + ".meta", dtype=META_DTYPE, mode="w+", shape=(total,))
+    documents, start, offset = [], 0, 0
+    postings, lengths = [], []
+    with open(prefix + ".txt", "wb") as text_file:
+        for segment, live in zip(segments, rows):
+            postings.append(_live_postings(segment, live, start))
+            lengths.append(np.asarray(segment.lengths[live]) if segment.tokens is not None else postings[-1][3])
+            # Old document index -> index in the merged header
+            kept = np.unique(segment.meta["doc"][live])
+            remap = np.zeros(len(segment.documents), dtype=np.uint32)
+            remap[kept] = np.arange(len(documents), len(documents) + len(kept), dtype=np.uint32)
+            documents.extend(segment.documents[i] for i in kept.tolist())
+            for first in range(0, len(live), block):
+                part = live[first:first + block]
+                end = start + len(part)
+                vectors[start:end] = segment.vectors[part]
+                bits[:, start:end] = segment.bits[:, part]
+                records = np.array(segment.meta[part])
+                for record_offset, length in zip(records["offset"].tolist(), records["length"].tolist()):
+                    text_file.write(segment.text_blob[record_offset:record_offset + length].tobytes())
+                records["doc"] = remap[records["doc"]]
+                records["offset"] = offset + np.concatenate(([0], np.cumsum(records["length"], dtype=np.uint64)[:-1]))
+                offset += int(records["length"].sum(dtype=np.uint64))
+                meta[start:end] = records
+                start = end
+    for array in (vectors, bits, meta):
+        array.flush()
+    del vectors, bits, meta
+    lengths = np.concatenate(lengths)
+    write_postings(prefix, *(np.concatenate([part[i] for part in postings]) for i in range(3)), lengths)
+    write_header(prefix, total, dim, dtype, documents, int(lengths.sum(dtype=np.int64)))
+    return total
+
+
+def _live_postings(segment: Segment, live: np.ndarray, first_row: int) -> tuple:
+    """(term hashes, merged rows, frequencies, lengths) of a segment's live chunks, renumbered from first_row."""
+    if segment.tokens is None:
+        # Written before BM25 existed: index its texts now
+        hashes, rows, frequencies, lengths = postings_from_texts([segment.chunk(row)["text"] for row in live.tolist()])
+        return hashes, rows + np.uint32(first_row), frequencies, lengths
+    hashes, rows, frequencies = segment.all_postings()
+    renumber = np.full(segment.count, -1, dtype=np.int64)
+    renumber[live] = np.arange(first_row, first_row + len(live))
+    keep = renumber[rows] >= 0
+    return hashes[keep], renumber[rows[keep]].astype(np.uint32), frequencies[keep], None
+
+
+def compact(index_dir: str = RAG_INDEX_DIR, max_segments: int = RAG_COMPACT_SEGMENTS,
+            max_removed: float = RAG_COMPACT_REMOVED) -> list:
+    """
+    Merges the segments of every partition that has more than max_segments of
+    them or more than max_removed of its chunks removed. Ingest can keep
+    appending meanwhile; a merge is only published if its inputs are still live.
+
+    Returns:
+        The partitions that were compacted, as "subject/level"
+    """
+    with manifest_lock(index_dir):
+        manifest = read_manifest(index_dir)
+    removed = set(manifest.get("removed", []))
+    partitions = {}
+    for name in manifest.get("segments", []):
+        partitions.setdefault(name.rsplit("/", 1)[0], []).append(name)
+
+    compacted = []
+    for partition, names in partitions.items():
+        segments = [Segment(os.path.join(index_dir, name)) for name in names]
+        for segment in segments:
+            segment.set_removed(removed)
+        total = sum(segment.count for segment in segments)
+        dead = sum(segment.removed_chunks for segment in segments)
+        # Segments from before BM25 also get their inverted index this way
+        if len(names) <= max_segments and dead <= max_removed * total and all(s.tokens is not None for s in segments):
+            continue
+
+        merged = new_segment_name(*partition.split("/"))
+        count = merge_segments(os.path.join(index_dir, merged), segments)
+        del segments
+        with manifest_lock(index_dir):
+            current = read_manifest(index_dir)
+            live = current.get("segments", [])
+            if not set(names) <= set(live):
+                # A --full rebuild replaced them while we were merging
+                remove_segments(index_dir, [merged])
+                continue
+            current["segments"] = [name for name in live if name not in names] + ([merged] if count else [])
+            current["removed"] = sorted(set(current.get("removed", [])) & _referenced_ids(index_dir, current["segments"]))
+            publish_manifest(index_dir, current)
+        remove_segments(index_dir, names)
+        compacted.append(partition)
+        print(f"compacted {partition}: {len(names)} segments, {total} chunks -> 1 segment, {count} chunks", flush=True)
+    return compacted
+
+
+def _referenced_ids(index_dir: str, names: list) -> set:
+    """Document ids that still have chunks in some segment; removed ids outside it can be forgotten."""
+    referenced = set()
+    for name in names:
+        with open(os.path.join(index_dir, name + ".json"), encoding="utf-8") as f:
+            referenced.update(document.get("id") for document in json.load(f)["documents"])
+    return referenced
+
+
+def compact_in_background(index_dir: str = RAG_INDEX_DIR, **kwargs) -> threading.Thread:
+    thread = threading.Thread(target=compact, args=(index_dir,), kwargs=kwargs, name="index-compaction")
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", help="corpus directory: <subject>/<OL|AL|ALL>/documents")
+    parser.add_argument("--index", default=RAG_INDEX_DIR, help="index directory (default RAG_INDEX_DIR)")
+    parser.add_argument("--dtype", choices=["int8", "float16"], default="int8")
+    parser.add_argument("--dim", type=int, default=RAG_EMBED_DIM)
+    parser.add_argument("--workers", type=int, default=RAG_INGEST_WORKERS, help="embedding processes (1 = in-process)")
+    parser.add_argument("--full", action="store_true", help="re-embed every document")
+    parser.add_argument("--no-compact", action="store_true")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="keep ingesting every SECONDS")
+    args = parser.parse_args()
+
+    compaction = None
+    while True:
+        result = ingest(args.corpus, args.index, args.dtype, args.dim, args.workers, args.full)
+        print(f"indexed {result['documents']} documents ({result['embedded']} embedded, {result['unchanged']} unchanged, "
+              f"{result['removed']} removed, {result['failed']} failed), {result['chunks']} chunks "
+              f"in {result['seconds']:.1f} s, {result['chunks_per_second']:.0f} chunks/s", flush=True)
+        # Compaction runs alongside the next ingest; servers keep searching the old segments until it publishes
+        if not args.no_compact and (compaction is None or not compaction.is_alive()):
+            compaction = compact_in_background(args.index)
+        if args.watch is None:
+            break
+        args.full = False
+        time.sleep(args.watch)
+    if compaction is not None:
+        compaction.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Lexical Index
+BM25 over the retrieval corpus, for questions pasted word for word from a
+past paper ("GCE June 2019 Paper 2 Q3"), where embeddings blur the exact wording.
+
+Every index segment (see app/services/retrieval.py) carries its own
+inverted index next to its vectors:
+
+    seg-xxxx.terms   sorted records: term hash, byte offset into .post, document frequency
+    seg-xxxx.post    per term: (row delta, term frequency) pairs as LEB128 varints
+    seg-xxxx.lens    uint16 term count per chunk, for BM25 length normalization
+
+Postings are array-backed and decoded with NumPy, so a lookup is a binary
+search in the memory-mapped .terms plus one vectorized decode per term.
+"""
+import os
+import re
+import zlib
+
+import numpy as np
+
+from app.services.semantic_cache import normalize_question
+
+RAG_BM25_K1 = float(os.getenv("RAG_BM25_K1", "1.2"))
+RAG_BM25_B = float(os.getenv("RAG_BM25_B", "0.75"))
+
+TERM_DTYPE = np.dtype([
+    ("hash", "<u8"),    # term_hash() of the term
+    ("offset", "<u8"),  # first byte of its postings in .post
+    ("df", "<u4"),      # chunks containing the term
+])
+
+# Words that carry no meaning for retrieval
+_STOPWORDS = frozenset(
+    "a an the of to in on at by for from with and or but is are was were be been being it its this that "
+    "these those as what which who whom how why when where do does did can could will would should may "
+    "might must shall i you he she we they me my your his her our their them us not no so if then than "
+    "there here into about over also give explain describe state define".split()
+)
+_WORD = re.compile(r"\w+")
+
+
+def terms(text: str):
+    """Content words plus a five-letter stem, so "oscillation" also matches "oscillating"."""
+    for word in _WORD.findall(normalize_question(text)):
+        if word in _STOPWORDS:
+            continue
+        yield word
+        if len(word) > 6:
+            yield word[:5] + "~"
+
+
+def term_hash(term: str) -> int:
+    data = term.encode("utf-8")
+    return (zlib.crc32(data) << 32) | zlib.adler32(data)
+
+
+def encode_varints(values: np.ndarray) -> np.ndarray:
+    """LEB128: 7 bits per byte, high bit set on every byte but a value's last."""
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        sizes += values >= (1 << shift)
+    starts = np.cumsum(sizes) - sizes
+    data = np.zeros(int(sizes.sum()), dtype=np.uint8)
+    for i in range(int(sizes.max(initial=0))):
+        mask = sizes > i
+        byte = (values[mask] >> np.uint64(7 * i)) & np.uint64(0x7F)
+        more = (sizes[mask] > i + 1).astype(np.uint64) << np.uint64(7)
+        data[starts[mask] + i] = (byte | more).astype(np.uint8)
+    return data
+
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    data = np.asarray(data, dtype=np.uint8)
+    if not len(data):
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    payload = (data & 0x7F).astype(np.uint64) << (7 * shifts).astype(np.uint64)
+    return np.add.reduceat(payload, starts)
+
+
+def postings_from_texts(texts: list) -> tuple:
+    """
+    Returns:
+        (term hashes, rows, term frequencies, per-chunk term counts), one entry per (term, chunk)
+    """
+    tokens = [np.fromiter((term_hash(term) for term in terms(text)), dtype=np.uint64) for text in texts]
+    counts = np.array([len(chunk) for chunk in tokens], dtype=np.int64)
+    if not counts.sum():
+        return np.zeros(0, np.uint64), np.zeros(0, np.uint32), np.zeros(0, np.uint32), counts.astype(np.uint16)
+    hashes = np.concatenate(tokens)
+    rows = np.repeat(np.arange(len(texts), dtype=np.uint32), counts)
+    # One sort for the whole segment; runs of equal (hash, row) are term frequencies
+    order = np.lexsort((rows, hashes))
+    hashes, rows = hashes[order], rows[order]
+    firsts = np.flatnonzero(np.concatenate(([True], (hashes[1:] != hashes[:-1]) | (rows[1:] != rows[:-1]))))
+    frequencies = np.diff(np.concatenate((firsts, [len(hashes)]))).astype(np.uint32)
+    return hashes[firsts], rows[firsts], frequencies, np.minimum(counts, 65535).astype(np.uint16)
+
+
+def write_postings(prefix: str, hashes: np.ndarray, rows: np.ndarray, frequencies: np.ndarray, lengths: np.ndarray):
+    """Writes .terms, .post and .lens for the (term, chunk) entries of one segment."""
+    order = np.lexsort((rows, hashes))
+    hashes, rows, frequencies = hashes[order], rows[order].astype(np.uint64), frequencies[order]
+    firsts = np.flatnonzero(np.concatenate(([True], hashes[1:] != hashes[:-1]))) if len(hashes) else np.zeros(0, np.int64)
+
+    # Rows ascend within a term, so store the gap to the previous one (the first is absolute)
+    deltas = rows.copy()
+    deltas[1:] -= rows[:-1]
+    deltas[firsts] = rows[firsts]
+    pairs = np.column_stack((deltas, frequencies)).ravel()
+    data = encode_varints(pairs)
+
+    # Byte offset of each term's first pair
+    sizes = np.ones(len(pairs), dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        sizes += pairs >= (1 << shift)
+    value_starts = np.cumsum(sizes) - sizes
+
+    table = np.zeros(len(firsts), dtype=TERM_DTYPE)
+    table["hash"] = hashes[firsts]
+    table["offset"] = value_starts[2 * firsts] if len(firsts) else []
+    table["df"] = np.diff(np.concatenate((firsts, [len(hashes)])))
+    table.tofile(prefix + ".terms")
+    data.tofile(prefix + ".post")
+    lengths.astype(np.uint16).tofile(prefix + ".lens")
+
+
+def decode_postings(data: np.ndarray) -> tuple:
+    """(rows, term frequencies) from one term's postings bytes."""
+    pairs = decode_varints(data).reshape(-1, 2)
+    return np.cumsum(pairs[:, 0]).astype(np.uint32), pairs[:, 1].astype(np.float32)
+
+
+def bm25(frequencies: np.ndarray, lengths: np.ndarray, average_length: float, idf: float,
+         k1: float = RAG_BM25_K1, b: float = RAG_BM25_B) -> np.ndarray:
+    norm = k1 * (1 - b + b * lengths / max(average_length, 1e-9))
+    return idf * frequencies * (k1 + 1) / (frequencies + norm)
+
+
+def idf(df: int, count: int) -> float:
+    """BM25 inverse document frequency (the +1 keeps it positive for very common terms)."""
+    return float(np.log(1 + (count - df + 0.5) / (df + 0.5)))
@@ -0,0 +1,314 @@
+"""
+Metrics
+Prometheus-style counters, histograms and scrape-time gauges.
+
+Updates are plain dict/list arithmetic with no locks: every update runs on the
+worker's event loop thread, so there is nothing to contend on. Each uvicorn
+worker keeps its own registry; when METRICS_MULTIPROC_DIR is set, workers
+dump snapshots there and /metrics sums them, so any worker can answer a scrape
+(clear the directory on deploy, like prometheus_client's multiprocess mode).
+"""
+import asyncio
+import bisect
+import glob
+import json
+import math
+import os
+import time
+
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_SNAPSHOT_INTERVAL = float(os.getenv("METRICS_SNAPSHOT_INTERVAL", "5"))
+
+# Label values are joined into one string key so snapshots serialise as JSON
+_SEP = "\x1f"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values = {}  # label values tuple -> float
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def snapshot(self) -> dict:
+        return {_SEP.join(map(str, k)): v for k, v in self.values.items()}
+
+    def render(self, values: dict) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, key.split(_SEP) if key else ())} {_format_value(v)}"
+                for key, v in sorted(values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values tuple -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, *labels, value: float):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        # Per-bucket (non-cumulative) count; cumulated only when rendering
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def snapshot(self) -> dict:
+        return {_SEP.join(map(str, k)): list(v) for k, v in self.values.items()}
+
+    def render(self, values: dict) -> list:
+        lines = []
+        for key, series in sorted(values.items()):
+            labels = key.split(_SEP) if key else ()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Collector:
+    def __init__(self, name: str, documentation: str, labelnames: tuple, collect, kind: str = "gauge"):
+        """
+        Values read from existing service stats at scrape time, so the hot path pays nothing.
+
+        Args:
+            collect: Called at scrape time, returns {label values tuple: value}
+            kind: "gauge", or "counter" for monotonically increasing stats
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.collect = collect
+        self.kind = kind
+
+    def snapshot(self) -> dict:
+        return {_SEP.join(map(str, k)): v for k, v in self.collect().items()}
+
+    render = Counter.render
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, name, documentation, labelnames, collect, kind="gauge") -> Collector:
+        return self._register(Collector(name, documentation, labelnames, collect, kind))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict:
+        snapshot = {}
+        for name, metric in self.metrics.items():
+            try:
+                snapshot[name] = metric.snapshot()
+            except Exception:
+                # A broken gauge callback must not take /metrics down
+                snapshot[name] = {}
+        return snapshot
+
+    def _merged(self) -> dict:
+        if not METRICS_MULTIPROC_DIR:
+            return self.snapshot()
+        self.write_snapshot()
+        merged = {}
+        for path in glob.glob(os.path.join(METRICS_MULTIPROC_DIR, "*.json")):
+            try:
+                with open(path) as f:
+                    worker = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, values in worker.items():
+                target = merged.setdefault(name, {})
+                for key, value in values.items():
+                    if isinstance(value, list):
+                        current = target.setdefault(key, [0] * len(value))
+                        target[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target[key] = target.get(key, 0) + value
+        return merged
+
+    def render(self) -> str:
+        values = self._merged()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(values.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self):
+        if not METRICS_MULTIPROC_DIR:
+            return
+        os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+        path = os.path.join(METRICS_MULTIPROC_DIR, f"{os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + ".tmp", path)
+
+    async def snapshot_loop(self):
+        """Periodically publishes this worker's snapshot for the other workers to merge."""
+        while True:
+            await asyncio.sleep(METRICS_SNAPSHOT_INTERVAL)
+            self.write_snapshot()
+
+
+registry = Registry()
+
+# Request path
+http_requests = registry.counter("lewa_http_requests_total", "HTTP requests by route and status", ("route", "method", "status"))
+http_latency = registry.histogram("lewa_http_request_duration_seconds", "Time until the last byte of the response", ("route", "method"))
+http_errors = registry.counter("lewa_http_exceptions_total", "Unhandled exceptions by route and class", ("route", "error_class"))
+
+# Answers
+answers_served = registry.counter("lewa_answers_total", "Subject answers by source (cache, semantic, coalesced, generated, session)", ("subject", "mode", "source"))
+time_to_first_token = registry.histogram("lewa_time_to_first_token_seconds", "Request start to first streamed chunk", ("subject", "mode"))
+tokens_streamed = registry.counter("lewa_tokens_streamed_total", "Estimated tokens streamed to clients", ("subject", "mode"))
+
+# Upstreams
+llm_latency = registry.histogram("lewa_llm_upstream_seconds", "Duration of upstream LLM generations", ("model", "outcome"))
+llm_first_token = registry.histogram("lewa_llm_first_token_seconds", "Upstream call start to first token", ("model",))
+llm_errors = registry.counter("lewa_llm_errors_total", "Upstream LLM errors by class", ("model", "error_class"))
+search_latency = registry.histogram("lewa_search_seconds", "SerpApi call duration", ("outcome",))
+
+# Rate limiting
+rate_limited = registry.counter("lewa_rate_limited_total", "Requests refused with 429 by route class and reason", ("route_class", "reason"))
+
+
+def timer() -> float:
+    return time.perf_counter()
+
+
+def watch_caches(**caches):
+    """
+    Exports lookups of the named caches (TTLCache, SizedLRUCache, SemanticCache).
+    Hit ratio = sum(rate(hits)) / sum(rate(all results)) per cache.
+    """
+    results = ("hits", "stale_hits", "coalesced", "misses")
+
+    def lookups():
+        values = {}
+        for name, cache in caches.items():
+            stats = cache.stats()
+            for result in results:
+                if result in stats:
+                    values[(name, result)] = stats[result]
+        return values
+
+    def entries():
+        return {(name,): cache.stats()["entries"] for name, cache in caches.items()}
+
+    registry.collector("lewa_cache_lookups_total", "Cache lookups by result", ("cache", "result"), lookups, kind="counter")
+    registry.collector("lewa_cache_entries", "Entries currently cached", ("cache",), entries)
+
+
+def watch_llm(service):
+    """Exports admission queue depth, active generations, breaker states, retries and fallbacks of an LLMService."""
+    from app.services.admission import admission
+
+    def limiters():
+        yield "global", admission.global_limiter
+        yield from admission.model_limiters.items()
+
+    registry.collector("lewa_llm_queue_depth", "Generations waiting for an admission slot", ("limiter",),
+                       lambda: {(name,): limiter.queued for name, limiter in limiters()})
+    registry.collector("lewa_llm_active", "Generations holding an admission slot", ("limiter",),
+                       lambda: {(name,): limiter.active for name, limiter in limiters()})
+    registry.collector("lewa_llm_rejected_total", "Admissions rejected under saturation", ("limiter",),
+                       lambda: {(name,): limiter.rejected for name, limiter in limiters()}, kind="counter")
+    registry.collector("lewa_llm_breaker_open", "1 while a model's circuit breaker is not closed", ("model",),
+                       lambda: {(model,): int(b.state != b.CLOSED) for model, b in service.breakers.items()})
+
+    def fallbacks():
+        values = {("saturation", model): count for model, count in service.saturation_fallbacks.items()}
+        values.update({("failure", model): count for model, count in service.failure_fallbacks.items()})
+        return values
+
+    registry.collector("lewa_llm_retries_total", "Generation attempts retried on the same model", ("model",),
+                       lambda: {(model,): count for model, count in service.retries.items()}, kind="counter")
+    registry.collector("lewa_llm_fallbacks_total", "Generations sent to a fallback model, by why and which model", ("reason", "model"),
+                       fallbacks, kind="counter")
+
+
+def watch_sessions(store):
+    registry.collector("lewa_sessions_active", "Conversation sessions held in memory", (), lambda: {(): len(store)})
+    registry.collector("lewa_sessions_dropped_total", "Sessions dropped by idle expiry or capacity eviction", ("reason",),
+                       lambda: {("expired",): store.expired, ("evicted",): store.evicted}, kind="counter")
+
+
+def _route_name(scope) -> str:
+    # Templated path ("/api/{subject}") keeps label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware buffering, so streams stay
+    streams) recording status, latency to the last byte and exception class.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = timer()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            http_errors.inc(_route_name(scope), type(e).__name__)
+            raise
+        finally:
+            route = _route_name(scope)
+            http_requests.inc(route, scope["method"], status)
+            http_latency.observe(route, scope["method"], value=timer() - started)
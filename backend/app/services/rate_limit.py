@@ -0,0 +1,425 @@
+"""
+Rate Limiting
+Token buckets per client, with separate budgets for each class of route:
+
+    chat       POST /api/chat, /api/<subject>, /api/<subject>/stream   (LLM quota)
+    search     POST /api/research, /api/messenger, GET /api/search   (SerpApi quota)
+    analytics  POST /api/analytics, /api/solve                       (CPU)
+
+Everything else (health, subject list, stream resume, feeds) is free.
+
+A client is its API key (X-API-Key or Authorization: Bearer) when the key is
+one of RATE_LIMIT_API_KEYS; unknown keys are ignored. Otherwise it is its
+session together with its IP address. Session ids are issued by the server:
+a budgeted request without a valid one is charged to its IP's bucket at the
+base budget, and its response carries a signed X-Session-Id to send from then
+on. Requests with a session draw from a second, shared bucket for their IP
+address that is RATE_LIMIT_IP_MULTIPLIER times larger, because a whole school
+often shares one NAT address. Those two IP buckets are the most one address
+can get, however many session ids it collects: each new id costs a request
+from the base one. Each client also gets at most
+RATE_LIMIT_MAX_STREAMS chat answers in flight at once.
+
+A request takes a token from each of its buckets only if every one has one, so
+a denied request costs nothing. Buckets live in memory by default.
+RATE_LIMIT_BACKEND=sqlite shares them between workers through one SQLite
+file, read in a worker thread; if the file stays locked, requests are let
+through rather than failed. Responses carry RateLimit-Limit,
+RateLimit-Remaining, RateLimit-Reset and RateLimit-Policy headers, and a 429
+adds Retry-After.
+"""
+import asyncio
+import hashlib
+import hmac
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from app.services.metrics import rate_limited
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# "<requests>/<seconds>": bucket size and the time it takes to refill completely
+RATE_LIMIT_CHAT = os.getenv("RATE_LIMIT_CHAT", "20/60")
+RATE_LIMIT_SEARCH = os.getenv("RATE_LIMIT_SEARCH", "30/60")
+RATE_LIMIT_ANALYTICS = os.getenv("RATE_LIMIT_ANALYTICS", "120/60")
+RATE_LIMIT_IP_MULTIPLIER = float(os.getenv("RATE_LIMIT_IP_MULTIPLIER", "10"))
+RATE_LIMIT_MAX_STREAMS = int(os.getenv("RATE_LIMIT_MAX_STREAMS", "3"))
+# "memory" (per worker) or "sqlite" (shared through RATE_LIMIT_DB)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_DB = os.getenv(
+    "RATE_LIMIT_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "rate_limits.sqlite3")
+)
+# Comma-separated API keys that get their own bucket
+RATE_LIMIT_API_KEYS = os.getenv("RATE_LIMIT_API_KEYS", "")
+# Signs session ids; set the same value on every worker (random per process otherwise)
+RATE_LIMIT_SECRET = os.getenv("RATE_LIMIT_SECRET", "")
+# Reverse proxies in front of the app, each appending to X-Forwarded-For; 0 ignores the header
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+_SEARCH_ROUTES = {("POST", "/api/research"), ("POST", "/api/messenger"), ("GET", "/api/search")}
+_ANALYTICS_ROUTES = {("POST", "/api/analytics"), ("POST", "/api/solve")}
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Budget a request is charged to, or None for free routes."""
+    if (method, path) in _SEARCH_ROUTES:
+        return "search"
+    if (method, path) in _ANALYTICS_ROUTES:
+        return "analytics"
+    if method == "POST" and path.startswith("/api/"):
+        return "chat"
+    return None
+
+
+class Budget:
+    __slots__ = ("requests", "seconds", "rate")
+
+    def __init__(self, spec: str):
+        """
+        Args:
+            spec: "<requests>/<seconds>", e.g. "20/60"
+
+        Raises:
+            ValueError: Malformed spec
+        """
+        requests, _, seconds = spec.partition("/")
+        self.requests = float(requests)
+        self.seconds = float(seconds or 60)
+        if self.requests <= 0 or self.seconds <= 0:
+            raise ValueError(f"Invalid rate limit '{spec}'")
+        self.rate = self.requests / self.seconds  # tokens refilled per second
+
+    def policy(self) -> str:
+        return f"{self.requests:g};w={self.seconds:g}"
+
+
+def _refilled(stored: Optional[tuple], capacity: float, rate: float, now: float) -> float:
+    """Balance of a bucket stored as (tokens, updated), or a new one, at time now."""
+    if stored is None:
+        return capacity
+    tokens, updated = stored
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryBuckets:
+    """Buckets in a dict: key -> (tokens, updated)."""
+
+    blocking = False
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self._buckets = {}
+        self.max_keys = max_keys
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, buckets: list, now: float) -> tuple:
+        """
+        Takes one token from every bucket if each has one, and none otherwise.
+
+        Args:
+            buckets: [(key, capacity, rate)]
+
+        Returns:
+            (allowed, tokens left in each bucket)
+        """
+        balances = [_refilled(self._buckets.get(key), capacity, rate, now) for key, capacity, rate in buckets]
+        allowed = all(tokens >= 1 for tokens in balances)
+        balances = [tokens - allowed for tokens in balances]
+        for (key, _, _), tokens in zip(buckets, balances):
+            if key not in self._buckets and len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = (tokens, now)
+        return allowed, balances
+
+    def _prune(self, now: float):
+        # Buckets untouched for 10 minutes are full again by any sane budget: forgetting them changes nothing
+        for key in [key for key, (_, updated) in self._buckets.items() if now - updated > 600]:
+            del self._buckets[key]
+        while len(self._buckets) >= self.max_keys:
+            del self._buckets[next(iter(self._buckets))]
+
+
+class SQLiteBuckets:
+    """
+    Buckets shared by every worker through one SQLite file, each check one
+    short transaction. Blocking: RateLimiter runs it in a worker thread.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = RATE_LIMIT_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=1, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Losing the last few updates in a power cut is fine for rate limits
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+        self._lock = threading.Lock()  # one transaction at a time on the shared connection
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+    def take(self, buckets: list, now: float) -> tuple:
+        """
+        Like MemoryBuckets.take().
+
+        Raises:
+            sqlite3.OperationalError: The file stayed locked for more than a second
+        """
+        keys = [key for key, _, _ in buckets]
+        with self._lock:
+            db = self._db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                stored = {key: (tokens, updated) for key, tokens, updated in db.execute(
+                    f"SELECT key, tokens, updated FROM buckets WHERE key IN ({', '.join('?' * len(keys))})", keys
+                )}
+                balances = [_refilled(stored.get(key), capacity, rate, now) for key, capacity, rate in buckets]
+                allowed = all(tokens >= 1 for tokens in balances)
+                balances = [tokens - allowed for tokens in balances]
+                db.executemany(
+                    """INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?)
+                       ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated""",
+                    [(key, tokens, now) for key, tokens in zip(keys, balances)]
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                if db.in_transaction:
+                    db.execute("ROLLBACK")
+                raise
+        return allowed, balances
+
+
+def _digest(api_key: bytes) -> str:
+    return hashlib.blake2b(api_key, digest_size=8).hexdigest()
+
+
+class Decision:
+    __slots__ = ("allowed", "limit", "window", "remaining", "rate")
+
+    def __init__(self, allowed: bool, limit: float, window: float, remaining: float, rate: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.window = window
+        self.remaining = remaining
+        self.rate = rate  # tokens refilled per second
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil((1 - self.remaining) / self.rate))
+
+    def headers(self) -> list:
+        """RateLimit-* headers (IETF httpapi draft), raw for ASGI."""
+        headers = [
+            (b"ratelimit-limit", b"%d" % self.limit),
+            (b"ratelimit-remaining", b"%d" % max(0, self.remaining)),
+            (b"ratelimit-reset", b"%d" % math.ceil((self.limit - self.remaining) / self.rate)),
+            (b"ratelimit-policy", b"%d;w=%d" % (self.limit, self.window)),
+        ]
+        if not self.allowed:
+            headers.append((b"retry-after", b"%d" % self.retry_after))
+        return headers
+
+
+class RateLimiter:
+    def __init__(self, budgets: dict = None, backend=None, enabled: bool = RATE_LIMIT_ENABLED,
+                 ip_multiplier: float = RATE_LIMIT_IP_MULTIPLIER, max_streams: int = RATE_LIMIT_MAX_STREAMS,
+                 api_keys: str = RATE_LIMIT_API_KEYS, secret: str = RATE_LIMIT_SECRET,
+                 proxy_hops: int = RATE_LIMIT_PROXY_HOPS):
+        """
+        Args:
+            budgets: Route class -> Budget; defaults to RATE_LIMIT_CHAT/SEARCH/ANALYTICS
+            backend: MemoryBuckets or SQLiteBuckets; defaults to RATE_LIMIT_BACKEND
+            ip_multiplier: IP bucket size relative to a session's
+            max_streams: Chat answers in flight per client, in this worker; 0 for no cap
+            api_keys: Comma-separated keys trusted to get a bucket of their own
+            secret: Key signing session ids
+            proxy_hops: Trusted reverse proxies appending to X-Forwarded-For
+        """
+        self.enabled = enabled
+        self.budgets = budgets or {
+            "chat": Budget(RATE_LIMIT_CHAT),
+            "search": Budget(RATE_LIMIT_SEARCH),
+            "analytics": Budget(RATE_LIMIT_ANALYTICS),
+        }
+        if backend is None:
+            backend = SQLiteBuckets() if enabled and RATE_LIMIT_BACKEND == "sqlite" else MemoryBuckets()
+        self.backend = backend
+        self.ip_multiplier = ip_multiplier
+        self.max_streams = max_streams
+        # Only digests of the keys are kept
+        self.api_keys = {_digest(key.strip().encode()) for key in api_keys.split(",") if key.strip()}
+        self._secret = secret.encode() if secret else os.urandom(32)
+        self.proxy_hops = proxy_hops
+        self._streams = {}  # client -> chat answers in flight
+        self.allowed = Counter()
+        self.limited = Counter()
+        self.errors = 0
+
+    def _signature(self, session: bytes) -> bytes:
+        return hmac.new(self._secret, session, hashlib.blake2b).hexdigest()[:32].encode()
+
+    def issue_session(self) -> bytes:
+        """A new signed session id: "<random>.<signature>"."""
+        session = os.urandom(12).hex().encode()
+        return session + b"." + self._signature(session)
+
+    def _verified(self, token: bytes) -> Optional[bytes]:
+        session, _, signature = token.partition(b".")
+        if session and hmac.compare_digest(signature, self._signature(session)):
+            return session
+        return None
+
+    def clients(self, scope: dict) -> list:
+        """
+        (bucket key, budget multiplier) for each bucket a request draws from;
+        the most specific last. A request without a valid session id only
+        draws from its IP's bucket, with multiplier 1.0.
+        """
+        api_key = session = None
+        forwarded = []
+        for name, value in scope["headers"]:
+            if name == b"x-api-key":
+                api_key = value
+            elif name == b"authorization" and value[:7].lower() == b"bearer ":
+                api_key = value[7:]
+            elif name == b"x-session-id":
+                session = value[:128]
+            elif name == b"x-forwarded-for" and self.proxy_hops:
+                forwarded += value.split(b",")
+        if api_key and self.api_keys:
+            digest = _digest(api_key)
+            if digest in self.api_keys:
+                return [("key:" + digest, 1.0)]
+        # The client writes the leftmost entries itself: trust only those appended by our proxies
+        if len(forwarded) >= self.proxy_hops > 0:
+            address = forwarded[-self.proxy_hops].strip().decode("latin-1")
+        else:
+            address = (scope.get("client") or ("unknown",))[0]
+        session = session and self._verified(session)
+        if session:
+            return [("nat:" + address, self.ip_multiplier), ("session:" + session.decode(), 1.0)]
+        return [("ip:" + address, 1.0)]
+
+    def check(self, route_class: str, clients: list, now: float = None) -> Decision:
+        """
+        Takes a token from each of the clients' buckets if all of them have
+        one, so a denied request uses up nothing; the decision of the tightest bucket.
+        """
+        budget = self.budgets[route_class]
+        now = time.time() if now is None else now
+        buckets = [(f"{route_class}:{key}", budget.requests * multiplier, budget.rate * multiplier)
+                   for key, multiplier in clients]
+        try:
+            allowed, balances = self.backend.take(buckets, now)
+        except sqlite3.OperationalError:
+            # A locked or broken file must not turn every budgeted request into a 500: let it through
+            self.errors += 1
+            allowed, balances = True, [capacity - 1 for _, capacity, _ in buckets]
+        decisions = [Decision(allowed, capacity, budget.seconds, tokens, rate)
+                     for (_, capacity, rate), tokens in zip(buckets, balances)]
+        if not allowed:
+            self.limited[route_class] += 1
+            return next(decision for decision in decisions if decision.remaining < 1)
+        self.allowed[route_class] += 1
+        return min(decisions, key=lambda decision: decision.remaining / decision.limit)
+
+    async def acheck(self, route_class: str, clients: list) -> Decision:
+        """check(), in a worker thread for a backend that blocks, so the event loop never waits on a lock."""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.check, route_class, clients)
+        return self.check(route_class, clients)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "budgets": {name: f"{budget.requests:g}/{budget.seconds:g}s" for name, budget in self.budgets.items()},
+            "keys": len(self.backend),
+            "api_keys": len(self.api_keys),
+            "streams": sum(self._streams.values()),
+            "allowed": dict(self.allowed),
+            "limited": dict(self.limited),
+            "errors": self.errors,
+        }
+
+
+async def _reject(send, route_class: str, reason: str, detail: str, headers: list):
+    rate_limited.inc(route_class, reason)
+    body = b'{"error":"Too many requests","detail":"%s"}' % detail.encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", b"%d" % len(body)), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware, like MetricsMiddleware. Goes inside CORSMiddleware so
+    browsers can read 429s and the rate-limit headers.
+    """
+
+    def __init__(self, app, limiter: RateLimiter = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limiter
+        if scope["type"] != "http" or not limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+        kind = route_class(scope["method"], scope["path"])
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+
+        clients = limiter.clients(scope)
+        decision = await limiter.acheck(kind, clients)
+        headers = decision.headers()
+        if not decision.allowed:
+            await _reject(send, kind, "rate", f"{kind} limit reached; retry in {decision.retry_after}s", headers)
+            return
+        if clients[-1][0].startswith("ip:"):
+            # Paid for from the base IP budget, so collecting ids can't outrun the IP bucket
+            headers.append((b"x-session-id", limiter.issue_session()))
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message["headers"], *headers]}
+            await send(message)
+
+        if kind != "chat" or not limiter.max_streams:
+            await self.app(scope, receive, send_with_headers)
+            return
+
+        # Each answer holds an LLM slot for its whole stream: cap them per client as well
+        client = clients[-1][0]
+        streams = limiter._streams
+        if streams.get(client, 0) >= limiter.max_streams:
+            limiter.limited[kind] += 1
+            await _reject(send, kind, "streams",
+                          f"{limiter.max_streams} answers already in progress; wait for one to finish",
+                          [*headers, (b"retry-after", b"1")])
+            return
+        streams[client] = streams.get(client, 0) + 1
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            if streams[client] <= 1:
+                del streams[client]
+            else:
+                streams[client] -= 1
+
+
+# Singleton instance
+rate_limiter = RateLimiter()
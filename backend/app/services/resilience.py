@@ -0,0 +1,84 @@
+"""
+Resilience helpers
+Circuit breaker and jittered exponential backoff used by LLMService.
+"""
+import random
+import time
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            name: Label reported in stats()
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds to stay open before letting a trial call through
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+
+    @property
+    def available(self) -> bool:
+        """Like allow(), but without claiming the half-open trial call."""
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        return not (self.state == self.HALF_OPEN and self._trial_in_flight)
+
+    def allow(self) -> bool:
+        """Whether a call may go through now."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        # Half-open: a single trial call decides whether to close again
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def retry_after(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def record_abandoned(self):
+        """The call was cancelled before it succeeded or failed; free the half-open trial."""
+        self._trial_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+        }
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
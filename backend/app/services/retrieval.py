@@ -0,0 +1,496 @@
+"""
+Retrieval Service
+Local retrieval over GCE syllabi, textbooks and past papers (RAG).
+
+The index lives under RAG_INDEX_DIR, one partition per subject and level:
+
+    <index>/manifest.json                       live segments, document fingerprints, removed ids
+    <index>/<subject>/<level>/seg-000001.json   header: count, dim, dtype, documents
+                              seg-000001.vec    N x dim int8 (or float16) embeddings
+                              seg-000001.bits   dim/64 x N uint64 sign bits, column-major
+                              seg-000001.meta   N records: scale, doc, position, offset, length
+                              seg-000001.txt    chunk texts, UTF-8, back to back
+                              seg-000001.terms  inverted index for BM25 (see app/services/lexical.py)
+                              seg-000001.post
+                              seg-000001.lens
+
+Every file is memory-mapped, so opening even a 1M-chunk index only reads the
+headers. A search ranks a partition by Hamming distance on the sign bits,
+then rescores the closest few hundred chunks exactly on the quantized vectors.
+Questions are answered by reciprocal-rank fusion of that vector ranking
+and BM25 over the inverted index, both restricted to the requested
+subject/level partitions. Segments are immutable: a changed or deleted document is hidden by listing
+its id under "removed" until compaction drops its chunks (app/services/ingest.py).
+"""
+import asyncio
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+
+from app.services.admission import estimate_tokens
+from app.services.lexical import (
+    TERM_DTYPE, bm25, decode_postings, decode_varints, idf, postings_from_texts, term_hash, terms, write_postings,
+)
+
+RAG_INDEX_DIR = os.getenv(
+    "RAG_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "index")
+)
+RAG_EMBED_DIM = int(os.getenv("RAG_EMBED_DIM", "256"))
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+# Hard cap on reference material added to one prompt
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "800"))
+# Chunks scoring below this cosine similarity are not worth the tokens
+RAG_MIN_SCORE = float(os.getenv("RAG_MIN_SCORE", "0.15"))
+# Chunks kept from the Hamming pass for exact rescoring
+RAG_RERANK_CANDIDATES = int(os.getenv("RAG_RERANK_CANDIDATES", "512"))
+RAG_RELOAD_INTERVAL = float(os.getenv("RAG_RELOAD_INTERVAL", "5"))
+# Hits taken from each ranking before fusion, and the RRF damping constant
+RAG_FUSION_DEPTH = int(os.getenv("RAG_FUSION_DEPTH", "50"))
+RAG_FUSION_K = int(os.getenv("RAG_FUSION_K", "60"))
+# A chunk below RAG_MIN_SCORE still qualifies as context if it contains this share of the question's terms
+RAG_MIN_TERM_COVERAGE = float(os.getenv("RAG_MIN_TERM_COVERAGE", "0.6"))
+
+SEARCH_MODES = ("hybrid", "vector", "lexical")
+MANIFEST = "manifest.json"
+SEGMENT_FILES = (".json", ".vec", ".bits", ".meta", ".txt", ".terms", ".post", ".lens")
+META_DTYPE = np.dtype([
+    ("scale", "<f4"),     # int8 -> float factor (1.0 for float16)
+    ("doc", "<u4"),       # index into the header's documents
+    ("position", "<u4"),  # chunk number within its document
+    ("offset", "<u8"),    # byte offset of the text in .txt
+    ("length", "<u4"),    # byte length of the text
+])
+
+
+class Embedder:
+    """
+    Signed hashed bag of words with sublinear term frequency. No model download,
+    the same vectors on every machine, and a short question still lands near a
+    long chunk that shares its key terms.
+    """
+
+    def __init__(self, dim: int = RAG_EMBED_DIM):
+        if dim % 64:
+            raise ValueError("embedding dim must be a multiple of 64")
+        self.dim = dim
+
+    def embed(self, text: str) -> np.ndarray:
+        hashes, counts = np.unique(np.fromiter((zlib.crc32(t.encode("utf-8")) for t in terms(text)), dtype=np.uint32),
+                                   return_counts=True)
+        weights = (1.0 + np.log(counts)) * np.where(hashes & 0x80000000, 1.0, -1.0)
+        vector = np.bincount(hashes % self.dim, weights=weights, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed_many(self, texts: list) -> np.ndarray:
+        return np.stack([self.embed(text) for text in texts]) if texts else np.zeros((0, self.dim), np.float32)
+
+
+def sign_bits(vectors: np.ndarray) -> np.ndarray:
+    """(N, dim) floats -> (dim/64, N) uint64 sign bits, one contiguous row per 64 dimensions."""
+    packed = np.packbits(np.atleast_2d(vectors) > 0, axis=1)
+    return np.ascontiguousarray(packed.view(np.uint64).T)
+
+
+def quantize(vectors: np.ndarray, dtype: str = "int8") -> tuple:
+    """Returns (stored matrix, per-row scale) for an (N, dim) float matrix."""
+    if dtype == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), np.float32)
+    if dtype != "int8":
+        raise ValueError(f"unsupported index dtype {dtype!r}")
+    peak = np.abs(vectors).max(axis=1)
+    scale = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+    return np.round(vectors / scale[:, None]).astype(np.int8), scale
+
+
+def write_segment(prefix: str, vectors: np.ndarray, texts: list, chunks: list, documents: list, dtype: str = "int8"):
+    """
+    Writes one immutable segment. The .json header is written last, so a
+    reader never sees a half-written segment.
+
+    Args:
+        prefix: Path without extension, e.g. <partition>/seg-000001
+        vectors: (N, dim) float32 embeddings of texts
+        texts: Chunk texts
+        chunks: (document index, position in document) per chunk
+        documents: Header entries ({"source", "title", "id"}) referenced by chunks
+    """
+    data, scale = quantize(vectors, dtype)
+    encoded = [text.encode("utf-8") for text in texts]
+    lengths = np.array([len(blob) for blob in encoded], dtype=np.uint64)
+
+    meta = np.zeros(len(texts), dtype=META_DTYPE)
+    meta["scale"] = scale
+    meta["doc"] = [doc for doc, _ in chunks]
+    meta["position"] = [position for _, position in chunks]
+    meta["offset"] = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(texts) else []
+    meta["length"] = lengths
+
+    data.tofile(prefix + ".vec")
+    sign_bits(vectors).tofile(prefix + ".bits")
+    meta.tofile(prefix + ".meta")
+    with open(prefix + ".txt", "wb") as f:
+        for blob in encoded:
+            f.write(blob)
+    hashes, rows, frequencies, lengths = postings_from_texts(texts)
+    write_postings(prefix, hashes, rows, frequencies, lengths)
+    write_header(prefix, len(texts), int(vectors.shape[1]), dtype, documents, int(lengths.sum()))
+
+
+def write_header(prefix: str, count: int, dim: int, dtype: str, documents: list, tokens: int = None):
+    """tokens: total term count of the chunks, if the segment has an inverted index."""
+    header = {"count": count, "dim": dim, "dtype": dtype, "documents": documents}
+    if tokens is not None:
+        header["tokens"] = tokens
+    with open(prefix + ".json.tmp", "w", encoding="utf-8") as f:
+        json.dump(header, f, ensure_ascii=False)
+    os.replace(prefix + ".json.tmp", prefix + ".json")
+
+
+def _memmap(path: str, dtype, shape):
+    # np.memmap refuses empty files; an empty segment has nothing to map
+    if 0 in shape:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+class Segment:
+    def __init__(self, prefix: str):
+        with open(prefix + ".json", encoding="utf-8") as f:
+            header = json.load(f)
+        self.prefix = prefix
+        self.count = header["count"]
+        self.dim = header["dim"]
+        self.dtype = header["dtype"]
+        self.documents = header["documents"]
+        self.removed_docs = np.zeros(0, dtype=np.uint32)  # indices into documents, see set_removed
+        self.removed_chunks = 0
+        self.vectors = _memmap(prefix + ".vec", np.int8 if header["dtype"] == "int8" else np.float16, (self.count, self.dim))
+        self.bits = _memmap(prefix + ".bits", np.uint64, (self.dim // 64, self.count))
+        self.meta = _memmap(prefix + ".meta", META_DTYPE, (self.count,))
+        text_bytes = int(self.meta["offset"][-1]) + int(self.meta["length"][-1]) if self.count else 0
+        self.text_blob = _memmap(prefix + ".txt", np.uint8, (text_bytes,))
+        # Segments written before BM25 existed have no inverted index until they are compacted
+        self.tokens = header.get("tokens")
+        if self.tokens is not None:
+            self.terms = _memmap(prefix + ".terms", TERM_DTYPE, (os.path.getsize(prefix + ".terms") // TERM_DTYPE.itemsize,))
+            self.term_hashes = self.terms["hash"]
+            self.postings = _memmap(prefix + ".post", np.uint8, (os.path.getsize(prefix + ".post"),))
+            self.lengths = _memmap(prefix + ".lens", np.uint16, (self.count,))
+
+    def set_removed(self, removed_ids: set):
+        """Hides the chunks of documents whose id the manifest lists as removed."""
+        self.removed_docs = np.array(
+            [i for i, document in enumerate(self.documents) if document.get("id") in removed_ids], dtype=np.uint32
+        )
+        self.removed_chunks = int(np.isin(self.meta["doc"], self.removed_docs).sum()) if len(self.removed_docs) else 0
+
+    @property
+    def live(self) -> int:
+        return self.count - self.removed_chunks
+
+    def live_rows(self) -> np.ndarray:
+        if not self.removed_chunks:
+            return np.arange(self.count)
+        return np.flatnonzero(~np.isin(self.meta["doc"], self.removed_docs))
+
+    def _removed(self, rows: np.ndarray) -> np.ndarray:
+        return np.isin(self.meta["doc"][rows], self.removed_docs) if self.removed_chunks else np.zeros(len(rows), bool)
+
+    def document_frequency(self, hash_: int) -> tuple:
+        """(df, index into terms) for a term hash, (0, -1) if the segment doesn't contain it."""
+        i = int(np.searchsorted(self.term_hashes, hash_))
+        if i < len(self.terms) and int(self.term_hashes[i]) == hash_:
+            return int(self.terms["df"][i]), i
+        return 0, -1
+
+    def postings_of(self, i: int) -> tuple:
+        """(rows, term frequencies) of the i-th term."""
+        start = int(self.terms["offset"][i])
+        end = int(self.terms["offset"][i + 1]) if i + 1 < len(self.terms) else len(self.postings)
+        return decode_postings(self.postings[start:end])
+
+    def all_postings(self) -> tuple:
+        """Every (term hash, row, frequency) entry, decoded at once (used by compaction)."""
+        pairs = decode_varints(self.postings).reshape(-1, 2)
+        df = self.terms["df"].astype(np.int64)
+        firsts = np.cumsum(df) - df
+        # Running sum of the row gaps, restarted at each term's first entry
+        running = np.cumsum(pairs[:, 0])
+        rows = running - np.repeat(running[firsts] - pairs[firsts, 0], df)
+        return np.repeat(self.term_hashes, df), rows.astype(np.uint32), pairs[:, 1].astype(np.uint32)
+
+    def candidates(self, query_bits: np.ndarray, limit: int) -> np.ndarray:
+        """Rows with the smallest Hamming distance to the query (ties may add a few extra)."""
+        if self.count <= limit:
+            return np.arange(self.count)
+        distance = np.zeros(self.count, dtype=np.uint16)
+        scratch = np.empty(self.count, dtype=np.uint64)
+        for word in range(self.bits.shape[0]):
+            np.bitwise_xor(self.bits[word], query_bits[word], out=scratch)
+            distance += np.bitwise_count(scratch)
+        # Histogram cut-off instead of a full argpartition over every row
+        cutoff = int(np.searchsorted(np.cumsum(np.bincount(distance, minlength=self.dim + 1)), limit))
+        rows = np.flatnonzero(distance <= cutoff)
+        if len(rows) > 2 * limit:
+            rows = rows[np.argpartition(distance[rows], limit)[:limit]]
+        return rows
+
+    def search(self, query: np.ndarray, query_bits: np.ndarray, k: int, candidates: int) -> tuple:
+        # Over-fetch by the removed share so hidden chunks don't crowd out live ones
+        limit = max(candidates, k) * self.count // max(self.live, 1)
+        rows = np.sort(self.candidates(query_bits, limit))
+        rows = rows[~self._removed(rows)]
+        if not len(rows):
+            return np.zeros(0, np.float32), rows
+        scores = (self.vectors[rows].astype(np.float32) @ query) * self.meta["scale"][rows]
+        top = np.argsort(scores)[::-1][:k]
+        return scores[top], rows[top]
+
+    def score(self, row: int, query: np.ndarray) -> float:
+        """Cosine similarity of one chunk to the query."""
+        return float(self.vectors[row].astype(np.float32) @ query * self.meta["scale"][row])
+
+    def chunk(self, row: int) -> dict:
+        record = self.meta[row]
+        start = int(record["offset"])
+        text = bytes(self.text_blob[start:start + int(record["length"])]).decode("utf-8")
+        return {**self.documents[int(record["doc"])], "position": int(record["position"]), "text": text}
+
+
+class VectorIndex:
+    def __init__(self, root: str = RAG_INDEX_DIR, reload_interval: float = RAG_RELOAD_INTERVAL):
+        self.root = root
+        self.reload_interval = reload_interval
+        self.partitions = {}  # (subject, level) -> [Segment]
+        self.dim = RAG_EMBED_DIM
+        self.version = None
+        self._checked = 0.0
+        self.refresh(force=True)
+
+    def _manifest_version(self):
+        try:
+            return os.stat(os.path.join(self.root, MANIFEST)).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self, force: bool = False):
+        """Re-opens the segments when the ingest pipeline has published a new manifest."""
+        now = time.monotonic()
+        if not force and now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        version = self._manifest_version()
+        if version == self.version and not force:
+            return
+
+        partitions = {}
+        if version is not None:
+            with open(os.path.join(self.root, MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.dim = manifest.get("dim", RAG_EMBED_DIM)
+            removed = set(manifest.get("removed", []))
+            # Segments are immutable, so the ones still listed are reused as they are
+            opened = {segment.prefix: segment for segments in self.partitions.values() for segment in segments}
+            for name in manifest.get("segments", []):
+                subject, level, _ = name.split("/")
+                prefix = os.path.join(self.root, *name.split("/"))
+                segment = opened.get(prefix) or Segment(prefix)
+                segment.set_removed(removed)
+                partitions.setdefault((subject, level), []).append(segment)
+        self.partitions = partitions
+        self.version = version
+
+    @property
+    def size(self) -> int:
+        return sum(segment.live for segments in self.partitions.values() for segment in segments)
+
+    def _segments(self, subject: str = None, level: str = None):
+        """Segments of the matching partitions; filtering happens here, before anything is scored."""
+        for (part_subject, part_level), segments in self.partitions.items():
+            if (subject and part_subject != subject) or (level and part_level != level):
+                continue
+            for segment in segments:
+                yield segment, part_subject, part_level
+
+    def _vector_hits(self, query: np.ndarray, subject: str, level: str, k: int, candidates: int) -> list:
+        query_bits = sign_bits(query)[:, 0]
+        hits = []
+        for segment, part_subject, part_level in self._segments(subject, level):
+            scores, rows = segment.search(query, query_bits, k, candidates)
+            hits.extend((float(score), segment, int(row), part_subject, part_level) for score, row in zip(scores, rows))
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return hits[:k]
+
+    def _lexical_hits(self, query_terms: list, subject: str, level: str, k: int) -> list:
+        hashes = sorted({term_hash(term) for term in query_terms})
+        selected = [hit for hit in self._segments(subject, level) if hit[0].tokens is not None]
+        if not hashes or not selected:
+            return []
+        # Collection statistics over all selected segments, so their scores are comparable
+        lookups = [[segment.document_frequency(h) for h in hashes] for segment, _, _ in selected]
+        count = sum(segment.count for segment, _, _ in selected)
+        average_length = sum(segment.tokens for segment, _, _ in selected) / max(count, 1)
+        weights = [idf(sum(lookup[j][0] for lookup in lookups), count) for j in range(len(hashes))]
+
+        hits = []
+        for (segment, part_subject, part_level), lookup in zip(selected, lookups):
+            row_parts, score_parts = [], []
+            for weight, (df, i) in zip(weights, lookup):
+                if df:
+                    rows, frequencies = segment.postings_of(i)
+                    row_parts.append(rows)
+                    score_parts.append(bm25(frequencies, segment.lengths[rows].astype(np.float32), average_length, weight))
+            if not row_parts:
+                continue
+            rows, inverse = np.unique(np.concatenate(row_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+            matched = np.bincount(inverse)
+            keep = ~segment._removed(rows)
+            rows, scores, matched = rows[keep], scores[keep], matched[keep]
+            for j in np.argsort(scores)[::-1][:k]:
+                hits.append((float(scores[j]), segment, int(rows[j]), part_subject, part_level, matched[j] / len(hashes)))
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return hits[:k]
+
+    def search(self, query: np.ndarray, subject: str = None, level: str = None, k: int = RAG_TOP_K,
+               candidates: int = RAG_RERANK_CANDIDATES) -> list:
+        """
+        Top-k chunks by cosine similarity, searching only the matching partitions.
+
+        Returns:
+            [{"score", "source", "title", "position", "text", "subject", "level"}, ...] best first
+        """
+        self.refresh()
+        return [
+            {"score": round(score, 4), **segment.chunk(row), "subject": part_subject, "level": part_level}
+            for score, segment, row, part_subject, part_level in self._vector_hits(query, subject, level, k, candidates)
+        ]
+
+    def lexical(self, query_terms: list, subject: str = None, level: str = None, k: int = RAG_TOP_K) -> list:
+        """
+        Top-k chunks by BM25, searching only the matching partitions.
+
+        Returns:
+            [{"score", "coverage", "source", "title", "position", "text", "subject", "level"}, ...] best first;
+            coverage is the share of the query's terms the chunk contains
+        """
+        self.refresh()
+        return [
+            {"score": round(score, 4), "coverage": round(float(coverage), 3), **segment.chunk(row),
+             "subject": part_subject, "level": part_level}
+            for score, segment, row, part_subject, part_level, coverage in self._lexical_hits(query_terms, subject, level, k)
+        ]
+
+    def hybrid(self, query: np.ndarray, query_terms: list, subject: str = None, level: str = None, k: int = RAG_TOP_K,
+               depth: int = RAG_FUSION_DEPTH, candidates: int = RAG_RERANK_CANDIDATES) -> list:
+        """
+        Reciprocal-rank fusion of the vector and BM25 rankings (top depth of each).
+        RRF only looks at ranks, so cosine and BM25 never need a common scale.
+
+        Returns:
+            [{"score", "vector_score", "bm25", "coverage", "source", "title", "position", "text",
+              "subject", "level"}, ...] best first; bm25 is None for chunks outside the BM25 top depth
+        """
+        self.refresh()
+        fused = {}
+        for rank, (_, segment, row, part_subject, part_level) in enumerate(
+                self._vector_hits(query, subject, level, depth, candidates)):
+            entry = fused.setdefault((segment.prefix, row), [0.0, segment, row, part_subject, part_level, None, 0.0])
+            entry[0] += 1.0 / (RAG_FUSION_K + rank + 1)
+        for rank, (score, segment, row, part_subject, part_level, coverage) in enumerate(
+                self._lexical_hits(query_terms, subject, level, depth)):
+            entry = fused.setdefault((segment.prefix, row), [0.0, segment, row, part_subject, part_level, None, 0.0])
+            entry[0] += 1.0 / (RAG_FUSION_K + rank + 1)
+            entry[5], entry[6] = score, coverage
+
+        best = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)[:k]
+        return [
+            {"score": round(rrf, 5), "vector_score": round(segment.score(row, query), 4),
+             "bm25": None if score is None else round(score, 4), "coverage": round(float(coverage), 3),
+             **segment.chunk(row), "subject": part_subject, "level": part_level}
+            for rrf, segment, row, part_subject, part_level, score, coverage in best
+        ]
+
+
+def format_context(hits: list, budget: int = RAG_CONTEXT_TOKENS) -> str:
+    """Reference block for the system prompt, holding as many hits as fit in budget tokens."""
+    header = ("Reference material from the GCE syllabus, textbooks and past papers. "
+              "Use it where it is relevant and name the source when you rely on it.")
+    budget -= estimate_tokens(header)
+    entries = []
+    for number, hit in enumerate(hits, 1):
+        entry = f"[{number}] {hit['title']} (part {hit['position'] + 1}):\n{hit['text']}"
+        cost = estimate_tokens(entry)
+        if cost > budget:
+            continue
+        budget -= cost
+        entries.append(entry)
+    return header + "\n\n" + "\n\n".join(entries) if entries else ""
+
+
+class Retriever:
+    def __init__(self, index: VectorIndex = None, embedder: Embedder = None, min_score: float = RAG_MIN_SCORE):
+        self.index = index or VectorIndex()
+        self.embedder = embedder or Embedder(RAG_EMBED_DIM)
+        self.min_score = min_score
+        self.searches = 0
+        self.injected = 0
+
+    @property
+    def enabled(self) -> bool:
+        self.index.refresh()
+        return bool(self.index.partitions)
+
+    def search(self, question: str, subject: str = None, level: str = None, k: int = RAG_TOP_K,
+               mode: str = "hybrid") -> list:
+        """
+        Args:
+            mode: "hybrid" (RRF of both rankings), "vector" or "lexical" (BM25 only)
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"search mode must be one of {SEARCH_MODES}")
+        self.searches += 1
+        self.index.refresh()
+        if mode == "lexical":
+            return self.index.lexical(list(terms(question)), subject, level, k)
+        if self.embedder.dim != self.index.dim:
+            # Queries must be embedded like the index was built
+            self.embedder = Embedder(self.index.dim)
+        query = self.embedder.embed(question)
+        if mode == "vector":
+            return self.index.search(query, subject, level, k)
+        return self.index.hybrid(query, list(terms(question)), subject, level, k)
+
+    async def context(self, subject: str, level: str, question: str) -> str:
+        """
+        Reference material for a subject question, or "" if the index has nothing relevant.
+        The search runs in a worker thread; NumPy releases the GIL for the heavy parts.
+        """
+        if not self.enabled:
+            return ""
+        hits = await asyncio.to_thread(self.search, question, subject, level)
+        # Semantically close, or sharing most of the question's wording (a pasted past-paper question)
+        hits = [hit for hit in hits if hit["vector_score"] >= self.min_score or hit["coverage"] >= RAG_MIN_TERM_COVERAGE]
+        context = format_context(hits)
+        if context:
+            self.injected += 1
+        return context
+
+    def stats(self) -> dict:
+        return {
+            "index": self.index.root,
+            "chunks": self.index.size,
+            "partitions": len(self.index.partitions),
+            "segments": sum(len(segments) for segments in self.index.partitions.values()),
+            "searches": self.searches,
+            "injected": self.injected,
+        }
+
+
+# Singleton instance
+retriever = Retriever()
@@ -0,0 +1,89 @@
+"""
+Search Service
+Async SerpApi client shared by the Researcher and Messenger tools.
+"""
+import asyncio
+import os
+
+import httpx
+
+from app.services.http_pools import http_pools
+from app.services.metrics import search_latency, timer
+
+SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
+SERPAPI_BASE_URL = os.getenv("SERPAPI_BASE_URL", "https://serpapi.com")
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "8"))
+SEARCH_MAX_CONNECTIONS = int(os.getenv("SEARCH_MAX_CONNECTIONS", "20"))
+
+
+class SearchError(Exception):
+    """Raised when a search cannot be completed."""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SearchService:
+    def __init__(self, base_url: str = SERPAPI_BASE_URL, timeout: float = SEARCH_TIMEOUT,
+                 max_connections: int = SEARCH_MAX_CONNECTIONS):
+        self.base_url = base_url
+        self.timeout = timeout
+        http_pools.register("serpapi", base_url, timeout, max_connections, warm=self.configured)
+
+    @property
+    def configured(self) -> bool:
+        return bool(SERPAPI_API_KEY)
+
+    async def search(self, params: dict, timeout: float = None) -> dict:
+        """
+        Runs a Google search through SerpApi without blocking the event loop.
+
+        Args:
+            params: SerpApi query parameters (q, num, tbs, ...)
+            timeout: Overall deadline in seconds, defaults to SEARCH_TIMEOUT
+
+        Returns:
+            The decoded SerpApi JSON payload
+        """
+        query = {"engine": "google", **params, "api_key": SERPAPI_API_KEY}
+        deadline = timeout or self.timeout
+
+        started = timer()
+        outcome = "ok"
+        try:
+            # wait_for cancels the in-flight request (and frees its connection) on expiry
+            response = await asyncio.wait_for(
+                http_pools.client("serpapi").get("/search.json", params=query),
+                timeout=deadline,
+            )
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise SearchError(f"Search timed out after {deadline:g}s", status_code=504)
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+            raise SearchError(f"Search request failed: {e}", status_code=502)
+        finally:
+            search_latency.observe(outcome, value=timer() - started)
+
+        try:
+            results = response.json()
+        except ValueError:
+            raise SearchError(f"SerpApi returned an invalid response ({response.status_code})", status_code=502)
+
+        if "error" in results:
+            raise SearchError(f"SerpApi error: {results['error']}")
+
+        return results
+
+
+# Singleton instance
+search_service = SearchService()
+
+
+def get_search_service() -> SearchService:
+    """Dependency for routes; override in app.dependency_overrides to swap the upstream."""
+    return search_service
@@ -0,0 +1,316 @@
+"""
+Semantic Cache
+Answer cache for near-duplicate questions ("solve 2x^2+5x-3=0" vs
+"Solve for x: 2x² + 5x − 3 = 0"). Questions are embedded with a hashed
+character n-gram vectorizer and matched by cosine similarity against a
+per-(subject, mode, prompt) NumPy matrix. Entries expire after
+SEMANTIC_CACHE_TTL, like the exact answer cache, and at most
+SEMANTIC_CACHE_MAX_SCOPES matrices are kept.
+"""
+import os
+import re
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "20000"))
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "256"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", os.getenv("ANSWER_CACHE_TTL", "86400")))
+# Prompt versions and tool suffixes make new scopes; the least recently used are dropped
+SEMANTIC_CACHE_MAX_SCOPES = int(os.getenv("SEMANTIC_CACHE_MAX_SCOPES", "256"))
+
+# Symbols students type in many different ways
+_SYMBOLS = str.maketrans({
+    "−": "-", "–": "-", "—": "-",  # minus sign, en/em dash
+    "×": "*", "⋅": "*", "÷": "/",
+})
+# x² is x^2, not x2: "2^10" and "210" must stay different questions
+_SUPERSCRIPT = re.compile(r"[⁻⁰¹²³⁴⁵⁶⁷⁸⁹]+")
+# Numbers and the operators between them
+_ARITHMETIC = re.compile(r"\d+(?:\.\d+)?|[-+*/^=<>]")
+_WORD = re.compile(r"\w+")
+# "solve for x:" asks the same thing as "solve" when x is the only unknown
+_SOLVE_FOR = re.compile(r"\bfor ([a-z])\b\s*:?")
+# Single letters, including inside terms: the x in "2x+3" or "for x"
+_VARIABLE = re.compile(r"(?<![a-z])[a-z](?![a-z])")
+# "World War I" vs "World War II", "Henry VIII"
+_ROMAN = re.compile(r"(?<![a-z0-9])(?=[ivx])x{0,3}(?:ix|iv|v?i{0,3})(?![a-z0-9])")
+# Punctuation that carries no meaning; math operators are kept
+_NOISE = re.compile(r"[?!,;:\"'`]")
+_FILLER = {"a", "an", "the", "please", "pls", "me", "can", "you", "could", "help", "kindly"}
+
+
+def _fold(text: str) -> str:
+    text = _SUPERSCRIPT.sub(lambda match: "^" + match.group(0), text)
+    return unicodedata.normalize("NFKC", text).translate(_SYMBOLS).lower()
+
+
+def normalize_question(text: str) -> str:
+    text = _fold(text)
+    text = _NOISE.sub(" ", _SOLVE_FOR.sub(" ", text))
+    return " ".join(word for word in text.split() if word not in _FILLER)
+
+
+def number_signature(text: str) -> tuple:
+    """
+    Numbers and arithmetic operators appearing in a normalized question, in order.
+    Two questions only share an answer if these match exactly, so
+    "2x+3=7" never reuses the answer to "2x+4=7", nor "2^10" the answer
+    to "210", however similar they look.
+    """
+    return tuple(_ARITHMETIC.findall(text))
+
+
+def question_signature(question: str) -> tuple:
+    """
+    Everything in a raw question that must match exactly for two questions
+    to share an answer: numbers, Roman numerals, the single-letter variables
+    and the one being solved for. Similar wording alone would otherwise let
+    "...World War I" answer "...World War II", or "solve for x" answer
+    "solve for y".
+    """
+    lowered = _fold(question)
+    text = normalize_question(question)
+    variables = tuple(sorted(set(_VARIABLE.findall(text))))
+    target = _SOLVE_FOR.search(lowered)
+    if target:
+        target = target.group(1)
+    elif len(variables) == 1:
+        target = variables[0]
+    return number_signature(text), tuple(_ROMAN.findall(text)), variables, target
+
+
+class HashedNgramVectorizer:
+    def __init__(self, dim: int = SEMANTIC_CACHE_DIM, ngram_range: tuple = (3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str):
+        compact = text.replace(" ", "")
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(max(len(compact) - n + 1, 1)):
+                yield compact[i:i + n]
+        for word in _WORD.findall(text):
+            yield " " + word
+
+    def transform(self, text: str) -> np.ndarray:
+        """Embeds an already-normalized text as an L2-normalized float32 vector."""
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in self._features(text)),
+            dtype=np.uint32,
+        )
+        # Signed hashing keeps collisions from only ever adding similarity
+        signs = np.where(hashes & 0x80000000, 1.0, -1.0)
+        vector = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class SemanticIndex:
+    def __init__(self, dim: int, initial_capacity: int = 8):
+        self.dim = dim
+        self.size = 0
+        self.vectors = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self.last_used = np.zeros(initial_capacity, dtype=np.int64)
+        self.stored_at = np.zeros(initial_capacity, dtype=np.float64)
+        self.answers = [None] * initial_capacity
+        self.signatures = [None] * initial_capacity
+
+    def _grow(self, capacity: int):
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        last_used = np.zeros(capacity, dtype=np.int64)
+        last_used[:self.size] = self.last_used[:self.size]
+        stored_at = np.zeros(capacity, dtype=np.float64)
+        stored_at[:self.size] = self.stored_at[:self.size]
+        self.vectors, self.last_used, self.stored_at = vectors, last_used, stored_at
+        self.answers.extend([None] * (capacity - len(self.answers)))
+        self.signatures.extend([None] * (capacity - len(self.signatures)))
+
+    def search(self, vector: np.ndarray, signature: tuple, threshold: float, tick: int, oldest: float,
+               candidates: int = 4):
+        """Best answer at or above threshold with a matching signature, ignoring entries stored before oldest."""
+        if self.size == 0:
+            return None, 0.0
+        scores = self.vectors[:self.size] @ vector
+        scores[self.stored_at[:self.size] < oldest] = -1.0
+        k = min(candidates, self.size)
+        top = np.argpartition(scores, -k)[-k:]
+        for slot in top[np.argsort(scores[top])[::-1]]:
+            score = float(scores[slot])
+            if score < threshold:
+                break
+            if self.signatures[slot] == signature:
+                self.last_used[slot] = tick
+                return self.answers[slot], score
+        return None, float(scores[top].max())
+
+    def add(self, vector: np.ndarray, signature: tuple, answer: str, tick: int, now: float):
+        if self.size == len(self.answers):
+            self._grow(len(self.answers) * 2)
+        slot = self.size
+        self.size += 1
+        self._store(slot, vector, signature, answer, tick, now)
+
+    def replace_lru(self, vector: np.ndarray, signature: tuple, answer: str, tick: int, now: float):
+        slot = int(np.argmin(self.last_used[:self.size]))
+        self._store(slot, vector, signature, answer, tick, now)
+
+    def _store(self, slot, vector, signature, answer, tick, now):
+        self.vectors[slot] = vector
+        self.last_used[slot] = tick
+        self.stored_at[slot] = now
+        self.answers[slot] = answer
+        self.signatures[slot] = signature
+
+    def evict_lru(self):
+        """Drops the least recently used entry by moving the last row into its slot."""
+        slot = int(np.argmin(self.last_used[:self.size]))
+        last = self.size - 1
+        if slot != last:
+            self._store(slot, self.vectors[last], self.signatures[last], self.answers[last], self.last_used[last],
+                        self.stored_at[last])
+        self.answers[last] = None
+        self.signatures[last] = None
+        self.size -= 1
+
+    def purge(self, oldest: float) -> int:
+        """Drops entries stored before oldest, keeping the rest packed at the front; returns how many."""
+        keep = np.flatnonzero(self.stored_at[:self.size] >= oldest)
+        removed = self.size - len(keep)
+        if removed:
+            self.vectors[:len(keep)] = self.vectors[keep]
+            self.last_used[:len(keep)] = self.last_used[keep]
+            self.stored_at[:len(keep)] = self.stored_at[keep]
+            answers, signatures = [self.answers[i] for i in keep], [self.signatures[i] for i in keep]
+            self.answers[:self.size] = answers + [None] * removed
+            self.signatures[:self.size] = signatures + [None] * removed
+            self.size = len(keep)
+        return removed
+
+
+class SemanticCache:
+    def __init__(self, enabled: bool = SEMANTIC_CACHE_ENABLED, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, dim: int = SEMANTIC_CACHE_DIM,
+                 ttl: float = SEMANTIC_CACHE_TTL, max_scopes: int = SEMANTIC_CACHE_MAX_SCOPES):
+        """
+        Args:
+            enabled: Lookups and fills are no-ops when False
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Total entries across all indexes; least recently used are evicted
+            dim: Embedding dimension
+            ttl: Seconds an answer can be reused
+            max_scopes: Indexes kept; the least recently used is dropped whole
+        """
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_scopes = max_scopes
+        self.vectorizer = HashedNgramVectorizer(dim)
+        self.indexes = OrderedDict()  # (subject, mode, prompt hash) -> SemanticIndex, least recent first
+        self.entries = 0
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+        self.timed_lookups = 0
+        self.lookup_seconds = 0.0
+
+    def _next_tick(self) -> int:
+        self._tick += 1
+        return self._tick
+
+    def lookup(self, scope: tuple, question: str):
+        """
+        Returns a cached answer for a question similar to this one, or None.
+
+        Args:
+            scope: (subject, mode, prompt hash); answers never cross scopes
+            question: The raw student question
+        """
+        if not self.enabled:
+            return None
+        index = self.indexes.get(scope)
+        if index is None:
+            self.misses += 1
+            return None
+        self.indexes.move_to_end(scope)
+
+        started = time.perf_counter()
+        text = normalize_question(question)
+        answer, _ = index.search(self.vectorizer.transform(text), question_signature(question), self.threshold,
+                                 self._next_tick(), time.monotonic() - self.ttl)
+        self.lookup_seconds += time.perf_counter() - started
+        self.timed_lookups += 1
+
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    def add(self, scope: tuple, question: str, answer: str):
+        if not self.enabled:
+            return
+        vector = self.vectorizer.transform(normalize_question(question))
+        signature = question_signature(question)
+        now = time.monotonic()
+        index = self.indexes.get(scope)
+        if index is None:
+            while len(self.indexes) >= self.max_scopes:
+                _, dropped = self.indexes.popitem(last=False)
+                self.entries -= dropped.size
+            index = self.indexes[scope] = SemanticIndex(self.vectorizer.dim)
+        else:
+            self.indexes.move_to_end(scope)
+        tick = self._next_tick()
+
+        if self.entries >= self.max_entries:
+            self._purge(now - self.ttl, keep=scope)
+        if self.entries < self.max_entries:
+            index.add(vector, signature, answer, tick, now)
+            self.entries += 1
+        elif index.size:
+            index.replace_lru(vector, signature, answer, tick, now)
+        else:
+            # New scope while full: make room in the largest index
+            largest_scope, largest = max(self.indexes.items(), key=lambda item: item[1].size)
+            largest.evict_lru()
+            if not largest.size:
+                del self.indexes[largest_scope]
+            index.add(vector, signature, answer, tick, now)
+
+    def _purge(self, oldest: float, keep: tuple):
+        """Drops expired entries everywhere, and the indexes left empty except keep's."""
+        for scope, index in list(self.indexes.items()):
+            self.entries -= index.purge(oldest)
+            if not index.size and scope != keep:
+                del self.indexes[scope]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": self.entries,
+            "max_entries": self.max_entries,
+            "indexes": len(self.indexes),
+            "max_scopes": self.max_scopes,
+            "ttl": self.ttl,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avg_lookup_ms": round(self.lookup_seconds * 1000 / self.timed_lookups, 3) if self.timed_lookups else 0.0,
+        }
+
+
+# Singleton instance
+semantic_cache = SemanticCache()
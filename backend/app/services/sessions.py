@@ -0,0 +1,163 @@
+"""
+Session Memory
+Server-side conversation history per (session, subject, mode).
+
+Each session keeps the last few turns in a ring buffer, zlib-compressed.
+Turns that fall out of the ring are folded into a running extractive summary,
+and the context sent upstream is trimmed to a fixed token budget. Sessions
+expire after SESSION_TTL seconds idle, and the least recently used are evicted
+beyond SESSION_MAX_ACTIVE.
+"""
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict, deque
+
+from app.services.admission import estimate_tokens
+
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+SESSION_MAX_ACTIVE = int(os.getenv("SESSION_MAX_ACTIVE", "50000"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "4"))
+# Upper bound on history tokens (summary + recent turns) added to one upstream call
+SESSION_CONTEXT_TOKENS = int(os.getenv("SESSION_CONTEXT_TOKENS", "1200"))
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "300"))
+# Stored answers are clipped; the start of an answer carries most of its context
+SESSION_MAX_ANSWER_CHARS = int(os.getenv("SESSION_MAX_ANSWER_CHARS", "3000"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _first_sentence(text: str, max_chars: int = 160) -> str:
+    sentence = _SENTENCE_END.split(" ".join(text.split()), maxsplit=1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 3].rstrip() + "..."
+
+
+def summarize_turn(question: str, answer: str) -> str:
+    """One-line extractive summary of a turn: the question and the answer's lead sentence."""
+    return f"- Student asked: {_first_sentence(question)} Tutor: {_first_sentence(answer)}"
+
+
+class Session:
+    __slots__ = ("turns", "summary", "last_seen")
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)  # zlib-compressed "question\0answer"
+        self.summary = []  # one line per turn rolled out of the ring, oldest first
+        self.last_seen = time.monotonic()
+
+    @staticmethod
+    def _unpack(blob: bytes) -> tuple:
+        question, _, answer = zlib.decompress(blob).decode("utf-8").partition("\0")
+        return question, answer
+
+    def add(self, question: str, answer: str, summary_tokens: int):
+        if len(self.turns) == self.turns.maxlen:
+            self.summary.append(summarize_turn(*self._unpack(self.turns[0])))
+            while len(self.summary) > 1 and estimate_tokens("\n".join(self.summary)) > summary_tokens:
+                self.summary.pop(0)
+        self.turns.append(zlib.compress(f"{question}\0{answer[:SESSION_MAX_ANSWER_CHARS]}".encode("utf-8")))
+
+    def messages(self, budget: int) -> list:
+        """Summary plus the most recent turns that fit in budget tokens, as chat messages."""
+        messages = []
+        if self.summary:
+            summary = "Summary of earlier turns in this conversation:\n" + "\n".join(self.summary)
+            budget -= estimate_tokens(summary)
+            messages.append({"role": "system", "content": summary})
+
+        recent = []
+        for blob in reversed(self.turns):
+            question, answer = self._unpack(blob)
+            cost = estimate_tokens(question) + estimate_tokens(answer)
+            if cost > budget:
+                # Keep the question and the start of an overlong answer rather than drop the turn
+                if recent or budget < estimate_tokens(question) + 32:
+                    break
+                answer = answer[:(budget - estimate_tokens(question)) * 4].rstrip() + "..."
+                cost = budget
+            budget -= cost
+            recent.append({"role": "assistant", "content": answer})
+            recent.append({"role": "user", "content": question})
+
+        messages.extend(reversed(recent))
+        return messages
+
+
+class SessionStore:
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = SESSION_MAX_ACTIVE,
+                 max_turns: int = SESSION_MAX_TURNS, context_tokens: int = SESSION_CONTEXT_TOKENS,
+                 summary_tokens: int = SESSION_SUMMARY_TOKENS):
+        """
+        Args:
+            ttl: Idle seconds before a session is dropped
+            max_sessions: Most sessions kept; least recently used are evicted first
+            max_turns: Turns kept verbatim before being rolled into the summary
+            context_tokens: Token budget for the history sent with each question
+            summary_tokens: Token budget for the running summary
+        """
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.context_tokens = context_tokens
+        self.summary_tokens = summary_tokens
+        self._sessions = OrderedDict()  # (session_id, subject, mode) -> Session, least recent first
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, key):
+        return key in self._sessions
+
+    def _evict(self, now: float):
+        # Ordered by last use, so expired sessions are always at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen < self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    def history(self, key: tuple) -> list:
+        """
+        Returns the chat messages to send before the new question (empty for a new session).
+
+        Args:
+            key: (session_id, subject, mode)
+        """
+        now = time.monotonic()
+        self._evict(now)
+        session = self._sessions.get(key)
+        if session is None:
+            return []
+        session.last_seen = now
+        self._sessions.move_to_end(key)
+        return session.messages(self.context_tokens)
+
+    def record(self, key: tuple, question: str, answer: str):
+        now = time.monotonic()
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = Session(self.max_turns)
+        session.add(question, answer, self.summary_tokens)
+        session.last_seen = now
+        self._sessions.move_to_end(key)
+        self._evict(now)
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._sessions),
+            "max_active": self.max_sessions,
+            "ttl": self.ttl,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+# Singleton instance
+session_store = SessionStore()
@@ -0,0 +1,125 @@
+"""
+Single-Flight Streams
+Coalesces identical in-flight generations: the first request drives the
+upstream stream and later identical requests subscribe to it, getting the
+already-produced prefix replayed before following live.
+"""
+import asyncio
+
+from app.services.gemini import GenerationError
+
+
+class Flight:
+    def __init__(self, source, on_complete=None, linger: float = 0.0):
+        """
+        Args:
+            source: Async iterator of text chunks (the upstream generation)
+            on_complete: Called with the full text when the source finishes without errors
+            linger: Seconds the generation keeps running after its last subscriber left,
+                so a reconnecting client can pick it up again
+        """
+        self.chunks = []
+        self.done = False
+        self.failed = False
+        self.subscribers = 0
+        self.abandoned = False
+        self.linger = linger
+        self._on_complete = on_complete
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._drive(source))
+
+    async def _drive(self, source):
+        try:
+            async for chunk in source:
+                if isinstance(chunk, GenerationError):
+                    self.failed = True
+                self.chunks.append(chunk)
+                self._notify()
+        except asyncio.CancelledError:
+            self.failed = True
+            raise
+        except Exception as e:
+            self.failed = True
+            self.chunks.append(GenerationError(f"Error generating response: {str(e)}"))
+        finally:
+            self.done = True
+            self._notify()
+
+        if not self.failed and self.chunks and self._on_complete:
+            self._on_complete("".join(self.chunks))
+
+    def _notify(self):
+        # Wake everyone waiting on the current event and start a fresh one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def subscribe(self, start: int = 0):
+        """Yields every chunk of the generation from chunk number start on, then follows it live."""
+        self.subscribers += 1
+        position = start
+        try:
+            while True:
+                while position < len(self.chunks):
+                    yield self.chunks[position]
+                    position += 1
+                if self.done:
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                if self.linger:
+                    asyncio.get_running_loop().call_later(self.linger, self._abandon_if_idle)
+                else:
+                    self._abandon_if_idle()
+
+    def _abandon_if_idle(self):
+        if self.subscribers == 0 and not self.done:
+            # Nobody is listening any more; stop paying for tokens
+            self.abandoned = True
+            self.task.cancel()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}  # key -> Flight
+        self.started = 0
+        self.joined = 0
+
+    def __len__(self):
+        return len(self._flights)
+
+    def __contains__(self, key):
+        flight = self._flights.get(key)
+        return flight is not None and not flight.abandoned
+
+    def subscribe(self, key, start, on_complete=None):
+        """
+        Returns a chunk iterator for key, starting the generation if none is in flight.
+
+        Args:
+            key: Hashable identity of the generation
+            start: Zero-argument callable returning the upstream async iterator
+            on_complete: Called once with the full text of a successful generation
+        """
+        flight = self._flights.get(key)
+        if flight is None or flight.abandoned:
+            flight = Flight(start(), on_complete)
+            self._flights[key] = flight
+            self.started += 1
+
+            def _forget(_task, flight=flight):
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+            flight.task.add_done_callback(_forget)
+        else:
+            self.joined += 1
+        return flight.subscribe()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "started": self.started,
+            "joined": self.joined,
+        }
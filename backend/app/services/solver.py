@@ -0,0 +1,838 @@
+"""
+Solver Service
+Exact mathematics for the steps the LLM would otherwise work out token by
+token: equations and systems, derivatives, integrals, simplification,
+matrices and descriptive statistics.
+
+Input is tokenized like analytics expressions ("2x^2 + 5x - 3 = 0", "x sin x")
+and checked against an AST whitelist in the API process, without SymPy. The
+same tree is then built into SymPy objects node by node, never through
+sympify/eval, inside a pool of worker processes. Every job gets its own
+RLIMIT_CPU budget on top of what the worker has used so far; SIGXCPU is
+turned into an error, so a runaway integral fails on its own and the worker
+stays up. Results (and deterministic failures) are kept in an LRU cache.
+
+Mathematics and physics questions that contain a computable problem get the
+verified result added to the system prompt; bare arithmetic is answered
+directly.
+"""
+import ast
+import asyncio
+import copy
+import json
+import math
+import multiprocessing
+import os
+import re
+import signal
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows: only the wall-clock timeout applies
+    resource = None
+
+import numpy as np
+
+from app.services.analytics import BINARY_FUNCTIONS, CONSTANTS, FUNCTIONS, ExpressionError, compile_expression, to_python
+
+SOLVER_WORKERS = int(os.getenv("SOLVER_WORKERS", str(min(2, os.cpu_count() or 1))))
+# CPU seconds one job may use before it is stopped
+SOLVER_CPU_SECONDS = int(os.getenv("SOLVER_CPU_SECONDS", "2"))
+# Wall-clock limit for /api/solve, including time queued behind other jobs
+SOLVER_TIMEOUT = float(os.getenv("SOLVER_TIMEOUT", "5"))
+# Chat answers wait at most this long for a verified result before going ahead without one
+SOLVER_CHAT_TIMEOUT = float(os.getenv("SOLVER_CHAT_TIMEOUT", "1.5"))
+SOLVER_CACHE_SIZE = int(os.getenv("SOLVER_CACHE_SIZE", "1024"))
+SOLVER_MAX_INPUT = int(os.getenv("SOLVER_MAX_INPUT", "500"))
+# Exact numbers longer than this are shown in scientific notation
+SOLVER_MAX_DIGITS = int(os.getenv("SOLVER_MAX_DIGITS", "20"))
+SOLVER_SUBJECTS = frozenset(s.strip() for s in os.getenv("SOLVER_SUBJECTS", "mathematics,physics").split(",") if s.strip())
+
+OPERATIONS = ("solve", "simplify", "evaluate", "differentiate", "integrate", "matrix", "statistics")
+MAX_MATRIX_SIZE = 6
+MAX_DATA_POINTS = 10000
+# Larger constant exponents are computed digit by digit in C, where no CPU limit can interrupt them
+MAX_EXPONENT = 1000
+
+_SOLVER_FUNCTIONS = (FUNCTIONS.keys() - {"round"}) | (BINARY_FUNCTIONS.keys() - {"mod"})
+_SOLVER_CONSTANTS = CONSTANTS.keys() | {"oo", "inf"}
+_GREEK = frozenset("alpha beta gamma delta theta phi omega mu sigma rho lamda".split())
+_SYMBOL = re.compile(r"[A-Za-z](?:_?\d+)?$")
+_UNICODE = str.maketrans({"×": "*", "÷": "/", "−": "-", "–": "-", "²": "^2", "³": "^3", "π": "pi", "√": "sqrt ",
+                          "θ": "theta", "α": "alpha", "β": "beta", "ω": "omega", "∞": "oo"})
+_COMPARISONS = (ast.Eq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+
+class SolverError(ValueError):
+    """The problem can't be parsed, or has no result the solver can compute."""
+
+
+class SolverUnavailable(RuntimeError):
+    """The solver is busy, timed out, or SymPy isn't installed."""
+
+
+class _CpuLimitExceeded(BaseException):
+    """Raised by the SIGXCPU handler; a BaseException so SymPy's broad except clauses don't swallow it."""
+
+
+# ---------------------------------------------------------------------------
+# Parsing (API process and workers; no SymPy)
+# ---------------------------------------------------------------------------
+
+def _check(node) -> set:
+    """Names of the variables in a whitelisted tree; SolverError for anything else."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return set()
+    if isinstance(node, ast.Name):
+        if node.id in _SOLVER_CONSTANTS:
+            return set()
+        if node.id in _SOLVER_FUNCTIONS:
+            raise SolverError(f"{node.id} needs an argument")
+        if _SYMBOL.match(node.id) or node.id in _GREEK:
+            return {node.id}
+        raise SolverError(f"Unknown name '{node.id}' (write products like xy as x*y)")
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        return _check(node.operand)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow)):
+        names = _check(node.left) | _check(node.right)
+        if isinstance(node.op, ast.Pow) and not _check(node.right):
+            # Folded in floating point first, so 9^9^9 is refused instead of computed
+            try:
+                exponent = compile_expression(ast.unparse(node.right))(np.zeros(1))[0]
+            except ExpressionError:
+                exponent = math.inf
+            if not abs(exponent) <= MAX_EXPONENT:
+                raise SolverError(f"Constant exponents are limited to {MAX_EXPONENT}")
+        return names
+    if isinstance(node, ast.Compare) and len(node.ops) == 1 and isinstance(node.ops[0], _COMPARISONS):
+        return _check(node.left) | _check(node.comparators[0])
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name, arity = node.func.id, len(node.args)
+        if name not in _SOLVER_FUNCTIONS:
+            raise SolverError(f"Unknown function '{name}'")
+        if arity != (2 if name in BINARY_FUNCTIONS else 1):
+            raise SolverError(f"Wrong number of arguments for {name}()")
+        return set().union(*(_check(argument) for argument in node.args))
+    raise SolverError(f"'{ast.unparse(node)}' is not allowed")
+
+
+def parse(text: str):
+    """
+    Whitelisted AST of one expression, equation ("=") or inequality.
+
+    Raises:
+        SolverError: Syntax errors, unknown names or functions
+    """
+    text = text.translate(_UNICODE).strip()
+    if not text:
+        raise SolverError("Expression is empty")
+    # A single "=" is an equation
+    text = re.sub(r"(?<![<>=!])=(?!=)", "==", text)
+    try:
+        tree = ast.parse(to_python(text), mode="eval")
+    except (ExpressionError, SyntaxError) as e:
+        raise SolverError(str(e) if isinstance(e, ExpressionError) else "Could not parse the expression")
+    _check(tree.body)
+    return tree.body
+
+
+def _split(text: str, separators: str) -> list:
+    """Splits at separators outside parentheses."""
+    parts, depth, current = [], 0, []
+    for char in text:
+        depth += (char == "(") - (char == ")")
+        if char in separators and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _expressions(job: dict) -> list:
+    """Parsed inputs of a job: equations of a system, matrix rows, or data values."""
+    text = job["expression"]
+    operation = job["operation"]
+    if operation == "statistics":
+        if not re.fullmatch(r"[\s\d.,;eE+\-\[\]()]*", text):
+            raise SolverError("Statistics need a list of numbers, e.g. 2, 4, 4, 5")
+        values = re.findall(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?", text)
+        if not values:
+            raise SolverError("No numbers found")
+        if len(values) > MAX_DATA_POINTS:
+            raise SolverError(f"At most {MAX_DATA_POINTS} values")
+        return values
+    if operation == "matrix":
+        rows = re.findall(r"\[([^\[\]]*)\]", text) if "[" in text else _split(text, ";\n")
+        matrix = [_split(row, ",") if "," in row else row.split() for row in rows]
+        if not matrix or len({len(row) for row in matrix}) != 1 or not matrix[0]:
+            raise SolverError("Write the matrix row by row, e.g. [[1, 2], [3, 4]]")
+        if len(matrix) > MAX_MATRIX_SIZE or len(matrix[0]) > MAX_MATRIX_SIZE:
+            raise SolverError(f"Matrices are limited to {MAX_MATRIX_SIZE}x{MAX_MATRIX_SIZE}")
+        return [[parse(entry) for entry in row] for row in matrix]
+    # Systems: "x + y = 3; x - y = 1", or comma separated when there are several equations
+    parts = _split(text, ";\n")
+    if operation == "solve" and len(parts) == 1 and text.count("=") > 1:
+        parts = _split(text, ",")
+    if len(parts) > 1 and operation != "solve":
+        raise SolverError(f"{operation} takes a single expression")
+    return [parse(part) for part in parts]
+
+
+def validate(job: dict) -> dict:
+    """
+    Normalized copy of a job, checked without SymPy.
+
+    Args:
+        job: {"operation", "expression"} plus optional "variables" (list of names),
+            "order" (derivatives) and "lower"/"upper" (definite integrals)
+
+    Raises:
+        SolverError: Unknown operation or invalid input
+    """
+    operation = job.get("operation")
+    if operation not in OPERATIONS:
+        raise SolverError(f"Operation must be one of: {', '.join(OPERATIONS)}")
+    expression = (job.get("expression") or "").strip()
+    if len(expression) > SOLVER_MAX_INPUT:
+        raise SolverError(f"Input is longer than {SOLVER_MAX_INPUT} characters")
+    normalized = {"operation": operation, "expression": expression}
+    parsed = _expressions(normalized)
+    if operation in ("matrix", "statistics"):
+        return normalized
+
+    names = set().union(*(_check(node) for node in parsed))
+    variables = [v.strip() for v in job.get("variables") or [] if v.strip()]
+    for variable in variables:
+        if not (_SYMBOL.match(variable) or variable in _GREEK):
+            raise SolverError(f"'{variable}' is not a valid variable name")
+    if operation == "evaluate" and names:
+        raise SolverError("evaluate needs numbers only; use simplify for expressions with variables")
+    if operation in ("differentiate", "integrate") and len(variables) > 1:
+        raise SolverError(f"{operation} takes one variable")
+    if not variables and operation in ("solve", "differentiate", "integrate"):
+        # x, y, z first, then alphabetical
+        variables = sorted(names, key=lambda name: (name not in "xyz", name))[:len(parsed)] or ["x"]
+    if variables:
+        normalized["variables"] = variables
+    if operation == "differentiate":
+        normalized["order"] = int(job.get("order") or 1)
+        if not 1 <= normalized["order"] <= 10:
+            raise SolverError("order must be between 1 and 10")
+    if operation == "integrate" and (job.get("lower") is not None or job.get("upper") is not None):
+        if job.get("lower") is None or job.get("upper") is None:
+            raise SolverError("A definite integral needs both lower and upper")
+        for bound in ("lower", "upper"):
+            normalized[bound] = str(job[bound]).strip()
+            parse(normalized[bound])
+    return normalized
+
+
+# ---------------------------------------------------------------------------
+# Questions in chat
+# ---------------------------------------------------------------------------
+
+_DIRECT_PREFIX = re.compile(r"^(?:what\s+is|what's|calculate|compute|evaluate|work\s+out|find)\s+(?:the\s+value\s+of\s+)?", re.I)
+# "What is 5", "What is 1e5" have nothing to compute
+_SINGLE_NUMBER = re.compile(r"[-+]?\s*(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+# "sin 30" in a question usually means degrees; the solver works in radians
+_TRIGONOMETRIC = frozenset({"sin", "cos", "tan", "sec", "csc", "cosec", "cot"})
+_KEYWORDS = [
+    ("differentiate", re.compile(r"\b(?:differentiate|(?:find\s+)?(?:the\s+)?(?:first\s+)?derivative\s+of|d/d(?P<var>[a-z]))\s*(?:of\s+)?:?\s*", re.I)),
+    ("integrate", re.compile(r"\b(?:integrate|(?:find|evaluate|calculate)?\s*(?:the\s+)?(?:definite\s+|indefinite\s+)?integral\s+of)\s*:?\s*", re.I)),
+    ("simplify", re.compile(r"\b(?:simplify|expand|factori[sz]e)\s*:?\s*", re.I)),
+    ("matrix", re.compile(r"\b(?:find\s+)?(?:the\s+)?(?:determinant|inverse|eigenvalues?|rank)\s+of\s+(?:the\s+)?(?:matrix\s*)?:?\s*", re.I)),
+    ("statistics", re.compile(r"\b(?:find\s+)?(?:the\s+)?(?:mean|median|mode|variance|standard\s+deviation)\b[\w\s,]*?\bof\s*(?:the\s+data\s*)?:?\s*", re.I)),
+    ("solve", re.compile(r"\b(?:solve|find\s+(?:the\s+)?roots\s+of)\s*(?:for\s+(?P<var>[a-z])\s*)?:?\s*", re.I)),
+]
+_WITH_RESPECT = re.compile(r"\s+(?:with\s+respect\s+to|w\.?r\.?t\.?)\s+(?P<var>[a-z])$", re.I)
+_BOUNDS = re.compile(r"\s+(?:from|between)\s+(?P<lower>\S+)\s+(?:to|and)\s+(?P<upper>\S+)$", re.I)
+_FOR = re.compile(r"\s+for\s+(?P<vars>[a-z](?:\s*(?:,|and)\s*[a-z])*)$", re.I)
+
+
+def problem_from_question(question: str) -> Optional[dict]:
+    """
+    The computable problem in a chat question, as a validated job, or None.
+
+    Recognizes "Solve for x: 2x^2 + 5x - 3 = 0", "Differentiate x^2 sin x",
+    "Integrate x^2 from 0 to 1", "Find the mean of 2, 4, 4, 5",
+    "Find the determinant of [[1, 2], [3, 4]]" and bare equations or
+    arithmetic ("2x + 3 = 7", "What is 17 x 23?"). Anything else in the
+    problem text (words, "and show your working") makes it None, so
+    nothing is injected unless the solver saw the whole problem.
+    The job's "direct" flag marks bare arithmetic, whose result is the whole answer.
+    """
+    text = question.strip().rstrip("?.! ").strip()
+    if not text or len(text) > SOLVER_MAX_INPUT:
+        return None
+    for operation, keyword in _KEYWORDS:
+        match = keyword.search(text)
+        if not match:
+            continue
+        job, rest = {"operation": operation}, text[match.end():]
+        if match.groupdict().get("var"):
+            job["variables"] = [match.group("var")]
+        for clause in (_WITH_RESPECT, _BOUNDS, _FOR):
+            found = clause.search(rest) if operation not in ("matrix", "statistics") else None
+            if found:
+                rest = rest[:found.start()]
+                if clause is _BOUNDS and operation == "integrate":
+                    job.update(lower=found.group("lower"), upper=found.group("upper"))
+                elif clause is not _BOUNDS:
+                    job["variables"] = re.findall(r"[a-z]", found.groupdict().get("vars") or found.group("var"), re.I)
+        job["expression"] = rest
+        return _valid_or_none(job)
+
+    # No keyword: a bare equation is solved, bare arithmetic evaluated
+    # "17 x 23" is a product
+    bare = re.sub(r"(?<=\d)\s+x\s+(?=\d)", " * ", _DIRECT_PREFIX.sub("", text))
+    if _SINGLE_NUMBER.fullmatch(bare.strip()):
+        return None
+    job = _valid_or_none({"operation": "solve" if "=" in bare else "evaluate", "expression": bare})
+    if job and job["operation"] == "evaluate":
+        tree = parse(job["expression"])
+        if isinstance(tree, ast.Name) or any(
+            isinstance(node, ast.Call) and node.func.id in _TRIGONOMETRIC for node in ast.walk(tree)
+        ):
+            # "What is pi", "What is sin 30": left to the model
+            return None
+        job["direct"] = _arithmetic(tree)
+    return job
+
+
+def _arithmetic(node) -> bool:
+    """Only numeric literals and + - * / ^, so the result is the whole answer."""
+    if isinstance(node, ast.Constant):
+        return True
+    if isinstance(node, ast.UnaryOp):
+        return _arithmetic(node.operand)
+    return isinstance(node, ast.BinOp) and _arithmetic(node.left) and _arithmetic(node.right)
+
+
+def _valid_or_none(job: dict) -> Optional[dict]:
+    try:
+        return validate(job)
+    except SolverError:
+        return None
+
+
+def prompt_note(result: dict) -> str:
+    """System prompt addition for a verified result."""
+    return (
+        "VERIFIED RESULT (computed exactly by a computer algebra system; use these values, do not "
+        "recompute or contradict them, and keep the working short):\n" + result["summary"]
+    )
+
+
+# ---------------------------------------------------------------------------
+# Computation (workers; needs SymPy)
+# ---------------------------------------------------------------------------
+
+def _sympy_tables(sp) -> tuple:
+    functions = {
+        "sin": sp.sin, "cos": sp.cos, "tan": sp.tan, "sec": sp.sec, "csc": sp.csc, "cosec": sp.csc, "cot": sp.cot,
+        "asin": sp.asin, "acos": sp.acos, "atan": sp.atan, "arcsin": sp.asin, "arccos": sp.acos, "arctan": sp.atan,
+        "sinh": sp.sinh, "cosh": sp.cosh, "tanh": sp.tanh, "exp": sp.exp, "ln": sp.log, "log": lambda v: sp.log(v, 10),
+        "log10": lambda v: sp.log(v, 10), "log2": lambda v: sp.log(v, 2), "sqrt": sp.sqrt, "cbrt": sp.cbrt,
+        "abs": sp.Abs, "sign": sp.sign, "floor": sp.floor, "ceil": sp.ceiling,
+        "atan2": sp.atan2, "min": sp.Min, "max": sp.Max, "pow": sp.Pow, "hypot": lambda a, b: sp.sqrt(a ** 2 + b ** 2),
+    }
+    constants = {"pi": sp.pi, "e": sp.E, "tau": 2 * sp.pi, "oo": sp.oo, "inf": sp.oo}
+    relations = {ast.Eq: sp.Eq, ast.Lt: sp.Lt, ast.LtE: sp.Le, ast.Gt: sp.Gt, ast.GtE: sp.Ge}
+    return functions, constants, relations
+
+
+def _build(node, sp, tables):
+    """SymPy object for a tree that passed _check()."""
+    functions, constants, relations = tables
+    if isinstance(node, ast.Constant):
+        # Decimals stay exact: 0.1 is 1/10
+        return sp.Integer(node.value) if isinstance(node.value, int) else sp.Rational(repr(node.value))
+    if isinstance(node, ast.Name):
+        return constants[node.id] if node.id in constants else sp.Symbol(node.id, real=True)
+    if isinstance(node, ast.UnaryOp):
+        operand = _build(node.operand, sp, tables)
+        return -operand if isinstance(node.op, ast.USub) else operand
+    if isinstance(node, ast.BinOp):
+        left, right = _build(node.left, sp, tables), _build(node.right, sp, tables)
+        if isinstance(node.op, ast.Add):
+            return left + right
+        if isinstance(node.op, ast.Sub):
+            return left - right
+        if isinstance(node.op, ast.Mult):
+            return left * right
+        if isinstance(node.op, ast.Div):
+            return left / right
+        return left ** right
+    if isinstance(node, ast.Compare):
+        return relations[type(node.ops[0])](_build(node.left, sp, tables), _build(node.comparators[0], sp, tables))
+    return functions[node.func.id](*(_build(argument, sp, tables) for argument in node.args))
+
+
+def _text(value) -> str:
+    import sympy as sp
+    if value is sp.zoo or value is sp.nan:
+        return "undefined"
+    if value is sp.oo or value is -sp.oo:
+        return "infinity" if value is sp.oo else "-infinity"
+    return sp.sstr(value).replace("**", "^")
+
+
+def _too_long(value) -> bool:
+    """An exact rational with more than SOLVER_MAX_DIGITS digits above or below the line."""
+    if not value.is_Rational:
+        return False
+    # From the bit length: str() of a huge integer is slow, and refused past 4300 digits
+    bits = max(abs(value.p).bit_length(), value.q.bit_length())
+    return bits * math.log10(2) > SOLVER_MAX_DIGITS
+
+
+def _scientific(value) -> str:
+    """"1.26765 × 10^30" for a number too long to read in full."""
+    mantissa, _, exponent = str(value.evalf(6)).partition("e")
+    if "." in mantissa:
+        mantissa = mantissa.rstrip("0").rstrip(".")
+    return f"{mantissa} × 10^{int(exponent)}" if exponent else mantissa
+
+
+def _number(value):
+    """Float for a real value, "a+bi" text for a complex one, None if it has no numeric value."""
+    try:
+        number = complex(value.evalf(15))
+    except (TypeError, ValueError, AttributeError):
+        return None
+    if abs(number.imag) > 1e-12 * max(abs(number.real), 1.0):
+        return f"{number.real:.12g}{number.imag:+.12g}i"
+    return number.real if math.isfinite(number.real) else None
+
+
+def _approx(value) -> str:
+    """" = exact ≈ decimal" tail, empty when the exact value is already a plain number."""
+    number = _number(value)
+    if not isinstance(number, float) or value.is_Integer or value.is_infinite:
+        return ""
+    return f" ≈ {number:.6g}"
+
+
+def compute(job: dict) -> dict:
+    """
+    Exact result of a validated job.
+
+    Returns:
+        {"operation", "input", "result", "latex", "summary", ...operation-specific fields}
+
+    Raises:
+        SolverError: No result (no closed form, singular matrix, ...)
+        SolverUnavailable: SymPy isn't installed
+    """
+    try:
+        import sympy as sp
+    except ImportError:
+        raise SolverUnavailable("sympy is not installed; run `pip install sympy` to enable the solver")
+
+    tables = _sympy_tables(sp)
+    operation = job["operation"]
+    inputs = _expressions(job)
+
+    if operation == "statistics":
+        return _statistics([sp.Rational(value) for value in inputs], sp)
+    if operation == "matrix":
+        return _matrix(sp.Matrix([[_build(entry, sp, tables) for entry in row] for row in inputs]), sp)
+
+    expressions = [_build(node, sp, tables) for node in inputs]
+    variables = [sp.Symbol(name, real=True) for name in job.get("variables", [])]
+    # From the tree, not SymPy: 17*23 would already read 391, and x^2 + 1 = 0 False
+    shown = "; ".join(_source(node) for node in inputs)
+    result = {"operation": operation, "input": shown}
+
+    if operation == "solve":
+        return {**result, **_solve(expressions, variables, shown, sp)}
+
+    (expression,) = expressions
+    if isinstance(expression, sp.core.relational.Relational):
+        raise SolverError(f"{operation} takes an expression, not an equation")
+
+    if operation == "evaluate":
+        value = sp.simplify(expression)
+        if value is sp.zoo or value is sp.nan:
+            return {**result, "result": "undefined", "latex": r"\text{undefined}", "numeric": None,
+                    "summary": f"{shown} is undefined"}
+        if _too_long(value):
+            return {**result, "result": _scientific(value), "latex": sp.latex(value.evalf(6)),
+                    "numeric": _number(value), "summary": f"{shown} ≈ {_scientific(value)}"}
+        return {**result, "result": _text(value), "latex": sp.latex(value), "numeric": _number(value),
+                "summary": f"{shown} = {_text(value)}{_approx(value)}"}
+
+    if operation == "simplify":
+        simplified, factored, expanded = sp.simplify(expression), sp.factor(expression), sp.expand(expression)
+        return {
+            **result, "result": _text(simplified), "latex": sp.latex(simplified),
+            "factored": _text(factored), "expanded": _text(expanded),
+            "summary": f"{shown} simplifies to {_text(simplified)}; factorised: {_text(factored)}; "
+                       f"expanded: {_text(expanded)}",
+        }
+
+    (variable,) = variables
+    if operation == "differentiate":
+        order = job.get("order", 1)
+        derivative = sp.diff(expression, variable, order)
+        simpler = sp.simplify(derivative)
+        if sp.count_ops(simpler) < sp.count_ops(derivative):
+            derivative = simpler
+        prime = f"d^{order}/d{variable}^{order}" if order > 1 else f"d/d{variable}"
+        return {**result, "variable": str(variable), "order": order, "result": _text(derivative),
+                "latex": sp.latex(derivative), "summary": f"{prime} ({shown}) = {_text(derivative)}"}
+
+    # integrate
+    if "lower" in job:
+        lower, upper = (_build(parse(job[bound]), sp, tables) for bound in ("lower", "upper"))
+        value = sp.integrate(expression, (variable, lower, upper))
+        if value.has(sp.Integral):
+            value = sp.Integral(expression, (variable, lower, upper)).evalf(15)
+            if not value.is_number:
+                raise SolverError("No closed form for this integral")
+        bounds = f" from {_text(lower)} to {_text(upper)}"
+        return {**result, "variable": str(variable), "lower": _text(lower), "upper": _text(upper),
+                "result": _text(value), "latex": sp.latex(value), "numeric": _number(value),
+                "summary": f"Integral of {shown} d{variable}{bounds} = {_text(value)}{_approx(value)}"}
+    antiderivative = sp.integrate(expression, variable)
+    if antiderivative.has(sp.Integral):
+        raise SolverError("No elementary antiderivative")
+    return {**result, "variable": str(variable), "result": f"{_text(antiderivative)} + C",
+            "latex": sp.latex(antiderivative) + " + C",
+            "summary": f"Integral of {shown} d{variable} = {_text(antiderivative)} + C"}
+
+
+def _source(node) -> str:
+    """School notation for a parsed tree: 2*x^2 + 5*x - 3 = 0."""
+    node = copy.deepcopy(node)
+    for child in ast.walk(node):
+        # 1e5 reads 100000, not 100000.0
+        if isinstance(child, ast.Constant) and isinstance(child.value, float) and child.value.is_integer() \
+                and abs(child.value) < 1e15:
+            child.value = int(child.value)
+    text = ast.unparse(node).replace("**", "^").replace("==", "=")
+    return re.sub(r"\s*([*^/])\s*", r"\1", text)
+
+
+def _solve(expressions: list, variables: list, shown: str, sp) -> dict:
+    inequalities = [e for e in expressions if isinstance(e, sp.core.relational.Relational) and e.rel_op != "=="]
+    names = ", ".join(str(v) for v in variables)
+    if inequalities:
+        if len(expressions) > 1 or len(variables) != 1:
+            raise SolverError("Inequalities are solved one at a time, for one variable")
+        solution = sp.solve(expressions[0], variables[0])
+        text = "no solution" if solution is sp.false else _text(solution)
+        return {"variables": [names], "result": text, "latex": sp.latex(solution),
+                "summary": f"Solution of {shown} for {names}: {text}"}
+
+    equations = [e if isinstance(e, sp.Eq) else sp.Eq(e, 0) for e in expressions]
+    equations = [e for e in equations if e is not sp.true]
+    if any(e is sp.false for e in equations):
+        return {"variables": [str(v) for v in variables], "solutions": [], "result": "no real solution",
+                "latex": r"\emptyset", "summary": f"{shown} has no real solution"}
+    from sympy.functions.elementary.trigonometric import TrigonometricFunction
+    if any(f.has(*variables) for e in equations for f in e.atoms(TrigonometricFunction)):
+        return _periodic(equations, variables, shown, sp)
+    try:
+        solutions = sp.solve(equations, variables, dict=True)
+    except NotImplementedError:
+        raise SolverError("The solver can't solve this equation exactly")
+    exact = [{str(k): _text(v) for k, v in s.items()} for s in solutions]
+    numeric = [{str(k): _number(v) for k, v in s.items()} for s in solutions]
+    if not solutions:
+        text = "no real solution"
+    else:
+        text = " or ".join(", ".join(f"{k} = {v}" for k, v in s.items()) for s in exact)
+        approximations = [
+            ", ".join(f"{k} ≈ {v:.6g}" for k, v in n.items() if isinstance(v, float))
+            for s, n in zip(solutions, numeric) if any(not value.is_Integer for value in s.values())
+        ]
+        if any(approximations):
+            text += f" ({'; '.join(a for a in approximations if a)})"
+    return {
+        "variables": [str(v) for v in variables],
+        "solutions": exact,
+        "numeric": numeric,
+        "result": text,
+        "latex": r",\ ".join(sp.latex(sp.Tuple(*s.values())) for s in solutions) or r"\emptyset",
+        "summary": f"Solutions of {shown} for {names}: {text}",
+    }
+
+
+def _periodic(equations: list, variables: list, shown: str, sp) -> dict:
+    """
+    General solution of a trigonometric equation: sp.solve() only returns
+    the principal values, so sin x = 0 would read "x = 0 or x = pi".
+
+    Raises:
+        SolverError: A system, or no general solution in closed form
+    """
+    if len(equations) != 1 or len(variables) != 1:
+        raise SolverError("Trigonometric equations are solved one at a time, for one variable")
+    (variable,) = variables
+    solutions = sp.solveset(equations[0].lhs - equations[0].rhs, variable, sp.Reals)
+    families = list(solutions.args) if isinstance(solutions, sp.Union) else [solutions]
+    if solutions is sp.S.EmptySet:
+        families = []
+    elif not all(isinstance(f, (sp.ImageSet, sp.FiniteSet)) for f in families) \
+            or any(isinstance(f, sp.ImageSet) and f.base_sets != (sp.S.Integers,) for f in families):
+        raise SolverError("The solver can't find the general solution of this equation")
+    n = sp.Symbol("n", integer=True)
+    values = []
+    for family in families:
+        if isinstance(family, sp.ImageSet):
+            (dummy,) = family.lamda.variables
+            values.append(family.lamda.expr.subs(dummy, n))
+        else:
+            values.extend(family.args)
+    if not values:
+        text = "no real solution"
+    else:
+        text = " or ".join(f"{variable} = {_text(value)}" for value in values)
+        if any(value.has(n) for value in values):
+            text += " (n any integer)"
+    return {
+        "variables": [str(variable)],
+        "solutions": [{str(variable): _text(value)} for value in values],
+        "result": text,
+        "latex": r",\ ".join(sp.latex(value) for value in values) or r"\emptyset",
+        "summary": f"Solutions of {shown} for {variable}: {text}",
+    }
+
+
+def _matrix(matrix, sp) -> dict:
+    shown = _text(matrix.tolist())
+    result = {"operation": "matrix", "input": shown, "rows": matrix.rows, "columns": matrix.cols,
+              "rank": matrix.rank()}
+    facts = [f"rank = {result['rank']}"]
+    if matrix.is_square:
+        determinant = sp.simplify(matrix.det())
+        result["determinant"] = _text(determinant)
+        facts.insert(0, f"determinant = {_text(determinant)}")
+        if determinant != 0:
+            inverse = sp.simplify(matrix.inv())
+            result["inverse"] = _text(inverse.tolist())
+            facts.append(f"inverse = {result['inverse']}")
+        else:
+            facts.append("singular (no inverse)")
+        if matrix.rows <= 4:
+            eigenvalues = matrix.eigenvals()
+            result["eigenvalues"] = {_text(value): count for value, count in eigenvalues.items()}
+            facts.append("eigenvalues: " + ", ".join(
+                f"{_text(value)}" + (f" (multiplicity {count})" if count > 1 else "") for value, count in eigenvalues.items()
+            ))
+    result["result"] = "; ".join(facts)
+    result["latex"] = sp.latex(matrix)
+    result["summary"] = f"For the matrix {shown}: {result['result']}"
+    return result
+
+
+def _statistics(values: list, sp) -> dict:
+    n = len(values)
+    ordered = sorted(values)
+    mean = sum(values) / n
+    middle = n // 2
+    median = ordered[middle] if n % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+    counts = {}
+    for value in values:
+        counts[value] = counts.get(value, 0) + 1
+    top = max(counts.values())
+    modes = sorted(value for value, count in counts.items() if count == top) if top > 1 else []
+    variance = sum((value - mean) ** 2 for value in values) / n
+    sample_variance = sum((value - mean) ** 2 for value in values) / (n - 1) if n > 1 else None
+    fields = {
+        "count": n, "sum": sum(values), "mean": mean, "median": median,
+        "minimum": ordered[0], "maximum": ordered[-1], "range": ordered[-1] - ordered[0],
+        "variance": variance, "standard_deviation": sp.sqrt(variance),
+    }
+    if sample_variance is not None:
+        fields.update(sample_variance=sample_variance, sample_standard_deviation=sp.sqrt(sample_variance))
+
+    shown = ", ".join(_text(value) for value in values[:20]) + (", ..." if n > 20 else "")
+    facts = [f"{name.replace('_', ' ')} = {_text(value)}{_approx(sp.sympify(value))}" for name, value in fields.items()]
+    facts.insert(4, "mode = " + (", ".join(_text(m) for m in modes) if modes else "none (no value repeats)"))
+    result = {"operation": "statistics", "input": shown, **{k: _text(v) for k, v in fields.items()},
+              "count": n, "modes": [_text(m) for m in modes],
+              "numeric": {k: _number(sp.sympify(v)) for k, v in fields.items()}}
+    result["result"] = "; ".join(facts)
+    result["latex"] = r"\bar{x} = " + sp.latex(mean)
+    result["summary"] = f"For the data {shown}: {result['result']}"
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Worker pool
+# ---------------------------------------------------------------------------
+
+def _cpu_exceeded(signum, frame):
+    raise _CpuLimitExceeded()
+
+
+def _init_worker():
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _cpu_exceeded)
+    try:
+        import sympy  # noqa: F401 (imported once per worker, not per job)
+    except ImportError:
+        pass
+
+
+def _run(job: dict, cpu_seconds: int) -> tuple:
+    """
+    Worker entry point.
+
+    Returns:
+        ("ok", result) or ("error" | "unavailable", message)
+    """
+    limited = resource is not None and cpu_seconds > 0
+    if limited:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        budget = math.ceil(usage.ru_utime + usage.ru_stime) + cpu_seconds
+        resource.setrlimit(resource.RLIMIT_CPU, (budget if hard == resource.RLIM_INFINITY else min(budget, hard), hard))
+    try:
+        return "ok", compute(job)
+    except _CpuLimitExceeded:
+        return "error", f"Took more than {cpu_seconds}s of CPU time"
+    except SolverError as e:
+        return "error", str(e)
+    except SolverUnavailable as e:
+        return "unavailable", str(e)
+    except (NotImplementedError, ValueError, TypeError, ZeroDivisionError, RecursionError, OverflowError) as e:
+        return "error", f"The solver can't handle this problem ({type(e).__name__})"
+    finally:
+        if limited:
+            resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+def _ready() -> bool:
+    return True
+
+
+class Solver:
+    def __init__(self, workers: int = SOLVER_WORKERS, cpu_seconds: int = SOLVER_CPU_SECONDS,
+                 timeout: float = SOLVER_TIMEOUT, cache_size: int = SOLVER_CACHE_SIZE):
+        """
+        Args:
+            workers: Worker processes; started on first use (or by warm())
+            cpu_seconds: CPU time limit per job
+            timeout: Default wall-clock limit per call, queueing included
+            cache_size: Results and deterministic failures kept
+        """
+        self.workers = workers
+        self.cpu_seconds = cpu_seconds
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self._pool = None
+        self._cache = OrderedDict()  # job key -> result dict or SolverError
+        self.hits = 0
+        self.misses = 0
+        self.solved = 0
+        self.failed = 0
+        self.timeouts = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a server process with running threads isn't safe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+            )
+        return self._pool
+
+    def warm(self):
+        """Starts the workers (and their SymPy import) in the background."""
+        pool = self._executor()
+        for _ in range(self.workers):
+            pool.submit(_ready)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def solve(self, job: dict, timeout: float = None) -> dict:
+        """
+        Exact result of a problem (see validate() for the job format).
+
+        Raises:
+            SolverError: Invalid input, no result, or the CPU limit was hit
+            SolverUnavailable: Timed out waiting, workers crashed, or SymPy is missing
+        """
+        # Keyed by the job as given, so a hit skips parsing too
+        key = json.dumps(job, sort_keys=True, default=str)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            if isinstance(cached, SolverError):
+                raise cached
+            return cached
+        self.misses += 1
+        job = validate(job)
+
+        loop = asyncio.get_running_loop()
+        try:
+            status, value = await asyncio.wait_for(
+                loop.run_in_executor(self._executor(), _run, job, self.cpu_seconds), timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            # Not cached: the wait may have been queueing behind other jobs
+            self.timeouts += 1
+            raise SolverUnavailable("The solver is busy; try again")
+        except BrokenProcessPool:
+            self._pool = None
+            raise SolverUnavailable("The solver restarted; try again")
+        if status == "unavailable":
+            raise SolverUnavailable(value)
+
+        entry = value if status == "ok" else SolverError(value)
+        self._cache[key] = entry
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        if status != "ok":
+            self.failed += 1
+            raise entry
+        self.solved += 1
+        return value
+
+    async def verified(self, subject: str, question: str) -> Optional[dict]:
+        """
+        Result for the computable problem in a chat question, or None (other subjects,
+        no problem found, or no result within SOLVER_CHAT_TIMEOUT). The result's "job"
+        is the recognized problem; job["direct"] marks bare arithmetic.
+        """
+        if subject not in SOLVER_SUBJECTS:
+            return None
+        job = problem_from_question(question)
+        if job is None:
+            return None
+        try:
+            result = await self.solve(job, timeout=SOLVER_CHAT_TIMEOUT)
+        except (SolverError, SolverUnavailable):
+            return None
+        return {**result, "job": job}
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "workers": self.workers,
+            "running": self._pool is not None,
+            "cpu_seconds": self.cpu_seconds,
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "solved": self.solved,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+        }
+
+
+# Singleton instance
+solver = Solver()
@@ -0,0 +1,239 @@
+"""
+Resumable Streams
+Server-Sent Events transport for answers. Every answer stream is buffered in
+a Flight (see app/services/singleflight.py) under a random stream id, and
+clients read it as typed events:
+
+    event: start      {"stream_id", "offset"}         first event of every connection
+    event: token      {"text"}                        id: chunk number, from 0
+    event: <name>     {...}                           a StreamEvent in the stream (e.g. citations), also with an id
+    event: heartbeat  {"offset"}                      every STREAM_HEARTBEAT seconds without a token
+    event: usage      {"prompt_tokens", "completion_tokens", "chars", "estimated"}
+    event: done       {"offset", "chars"}             the answer is complete
+    event: error      {"message", "offset"}           the answer is incomplete and won't continue
+
+A dropped connection doesn't end the generation: it keeps filling the buffer
+for STREAM_RESUME_WINDOW seconds, and GET /api/streams/<id> with
+Last-Event-ID (what EventSource sends on reconnect) or ?offset=<chunks
+received> continues from there without a new upstream call. Finished
+streams stay readable for STREAM_BUFFER_TTL seconds. At most
+STREAM_MAX_BUFFERS are kept: the oldest finished ones make room, and when
+every buffer is still generating new streams are rejected (503).
+"""
+import asyncio
+import json
+import os
+import secrets
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, suppress
+from typing import Optional
+
+from app.services.admission import AdmissionRejected
+from app.services.gemini import GenerationError
+from app.services.singleflight import Flight
+
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", "15"))
+# How long an unwatched generation keeps running, waiting for its client to reconnect
+STREAM_RESUME_WINDOW = float(os.getenv("STREAM_RESUME_WINDOW", "30"))
+# How long a finished stream stays readable
+STREAM_BUFFER_TTL = float(os.getenv("STREAM_BUFFER_TTL", "120"))
+STREAM_MAX_BUFFERS = int(os.getenv("STREAM_MAX_BUFFERS", "1000"))
+# Suggested wait when every buffer holds a live generation
+STREAM_FULL_RETRY_AFTER = float(os.getenv("STREAM_FULL_RETRY_AFTER", "5"))
+# Reconnection delay suggested to EventSource clients
+STREAM_RETRY_MS = int(os.getenv("STREAM_RETRY_MS", "2000"))
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class StreamEvent:
+    def __init__(self, name: str, data: dict):
+        """A non-text event inside a buffered stream, e.g. search citations before the answer."""
+        self.name = name
+        self.data = data
+
+
+def sse(event: str, data: dict, event_id: int = None) -> str:
+    """One Server-Sent Event."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}"]
+    return "\n".join(lines) + "\n\n"
+
+
+class BufferedStream:
+    def __init__(self, stream_id: str, flight: Flight, usage: dict):
+        self.id = stream_id
+        self.flight = flight
+        self.usage = usage  # reported in the usage event; the source may fill it in as it goes
+        self.finished_at = None
+
+
+class StreamRegistry:
+    def __init__(self, resume_window: float = STREAM_RESUME_WINDOW, ttl: float = STREAM_BUFFER_TTL,
+                 max_streams: int = STREAM_MAX_BUFFERS, heartbeat: float = STREAM_HEARTBEAT):
+        """
+        Args:
+            resume_window: Seconds a generation runs on without any client
+            ttl: Seconds a finished stream can still be read
+            max_streams: Buffers kept; the oldest finished ones are dropped first
+            heartbeat: Seconds between heartbeats while no token arrives
+        """
+        self.resume_window = resume_window
+        self.ttl = ttl
+        self.max_streams = max_streams
+        self.heartbeat = heartbeat
+        self._streams = OrderedDict()  # stream id -> BufferedStream
+        self._reserved = 0  # slots held by answers still being prepared
+        self.started = 0
+        self.resumed = 0
+        self.expired = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self._streams)
+
+    def check_capacity(self):
+        """
+        Makes room for one more stream, dropping the oldest finished buffer if needed.
+
+        Raises:
+            AdmissionRejected: Every buffer holds a generation still in progress
+        """
+        self._expire()
+        while len(self._streams) + self._reserved >= self.max_streams:
+            # Live generations are never dropped: their clients may still resume them
+            oldest = next((key for key, stream in self._streams.items() if stream.finished_at is not None), None)
+            if oldest is None:
+                self.rejected += 1
+                raise AdmissionRejected("Too many answers in progress", STREAM_FULL_RETRY_AFTER)
+            del self._streams[oldest]
+            self.expired += 1
+
+    @contextmanager
+    def reservation(self):
+        """
+        Holds a buffer slot while an answer is prepared: checked before
+        admission, so a full registry doesn't waste an LLM slot, and a
+        start(reserved=True) inside it can't be rejected after generation began.
+
+        Raises:
+            AdmissionRejected: Every buffer holds a generation still in progress
+        """
+        self.check_capacity()
+        self._reserved += 1
+        try:
+            yield
+        finally:
+            self._reserved -= 1
+
+    def start(self, source, usage: dict = None, reserved: bool = False) -> BufferedStream:
+        """
+        Buffers an answer stream.
+
+        Args:
+            source: Async iterator of text chunks (GenerationError for in-band errors) and StreamEvents
+            usage: {"prompt_tokens": estimate}, reported in the usage event; read when the stream ends
+            reserved: Called inside reservation(), whose slot this stream takes
+
+        Returns:
+            The stream, to pass to events(); its id resumes it
+
+        Raises:
+            AdmissionRejected: Every buffer holds a generation still in progress
+        """
+        if not reserved:
+            self.check_capacity()
+        stream_id = secrets.token_urlsafe(12)
+        stream = BufferedStream(stream_id, Flight(source, linger=self.resume_window),
+                                usage if usage is not None else {})
+
+        def _finished(_task):
+            stream.finished_at = time.monotonic()
+
+        stream.flight.task.add_done_callback(_finished)
+        self._streams[stream_id] = stream
+        self.started += 1
+        return stream
+
+    def get(self, stream_id: str) -> Optional[BufferedStream]:
+        self._expire()
+        return self._streams.get(stream_id)
+
+    def _expire(self):
+        now = time.monotonic()
+        for stream_id in [key for key, stream in self._streams.items()
+                          if stream.finished_at is not None and now - stream.finished_at > self.ttl]:
+            del self._streams[stream_id]
+            self.expired += 1
+
+    async def events(self, stream: BufferedStream, offset: int = 0):
+        """
+        SSE text of a stream from chunk number offset on. Holds the stream
+        itself, so it keeps reading even if the buffer is dropped meanwhile.
+        """
+        flight = stream.flight
+        if offset:
+            self.resumed += 1
+        yield f"retry: {STREAM_RETRY_MS}\n\n" + sse("start", {"stream_id": stream.id, "offset": offset})
+
+        position, failed = offset, False
+        chunks = flight.subscribe(offset)
+        pending = None
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(chunks.__anext__())
+                done, _ = await asyncio.wait({pending}, timeout=self.heartbeat)
+                if not done:
+                    yield sse("heartbeat", {"offset": position})
+                    continue
+                finished, pending = pending, None
+                try:
+                    chunk = finished.result()
+                except StopAsyncIteration:
+                    break
+                if isinstance(chunk, GenerationError):
+                    failed = True
+                    yield sse("error", {"message": str(chunk), "offset": position})
+                elif isinstance(chunk, StreamEvent):
+                    yield sse(chunk.name, chunk.data, event_id=position)
+                else:
+                    yield sse("token", {"text": chunk}, event_id=position)
+                position += 1
+        finally:
+            if pending is not None:
+                pending.cancel()
+                with suppress(asyncio.CancelledError, StopAsyncIteration):
+                    await pending
+            await chunks.aclose()
+
+        if failed:
+            return
+        if flight.failed:
+            # Abandoned before it finished: nobody reconnected within the resume window
+            yield sse("error", {"message": "The answer was interrupted; please ask again", "offset": position})
+            return
+        chars = sum(len(chunk) for chunk in flight.chunks if isinstance(chunk, str))
+        yield sse("usage", {
+            "prompt_tokens": stream.usage.get("prompt_tokens", 0),
+            "completion_tokens": chars // 4,
+            "chars": chars,
+            "estimated": True,
+        })
+        yield sse("done", {"offset": position, "chars": chars})
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._streams),
+            "live": sum(1 for stream in self._streams.values() if stream.finished_at is None),
+            "reserved": self._reserved,
+            "started": self.started,
+            "resumed": self.resumed,
+            "expired": self.expired,
+            "rejected": self.rejected,
+        }
+
+
+# Singleton instance
+stream_registry = StreamRegistry()
@@ -0,0 +1,126 @@
+"""
+Subject Registry
+Loads the subject catalogue (app/prompts/subjects.yaml) and serves the
+system prompts for the generic /api/{subject} endpoint. Prompt hashes are
+computed once per load, and the file is reloaded when it changes on disk.
+"""
+import os
+import time
+
+import yaml
+
+from app.services.answers import prompt_hash
+
+SUBJECT_CATALOGUE = os.getenv(
+    "SUBJECT_CATALOGUE",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "prompts", "subjects.yaml")
+)
+# Seconds between checks of the catalogue's modification time; 0 disables reloading
+SUBJECT_RELOAD_INTERVAL = float(os.getenv("SUBJECT_RELOAD_INTERVAL", "2"))
+
+MODES = ("OL", "AL")
+
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _bullets(prompt: str) -> list:
+    return [line[2:].strip() for line in prompt.splitlines() if line.startswith("- ")]
+
+
+class Subject:
+    __slots__ = ("slug", "name", "prompts", "prompt_hashes", "topics")
+
+    def __init__(self, slug: str, name: str, prompts: dict, topics: dict = None):
+        self.slug = slug
+        self.name = name
+        self.prompts = prompts
+        self.prompt_hashes = {mode: prompt_hash(prompt) for mode, prompt in prompts.items()}
+        # Syllabus areas per level, defaulting to the bullet lists in the prompts
+        self.topics = topics or {mode: _bullets(prompt) for mode, prompt in prompts.items()}
+
+
+def load_catalogue(path: str) -> dict:
+    """
+    Parses and validates a subject catalogue.
+
+    Returns:
+        {slug: Subject}
+
+    Raises:
+        ValueError: the file is malformed or a subject is missing a prompt
+    """
+    with open(path, encoding="utf-8") as f:
+        data = yaml.load(f, Loader=_Loader) or {}
+
+    entries = data.get("subjects")
+    if not isinstance(entries, dict) or not entries:
+        raise ValueError(f"{path}: expected a non-empty 'subjects' mapping")
+
+    subjects = {}
+    for slug, entry in entries.items():
+        prompts = (entry or {}).get("prompts") or {}
+        missing = [mode for mode in MODES if not isinstance(prompts.get(mode), str) or not prompts[mode].strip()]
+        if missing:
+            raise ValueError(f"{path}: subject '{slug}' has no prompt for {', '.join(missing)}")
+        topics = entry.get("topics")
+        if isinstance(topics, list):
+            topics = {mode: topics for mode in MODES}
+        subjects[slug] = Subject(
+            slug=slug,
+            name=entry.get("name") or slug.replace("_", " ").title(),
+            prompts={mode: prompts[mode] for mode in MODES},
+            topics=topics,
+        )
+    return subjects
+
+
+class SubjectRegistry:
+    def __init__(self, path: str = SUBJECT_CATALOGUE, reload_interval: float = SUBJECT_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.subjects = load_catalogue(path)
+        self.loaded_at = time.time()
+        self.reloads = 0
+        self._mtime = os.stat(path).st_mtime_ns
+        self._checked = time.monotonic()
+
+    def _maybe_reload(self):
+        # At most one stat() per interval, however many requests come in
+        now = time.monotonic()
+        if not self.reload_interval or now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._mtime:
+                return
+            self._mtime = mtime
+            subjects = load_catalogue(self.path)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            # Keep serving the last good catalogue until the file is fixed
+            print(f"WARNING: subject catalogue not reloaded: {e}")
+            return
+        self.subjects = subjects
+        self.loaded_at = time.time()
+        self.reloads += 1
+
+    def get(self, slug: str):
+        """Returns the Subject for slug, or None if there is no such subject."""
+        self._maybe_reload()
+        return self.subjects.get(slug)
+
+    def all(self) -> list:
+        self._maybe_reload()
+        return list(self.subjects.values())
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "subjects": len(self.subjects),
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+        }
+
+
+# Singleton instance
+subject_registry = SubjectRegistry()
@@ -0,0 +1,194 @@
+"""
+Topic Classifier
+Flags questions sent to the wrong subject before they cost an LLM call.
+
+Questions are embedded as TF-IDF weighted hashed word and character n-grams
+and scored by a softmax-regression model trained in-process on the catalogue
+topics plus seed questions and vocabulary (app/prompts/subject_seeds.yaml).
+Only confident mismatches are redirected; anything ambiguous goes to the LLM,
+whose prompt already tells it to refuse other subjects.
+"""
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+import yaml
+
+from app.services.metrics import registry
+from app.services.semantic_cache import normalize_question
+from app.services.subjects import subject_registry
+
+OFFTOPIC_GUARD_ENABLED = os.getenv("OFFTOPIC_GUARD_ENABLED", "true").lower() in ("1", "true", "yes")
+# Redirect only if the best other subject is at least this likely...
+OFFTOPIC_MIN_CONFIDENCE = float(os.getenv("OFFTOPIC_MIN_CONFIDENCE", "0.4"))
+# ...and the requested subject at most this likely
+OFFTOPIC_MAX_REQUESTED = float(os.getenv("OFFTOPIC_MAX_REQUESTED", "0.1"))
+OFFTOPIC_SEEDS = os.getenv(
+    "OFFTOPIC_SEEDS",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "prompts", "subject_seeds.yaml")
+)
+OFFTOPIC_DIM = int(os.getenv("OFFTOPIC_DIM", "4096"))
+
+REDIRECT_TEMPLATE = (
+    "This looks like a {predicted} question. I'm your {requested} tutor, so please "
+    "switch to {predicted} in the subject menu and ask it there - you'll get a much better answer."
+)
+
+_redirects = registry.counter("lewa_offtopic_redirects_total", "Questions redirected to another subject",
+                              ("subject", "predicted"))
+
+
+def load_seeds(path: str) -> dict:
+    """{slug: [question or term, ...]} from the seed file, or {} if there is none."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+    seeds = {}
+    for section in ("subjects", "vocabulary"):
+        for slug, examples in (data.get(section) or {}).items():
+            seeds.setdefault(slug, []).extend(str(example) for example in examples or ())
+    return seeds
+
+
+# Words that say nothing about the subject of a question
+_STOPWORDS = frozenset(
+    "what is the a an of to in and for how do i explain describe give me with on by are was were does why "
+    "when which who this that be as it my your from at or can you state discuss write find".split()
+)
+_WORD = re.compile(r"\w+")
+
+
+def _features(text: str):
+    """Content words plus their character 3-5-grams, which also match inflections and typos."""
+    for word in _WORD.findall(normalize_question(text)):
+        if word in _STOPWORDS:
+            continue
+        yield "w:" + word
+        padded = f"<{word}>"
+        for n in (3, 4, 5):
+            for i in range(max(len(padded) - n + 1, 1)):
+                yield padded[i:i + n]
+
+
+class SoftmaxClassifier:
+    def __init__(self, dim: int = OFFTOPIC_DIM, epochs: int = 100, learning_rate: float = 20.0, l2: float = 1e-4):
+        self.dim = dim
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.labels = []
+        self.idf = np.ones(dim, dtype=np.float32)
+        self.weights = None
+        self.bias = None
+
+    def _counts(self, text: str) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in _features(text)), dtype=np.uint32)
+        return np.log1p(np.bincount(hashes % self.dim, minlength=self.dim).astype(np.float32))
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = self._counts(text) * self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def fit(self, texts: list, labels: list):
+        """Full-batch gradient descent on the cross-entropy over TF-IDF weighted hashed features."""
+        self.labels = sorted(set(labels))
+        index = {label: i for i, label in enumerate(self.labels)}
+        counts = np.stack([self._counts(text) for text in texts])
+        document_frequency = (counts > 0).sum(axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        x = np.stack([self.embed(text) for text in texts])
+        y = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        y[np.arange(len(texts)), [index[label] for label in labels]] = 1.0
+
+        weights = np.zeros((self.dim, len(self.labels)), dtype=np.float32)
+        bias = np.zeros(len(self.labels), dtype=np.float32)
+        for _ in range(self.epochs):
+            probabilities = self._softmax(x @ weights + bias)
+            error = (probabilities - y) / len(texts)
+            weights -= self.learning_rate * (x.T @ error + self.l2 * weights)
+            bias -= self.learning_rate * error.sum(axis=0)
+        self.weights, self.bias = weights, bias
+        return self
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def predict_proba(self, text: str) -> dict:
+        probabilities = self._softmax(self.embed(text) @ self.weights + self.bias)
+        return dict(zip(self.labels, probabilities.tolist()))
+
+
+def training_set(subjects: list, seeds: dict) -> tuple:
+    texts, labels = [], []
+    for subject in subjects:
+        examples = [topic for topics in subject.topics.values() for topic in topics]
+        examples += seeds.get(subject.slug, [])
+        texts.extend(examples)
+        labels.extend([subject.slug] * len(examples))
+    return texts, labels
+
+
+class TopicGuard:
+    def __init__(self, registry=subject_registry, seeds_path: str = OFFTOPIC_SEEDS, enabled: bool = OFFTOPIC_GUARD_ENABLED,
+                 min_confidence: float = OFFTOPIC_MIN_CONFIDENCE, max_requested: float = OFFTOPIC_MAX_REQUESTED):
+        self.registry = registry
+        self.seeds_path = seeds_path
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.max_requested = max_requested
+        self.model = None  # (SoftmaxClassifier, the registry's subjects dict it was trained from)
+        self._training = None
+
+    def train(self):
+        """Trains on the current catalogue and swaps the model in (about a second on one core)."""
+        subjects = self.registry.subjects
+        texts, labels = training_set(list(subjects.values()), load_seeds(self.seeds_path))
+        self.model = (SoftmaxClassifier().fit(texts, labels), subjects)
+
+    def warm(self):
+        """Starts training in a background thread if the model is missing or stale."""
+        if not self.enabled or (self.model and self.model[1] is self.registry.subjects):
+            return
+        if self._training is None or not self._training.is_alive():
+            self._training = threading.Thread(target=self.train, name="topic-classifier", daemon=True)
+            self._training.start()
+
+    def check(self, subject: str, question: str):
+        """
+        Returns a redirect message if question clearly belongs to another subject, else None.
+
+        Args:
+            subject: Slug of the subject the question was sent to
+            question: The student's question
+        """
+        if not self.enabled:
+            return None
+        # Never train on the request path: until a model is ready, nothing is redirected
+        self.warm()
+        if self.model is None:
+            return None
+        classifier, subjects = self.model
+        if subject not in subjects:
+            return None
+
+        probabilities = classifier.predict_proba(question)
+        predicted = max(probabilities, key=probabilities.get)
+        if (predicted == subject
+                or probabilities[predicted] < self.min_confidence
+                or probabilities[subject] > self.max_requested):
+            return None
+
+        _redirects.inc(subject, predicted)
+        return REDIRECT_TEMPLATE.format(predicted=subjects[predicted].name, requested=subjects[subject].name)
+
+
+# Singleton instance
+topic_guard = TopicGuard()
@@ -0,0 +1,114 @@
+"""
+Analytics benchmark
+
+Compiles a set of typical student expressions, then times a single
+vectorized evaluation over --points samples, the full analysis
+(discontinuities, roots, rounding to JSON lists) and a cached compile.
+
+Then compares plot payloads for a --width pixel wide plot: naive uniform
+JSON with --plot-points samples against adaptive sampling as JSON, float32
+and delta-quantized int16, in bytes (raw and gzipped) and server CPU per
+plot (analysis plus encoding).
+
+Usage (from backend/):
+    python -m benchmarks.analytics
+    python -m benchmarks.analytics --points 100000 --repeat 20
+    python -m benchmarks.analytics --width 360 --plot-points 5000
+"""
+import argparse
+import gzip
+import json
+import statistics
+import time
+
+import numpy as np
+
+from app.services.analytics import ExpressionCache, analyse, compile_expression, pack_points, plot_json
+
+EXPRESSIONS = [
+    "2x^2 + 5x - 3",
+    "sin(x) * exp(-x/10)",
+    "tan x",
+    "1/(x^2 - 4)",
+    "floor(x) + sqrt(abs(x))",
+    "log(x)/x",
+    "where(x < 0, -x, x^3) + 3cos(2pi x)",
+]
+
+
+def _median_ms(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def _payload(result: dict, encoding: str = "json") -> bytes:
+    if encoding == "json":
+        return json.dumps(plot_json(result), separators=(",", ":")).encode("utf-8")
+    header = {key: value for key, value in result.items() if key not in ("x", "y")}
+    return pack_points(result["x"], result["y"], encoding, header, result["y_range"] or (-1.0, 1.0))
+
+
+def compare_payloads(args):
+    plots = {
+        "uniform json": ({"points": args.plot_points}, "json"),
+        "adaptive json": ({"width": args.width}, "json"),
+        "adaptive f32": ({"width": args.width}, "f32"),
+        "adaptive i16": ({"width": args.width}, "i16"),
+    }
+    print(f"\nPlot payloads, {args.width}px wide (uniform: {args.plot_points:,} points), median of {args.repeat} runs\n")
+    print(f"{'expression':<38} {'payload':<14} {'points':>7} {'bytes':>9} {'gzip':>9} {'CPU':>9}")
+    totals = {name: [0, 0, 0.0] for name in plots}
+    for expression in EXPRESSIONS:
+        function = compile_expression(expression)
+        for name, (options, encoding) in plots.items():
+            def plot():
+                return _payload(analyse(function, args.x_min, args.x_max, **options), encoding)
+            cpu_ms = _median_ms(plot, args.repeat)
+            count = len(analyse(function, args.x_min, args.x_max, **options)["x"])
+            size, zipped = len(plot()), len(gzip.compress(plot()))
+            totals[name][0] += size
+            totals[name][1] += zipped
+            totals[name][2] += cpu_ms
+            print(f"{expression:<38} {name:<14} {count:>7} {size / 1024:>7.1f}KB {zipped / 1024:>7.1f}KB "
+                  f"{cpu_ms:>7.2f}ms")
+    baseline = totals["uniform json"]
+    print()
+    for name, (size, zipped, cpu_ms) in totals.items():
+        print(f"{'all expressions':<38} {name:<14} {'':>7} {size / 1024:>7.1f}KB {zipped / 1024:>7.1f}KB "
+              f"{cpu_ms:>7.2f}ms  ({baseline[0] / size:.1f}x smaller, {baseline[1] / zipped:.1f}x gzipped)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--x-min", type=float, default=-50.0)
+    parser.add_argument("--x-max", type=float, default=50.0)
+    parser.add_argument("--width", type=int, default=360, help="Plot width in pixels for the payload comparison")
+    parser.add_argument("--plot-points", type=int, default=5000, help="Samples in the naive uniform JSON plot")
+    args = parser.parse_args()
+
+    x = np.linspace(args.x_min, args.x_max, args.points)
+    cache = ExpressionCache()
+    print(f"{args.points:,} points over [{args.x_min}, {args.x_max}], median of {args.repeat} runs\n")
+    print(f"{'expression':<38} {'compile':>9} {'cached':>8} {'evaluate':>9} {'analyse':>9} {'breaks':>6} {'JSON':>9}")
+    for expression in EXPRESSIONS:
+        compile_ms = _median_ms(lambda: compile_expression(expression), args.repeat)
+        cache.get(expression)
+        cached_ms = _median_ms(lambda: cache.get(expression), args.repeat)
+        function = cache.get(expression)
+        evaluate_ms = _median_ms(lambda: function(x), args.repeat)
+        analyse_ms = _median_ms(lambda: analyse(function, args.x_min, args.x_max, args.points), args.repeat)
+        result = analyse(function, args.x_min, args.x_max, args.points)
+        size = len(_payload(result))
+        print(f"{expression:<38} {compile_ms:>7.3f}ms {cached_ms * 1000:>6.1f}us {evaluate_ms:>7.2f}ms "
+              f"{analyse_ms:>7.2f}ms {len(result['discontinuities']):>6} {size / 1024:>7.0f}KB")
+    compare_payloads(args)
+
+
+if __name__ == "__main__":
+    main()
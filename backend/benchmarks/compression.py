@@ -0,0 +1,173 @@
+"""
+Bytes-on-the-wire benchmark
+
+Replays a typical student session against the app in-process, with stand-ins
+for the LLM and SerpApi: the subject list, --questions chat answers streamed
+as SSE (every other one with the researcher tool), two web searches and an
+announcements lookup. Each request is sent once per encoding (identity,
+gzip, and br when the brotli package is installed). Body bytes are counted
+as the app sends them.
+
+"before" is the old behaviour: no compression, and /api/research results
+with SerpApi's raw_metadata. Streamed answers are checked to still arrive in
+as many chunks (one per token) as without compression, so token latency is
+unchanged.
+
+Usage (from backend/):
+    python -m benchmarks.compression
+    python -m benchmarks.compression --questions 10 --tokens 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+
+# Stand-ins only; answers aren't cached so every encoding streams a fresh one
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("SERPAPI_API_KEY", "bench")
+os.environ["ANSWER_CACHE_TTL"] = "0"
+os.environ["ANNOUNCEMENTS_REFRESH_INTERVAL"] = "0"
+
+from app.main import app
+from app.services.compression import ENCODINGS
+from app.services.gemini import gemini_service
+from app.services.search import search_service
+from benchmarks.mock_upstream import VOCABULARY
+
+QUESTIONS = [
+    "Explain the structure of the atom",
+    "What are the products of electrolysis of brine?",
+    "Describe how enzymes work",
+    "Balance the equation for the combustion of methane",
+    "Why do ionic compounds conduct electricity when molten?",
+    "What is the difference between an element and a compound?",
+]
+
+
+def _fake_llm(tokens: int):
+    async def stream(model, messages):
+        rng = random.Random(messages[-1]["content"])
+        for index in range(tokens):
+            word = rng.choice(VOCABULARY)
+            yield (" " if index else "") + word + ("." if rng.random() < 0.08 else "")
+    return stream
+
+
+async def _fake_search(params, timeout=None):
+    rng = random.Random(params["q"])
+    return {
+        "search_metadata": {
+            "id": f"{rng.getrandbits(96):024x}", "status": "Success",
+            "json_endpoint": f"https://serpapi.com/searches/{rng.getrandbits(64):x}/{rng.getrandbits(96):024x}.json",
+            "created_at": "2026-10-17 08:12:43 UTC", "processed_at": "2026-10-17 08:12:43 UTC",
+            "google_url": f"https://www.google.com/search?q={params['q'].replace(' ', '+')}&oq={params['q'].replace(' ', '+')}"
+                          "&num=5&sourceid=chrome&ie=UTF-8",
+            "raw_html_file": f"https://serpapi.com/searches/{rng.getrandbits(64):x}/{rng.getrandbits(96):024x}.html",
+            "total_time_taken": round(rng.uniform(0.5, 2.5), 2),
+        },
+        "organic_results": [
+            {
+                "position": index + 1,
+                "title": " ".join(rng.choice(VOCABULARY) for _ in range(8)).capitalize(),
+                "link": f"https://example{index}.cm/{'/'.join(rng.choice(VOCABULARY) for _ in range(3))}",
+                "snippet": " ".join(rng.choice(VOCABULARY) for _ in range(30)).capitalize() + ".",
+                "source": rng.choice(["Wikipedia", "BBC Bitesize", None]),
+                "date": rng.choice(["Sep 30, 2026", None]),
+            }
+            for index in range(params.get("num", 5))
+        ],
+    }
+
+
+async def _request(method: str, path: str, payload: dict = None, encoding: str = "identity") -> tuple:
+    """Calls the app directly; returns (sizes of the non-empty body messages, response headers)."""
+    body = json.dumps(payload).encode() if payload is not None else b""
+    route, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+        "path": route, "raw_path": route.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"accept-encoding", encoding.encode()), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000), "state": {},
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)
+
+    sizes, headers = [], {}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            headers.update({key.decode(): value.decode() for key, value in message["headers"]})
+        elif message["type"] == "http.response.body" and message.get("body"):
+            sizes.append(len(message["body"]))
+
+    await app(scope, receive, send)
+    return sizes, headers
+
+
+def _session(questions: int) -> list:
+    requests = [("subjects", "GET", "/api/subjects", None)]
+    for index in range(questions):
+        tools = ["researcher"] if index % 2 else []
+        requests.append((f"chat {index + 1}{' +search' if tools else ''}", "POST", "/api/chat", {
+            "subject": "chemistry", "mode": "OL", "question": QUESTIONS[index % len(QUESTIONS)], "tools": tools,
+        }))
+    requests += [
+        ("research", "POST", "/api/research", {"query": "GCE chemistry practical tips", "num_results": 5}),
+        ("research, title+link", "POST", "/api/research?fields=title,link",
+         {"query": "GCE chemistry practical tips", "num_results": 5}),
+        ("messenger", "POST", "/api/messenger", {"query": "GCE results", "num_results": 5}),
+    ]
+    return requests
+
+
+async def run(args):
+    gemini_service._stream = _fake_llm(args.tokens)
+    search_service.search = _fake_search
+    encodings = ["identity", *reversed(ENCODINGS)]
+
+    print(f"{'request':<24} {'before':>9}" + "".join(f" {name:>9}" for name in encodings) + "   chunks")
+    totals = {name: 0 for name in ["before", *encodings]}
+    for label, method, path, payload in _session(args.questions):
+        row, chunks = {}, {}
+        for encoding in encodings:
+            sizes, _ = await _request(method, path, payload, encoding)
+            row[encoding] = sum(sizes)
+            chunks[encoding] = len(sizes)
+        row["before"] = row["identity"]
+        if path.startswith("/api/research"):
+            # Every result field, nulls included, and SerpApi's metadata, uncompressed
+            old = await search_service.search({"q": payload["query"], "num": payload["num_results"]})
+            row["before"] = len(json.dumps({
+                "query": payload["query"],
+                "results": [{key: result.get(key) for key in ("title", "link", "snippet", "source")}
+                            for result in old["organic_results"]],
+                "raw_metadata": old["search_metadata"],
+            }, separators=(",", ":")).encode())
+        for name, size in row.items():
+            totals[name] += size
+        print(f"{label:<24} {row['before']:>9,}" + "".join(f" {row[name]:>9,}" for name in encodings)
+              + "   " + "/".join(str(chunks[name]) for name in encodings))
+    print(f"{'session':<24} {totals['before']:>9,}" + "".join(f" {totals[name]:>9,}" for name in encodings))
+    best = min(encodings, key=lambda name: totals[name])
+    print(f"\n{best}: {totals['before'] / totals[best]:.1f}x fewer bytes than before "
+          f"({totals['before'] - totals[best]:,} bytes saved per session)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=6)
+    parser.add_argument("--tokens", type=int, default=250, help="Tokens per streamed answer")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Connection reuse benchmark
+
+Times SerpApi-style requests against the local mock upstream over TLS
+(throwaway self-signed certificate, needs the openssl CLI) two ways:
+
+- fresh: a new client per request, as the tools used to do (DNS, TCP and
+  TLS handshake every time)
+- pooled: the shared, pre-warmed client from app/services/http_pools.py
+
+Reports latency percentiles sequentially and under --concurrency, and the
+per-request time saved. On localhost the saving is the handshake CPU only;
+with --url pointing at a real upstream it includes the network round trips.
+
+Usage (from backend/):
+    python -m benchmarks.http_pools
+    python -m benchmarks.http_pools --requests 200 --concurrency 10
+    python -m benchmarks.http_pools --url https://serpapi.com   # real upstream, HEAD /
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+import httpx
+
+from app.services.http_pools import HTTP2, http_pools
+from benchmarks.mock_upstream import MockSettings, build_mock_upstream, serve_in_thread
+
+PORT = 8767
+
+
+def _self_signed(directory: str) -> tuple:
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def _percentile(values: list, share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def _line(label: str, latencies: list):
+    print(f"{label:<42} {statistics.median(latencies) * 1000:>7.2f}ms {_percentile(latencies, 0.9) * 1000:>7.2f}ms "
+          f"{_percentile(latencies, 0.99) * 1000:>7.2f}ms")
+
+
+async def _timed(request, count: int, concurrency: int) -> list:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await request()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                raise RuntimeError(f"upstream answered {response.status_code}")
+
+    await asyncio.gather(*(one() for _ in range(count)))
+    return latencies
+
+
+async def run(args, base_url: str):
+    method, path = ("HEAD", "/") if args.url else ("GET", "/search.json")
+    params = None if args.url else {"q": "GCE timetable", "num": 3}
+
+    async def fresh():
+        async with httpx.AsyncClient(base_url=base_url, http2=HTTP2) as client:
+            return await client.request(method, path, params=params)
+
+    http_pools.register("bench", base_url, timeout=30, max_connections=args.concurrency)
+    pooled_client = http_pools.client("bench")
+    started = time.perf_counter()
+    await http_pools.warm()
+    print(f"warm-up (DNS + connect + TLS): {(time.perf_counter() - started) * 1000:.1f} ms, "
+          f"HTTP/2 {'on' if HTTP2 else 'off (pip install h2)'}\n")
+
+    async def pooled():
+        return await pooled_client.request(method, path, params=params)
+
+    print(f"{args.requests} requests to {base_url}{path}\n")
+    print(f"{'':<42} {'p50':>9} {'p90':>9} {'p99':>9}")
+    results = {}
+    for concurrency in (1, args.concurrency):
+        for label, request in (("fresh client per request", fresh), ("pooled client", pooled)):
+            latencies = await _timed(request, args.requests, concurrency)
+            results[(label, concurrency)] = latencies
+            _line(f"{label}, concurrency {concurrency}", latencies)
+        saved = (statistics.median(results[("fresh client per request", concurrency)])
+                 - statistics.median(results[("pooled client", concurrency)]))
+        print(f"{'saved per request (p50)':<42} {saved * 1000:>7.2f}ms\n")
+    await http_pools.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--url", help="Real upstream to HEAD instead of the local mock")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run(args, args.url))
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = _self_signed(directory)
+        os.environ["SSL_CERT_FILE"] = cert  # trusted by every httpx client, fresh or pooled
+        serve_in_thread(build_mock_upstream(MockSettings(search_delay=0.0)), PORT,
+                        ssl_certfile=cert, ssl_keyfile=key)
+        asyncio.run(run(args, f"https://127.0.0.1:{PORT}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Chat endpoint load test
+
+Drives the 11 subject endpoints plus /api/research and /api/messenger at a
+fixed concurrency and reports time-to-first-token, inter-token latency,
+latency percentiles and requests/s per endpoint group. By default it starts
+the mock upstream and the LEWA app in-process, so it runs fully offline.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --requests 500 --concurrency 50
+    python -m benchmarks.load_test --requests 500 --concurrency 50 --repeat 0.5 --error-rate 0.02
+    python -m benchmarks.load_test --target http://127.0.0.1:8000   # an already running server
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.mock_upstream import add_arguments, build_mock_upstream, serve_in_thread, settings_from_args
+
+SUBJECTS = [
+    "mathematics", "english", "geography", "literature", "physics", "economics",
+    "chemistry", "biology", "history", "french", "religious_studies",
+]
+TOOLS = ["research", "messenger"]
+QUESTION_BANK = [
+    "Explain {n} key ideas about this topic for my exam",
+    "Give me a worked example number {n} from a past paper",
+    "Summarise lesson {n} in simple terms",
+    "What are {n} common mistakes students make here?",
+]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.ttfts = []
+        self.itls = []
+        self.statuses = defaultdict(int)
+        self.bytes = 0
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def make_request(rng: random.Random, index: int, repeat: float, tools_share: float):
+    # With probability `repeat` reuse a small pool of questions to exercise the caches
+    n = rng.randint(1, 5) if rng.random() < repeat else index
+    question = rng.choice(QUESTION_BANK).format(n=n)
+    if rng.random() < tools_share:
+        tool = rng.choice(TOOLS)
+        return tool, f"/api/{tool}", {"query": question, "num_results": 3}
+    subject = rng.choice(SUBJECTS)
+    return "chat", f"/api/{subject}", {"question": question, "mode": rng.choice(["OL", "AL"])}
+
+
+async def send(client: httpx.AsyncClient, path: str, body: dict, stats: Stats):
+    started = time.perf_counter()
+    try:
+        async with client.stream("POST", path, json=body) as response:
+            last = None
+            async for chunk in response.aiter_raw():
+                now = time.perf_counter()
+                if last is None:
+                    stats.ttfts.append(now - started)
+                else:
+                    stats.itls.append(now - last)
+                last = now
+                stats.bytes += len(chunk)
+            stats.statuses[response.status_code] += 1
+    except httpx.HTTPError as e:
+        stats.statuses[type(e).__name__] += 1
+        return
+    stats.latencies.append(time.perf_counter() - started)
+
+
+async def run_load(target: str, args) -> dict:
+    rng = random.Random(args.seed)
+    plan = [make_request(rng, i, args.repeat, args.tools_share) for i in range(args.requests)]
+    groups = defaultdict(Stats)
+    cursor = iter(plan)
+
+    async def worker(client):
+        for group, path, body in cursor:
+            await send(client, path, body, groups[group])
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=target, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(client) for _ in range(args.concurrency)])
+        wall = time.perf_counter() - started
+    return {"groups": groups, "wall": wall}
+
+
+def report(result: dict, args):
+    wall = result["wall"]
+    total = sum(sum(s.statuses.values()) for s in result["groups"].values())
+    print(f"requests: {total} in {wall:.2f} s -> {total / wall:.1f} req/s (concurrency {args.concurrency})")
+    header = f"{'group':<10} {'n':>5} {'ok%':>6} {'ttft p50':>9} {'ttft p95':>9} {'itl p50':>8} {'itl p99':>8} {'lat p50':>8} {'lat p95':>8} {'lat p99':>8}"
+    print(header)
+    print("-" * len(header))
+    for group, stats in sorted(result["groups"].items()):
+        n = sum(stats.statuses.values())
+        ok = stats.statuses.get(200, 0) / n * 100 if n else 0
+        ms = lambda v: f"{v * 1000:8.1f}"
+        print(
+            f"{group:<10} {n:>5} {ok:>5.1f}% "
+            f"{ms(percentile(stats.ttfts, 50))} {ms(percentile(stats.ttfts, 95))} "
+            f"{ms(percentile(stats.itls, 50))}{ms(percentile(stats.itls, 99))} "
+            f"{ms(percentile(stats.latencies, 50))}{ms(percentile(stats.latencies, 95))}{ms(percentile(stats.latencies, 99))}"
+        )
+        errors = {k: v for k, v in stats.statuses.items() if k != 200}
+        if errors:
+            print(f"{'':<10} errors: {errors}")
+    print("(all times in ms)")
+
+
+async def run_in_process(args):
+    # Settings are read at import time, so point the app at the mock before importing it
+    os.environ.setdefault("GROQ_API_KEY", "mock")
+    os.environ.setdefault("SERPAPI_API_KEY", "mock")
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{args.mock_port}"
+    os.environ["SERPAPI_BASE_URL"] = f"http://127.0.0.1:{args.mock_port}"
+    # Every simulated student comes from 127.0.0.1: measure the app, not the per-IP budget
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+    serve_in_thread(build_mock_upstream(settings_from_args(args)), args.mock_port)
+
+    from app.main import app
+    serve_in_thread(app, args.app_port)
+    return await run_load(f"http://127.0.0.1:{args.app_port}", args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="base URL of a running server; default starts app + mock in-process")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--repeat", type=float, default=0.0, help="share of requests drawn from a small repeated pool")
+    parser.add_argument("--tools-share", type=float, default=0.15, help="share of requests sent to research/messenger")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--mock-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8766)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.target:
+        result = asyncio.run(run_load(args.target, args))
+    else:
+        result = asyncio.run(run_in_process(args))
+    report(result, args)
+
+
+if __name__ == "__main__":
+    main()
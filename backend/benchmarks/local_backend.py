@@ -0,0 +1,95 @@
+"""
+Local CPU backend benchmark
+
+Streams a batch of concurrent questions through LocalBackend and reports
+time-to-first-token, aggregate and per-stream tokens/s, and peak RSS.
+Reference target: a 4-core, 8 GB machine with a Q4_K_M 3B-8B GGUF model.
+Compare --slots 1 (one sequence at a time) against --slots 4 (batched) to
+see what continuous batching buys on the machine at hand.
+
+Usage (from backend/, requires llama-cpp-python and a GGUF file):
+    python -m benchmarks.local_backend --model models/llama-3.2-3b-instruct-q4_k_m.gguf \\
+        --concurrency 4 --slots 4 --threads 4 --max-tokens 128
+"""
+import argparse
+import asyncio
+import os
+import resource
+import statistics
+import sys
+import time
+
+from app.services.backends import LocalBackend
+
+QUESTIONS = [
+    "Explain photosynthesis in two sentences.",
+    "Solve 2x + 3 = 11 and show your working.",
+    "What is opportunity cost? Give an example.",
+    "Name three rivers in Cameroon.",
+    "State Newton's second law of motion.",
+    "What is the difference between weather and climate?",
+]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_one(backend: LocalBackend, question: str, max_tokens: int) -> dict:
+    messages = [
+        {"role": "system", "content": "You are a concise GCE tutor."},
+        {"role": "user", "content": question},
+    ]
+    started = time.perf_counter()
+    first = None
+    chunks = 0
+    async for _ in backend.stream("local", messages, temperature=0.7, max_tokens=max_tokens):
+        if first is None:
+            first = time.perf_counter() - started
+        chunks += 1
+    elapsed = time.perf_counter() - started
+    return {"ttft": first or elapsed, "tokens": chunks, "seconds": elapsed}
+
+
+async def run(args):
+    rss_before = peak_rss_mb()
+    load_started = time.perf_counter()
+    backend = LocalBackend(args.model, threads=args.threads, n_ctx=args.ctx, slots=args.slots, batch=args.batch)
+    backend.load()  # not counted in TTFT
+    load_seconds = time.perf_counter() - load_started
+    rss_loaded = peak_rss_mb()
+
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.concurrency)]
+    started = time.perf_counter()
+    results = await asyncio.gather(*[run_one(backend, q, args.max_tokens) for q in questions])
+    wall = time.perf_counter() - started
+    await backend.aclose()
+
+    tokens = sum(r["tokens"] for r in results)
+    print(f"model:               {os.path.basename(args.model)}")
+    print(f"threads/slots:       {args.threads}/{args.slots}, concurrency {args.concurrency}")
+    print(f"forward passes:      {backend.decode_calls}")
+    print(f"load time:           {load_seconds:.2f} s")
+    print(f"TTFT p50 / max:      {statistics.median(r['ttft'] for r in results):.2f} s / {max(r['ttft'] for r in results):.2f} s")
+    print(f"tokens generated:    {tokens}")
+    print(f"aggregate tokens/s:  {tokens / wall:.1f}")
+    print(f"per-stream tokens/s: {statistics.mean(r['tokens'] / r['seconds'] for r in results):.1f}")
+    print(f"peak RSS:            {peak_rss_mb():.0f} MB (before load {rss_before:.0f} MB, after load {rss_loaded:.0f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", required=True, help="path to a GGUF model file")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--ctx", type=int, default=2048)
+    parser.add_argument("--batch", type=int, default=512)
+    parser.add_argument("--max-tokens", type=int, default=128)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
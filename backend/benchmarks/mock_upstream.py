@@ -0,0 +1,166 @@
+"""
+Mock upstream server
+
+Deterministic local stand-in for the Groq API (OpenAI-compatible chat
+completions, streaming and non-streaming) and SerpApi (/search.json), so
+load tests run offline with controllable latency, jitter and error rate.
+
+Point the backend at it with:
+    GROQ_BASE_URL=http://127.0.0.1:8765 SERPAPI_BASE_URL=http://127.0.0.1:8765
+
+Usage (from backend/):
+    python -m benchmarks.mock_upstream --port 8765 --token-latency 0.02 --jitter 0.01 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+VOCABULARY = (
+    "the a of to and is in that for it as with on by this be are from at an which "
+    "equation force energy cell market river history answer step therefore because "
+    "example solution value first second next finally result method using we"
+).split()
+
+
+class MockSettings:
+    def __init__(self, token_latency: float = 0.02, jitter: float = 0.0, error_rate: float = 0.0,
+                 tokens: int = 120, first_token_latency: float = 0.2, search_delay: float = 0.5, seed: int = 0):
+        self.token_latency = token_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.tokens = tokens
+        self.first_token_latency = first_token_latency
+        self.search_delay = search_delay
+        self.seed = seed
+
+
+def _rng(settings: MockSettings, text: str) -> random.Random:
+    # Same request text + seed -> same answer and same timings
+    digest = hashlib.sha256(f"{settings.seed}:{text}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _delay(settings: MockSettings, rng: random.Random, base: float) -> float:
+    return max(0.0, base + rng.uniform(-settings.jitter, settings.jitter))
+
+
+def build_mock_upstream(settings: MockSettings) -> FastAPI:
+    mock = FastAPI(title="LEWA mock upstream")
+    mock.state.requests = 0
+
+    @mock.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        mock.state.requests += 1
+        prompt = json.dumps(body.get("messages", []), sort_keys=True)
+        rng = _rng(settings, prompt)
+        model = body.get("model", "mock")
+        max_tokens = min(body.get("max_tokens") or settings.tokens, settings.tokens)
+        words = [rng.choice(VOCABULARY) for _ in range(max_tokens)]
+
+        # Errors are random per call (not per prompt) so retries can succeed
+        if random.random() < settings.error_rate:
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "mock upstream failure", "type": "server_error"}},
+            )
+
+        completion_id = f"chatcmpl-{rng.getrandbits(48):x}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(_delay(settings, rng, settings.first_token_latency + settings.token_latency * len(words)))
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(words), "total_tokens": len(prompt) // 4 + len(words)},
+            }
+
+        async def events():
+            await asyncio.sleep(_delay(settings, rng, settings.first_token_latency))
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(_delay(settings, rng, settings.token_latency))
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @mock.get("/search.json")
+    async def search(q: str = "", num: int = 5):
+        mock.state.requests += 1
+        rng = _rng(settings, q)
+        await asyncio.sleep(_delay(settings, rng, settings.search_delay))
+        if random.random() < settings.error_rate:
+            return JSONResponse(status_code=500, content={"error": "mock upstream failure"})
+        return {
+            "search_metadata": {"status": "Success", "id": f"{rng.getrandbits(48):x}"},
+            "organic_results": [
+                {
+                    "title": f"{q} - result {i + 1}",
+                    "link": f"https://example.com/{i + 1}",
+                    "snippet": " ".join(rng.choice(VOCABULARY) for _ in range(25)),
+                    "source": "example.com",
+                    "date": "2 days ago",
+                }
+                for i in range(num)
+            ],
+        }
+
+    return mock
+
+
+def serve_in_thread(app: FastAPI, port: int, host: str = "127.0.0.1", **options) -> uvicorn.Server:
+    """Runs an ASGI app on its own event loop in a daemon thread; options go to uvicorn.Config (e.g. ssl_certfile)."""
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", **options))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--token-latency", type=float, default=0.02, help="seconds between streamed tokens")
+    parser.add_argument("--first-token-latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds added to every delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls answered with HTTP 500")
+    parser.add_argument("--tokens", type=int, default=120, help="tokens per completion")
+    parser.add_argument("--search-delay", type=float, default=0.5, help="seconds per search")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(
+        token_latency=args.token_latency, jitter=args.jitter, error_rate=args.error_rate, tokens=args.tokens,
+        first_token_latency=args.first_token_latency, search_delay=args.search_delay, seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(build_mock_upstream(settings_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
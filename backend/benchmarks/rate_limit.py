@@ -0,0 +1,108 @@
+"""
+Rate limiter overhead benchmark
+
+Times what RateLimitMiddleware adds to every budgeted request: identifying
+the client from the ASGI scope and taking tokens from its buckets, for the
+in-memory and SQLite backends. Clients are spread over --clients sessions
+behind --addresses IPs, so buckets are created, refilled and pruned as in
+production. Also times a whole request through the middleware around an
+empty app, with and without the limiter.
+
+Usage (from backend/):
+    python -m benchmarks.rate_limit
+    python -m benchmarks.rate_limit --requests 200000 --clients 50000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.services.rate_limit import Budget, MemoryBuckets, RateLimiter, RateLimitMiddleware, SQLiteBuckets
+
+
+SECRET = "bench"
+
+
+def _scopes(count: int, clients: int, addresses: int) -> list:
+    rng = random.Random(0)
+    sessions = [RateLimiter(backend=MemoryBuckets(), secret=SECRET).issue_session() for _ in range(clients)]
+    scopes = []
+    for _ in range(count):
+        session = rng.randrange(clients)
+        scopes.append({
+            "type": "http", "method": "POST", "path": "/api/chat",
+            "headers": [(b"content-type", b"application/json"), (b"x-session-id", sessions[session])],
+            "client": (f"10.0.{session % addresses // 256}.{session % addresses % 256}", 50000),
+        })
+    return scopes
+
+
+def _limiter(backend) -> RateLimiter:
+    # Generous budgets: the hot path is the allowed one
+    budgets = {name: Budget("1000000/60") for name in ("chat", "search", "analytics")}
+    return RateLimiter(budgets=budgets, backend=backend, enabled=True, secret=SECRET)
+
+
+def _line(label: str, samples: list):
+    ordered = sorted(samples)
+    print(f"{label:<34} {statistics.median(ordered) * 1e6:>7.1f}us {ordered[int(len(ordered) * 0.99)] * 1e6:>7.1f}us")
+
+
+def time_checks(limiter: RateLimiter, scopes: list) -> list:
+    samples = []
+    for scope in scopes:
+        started = time.perf_counter()
+        limiter.check("chat", limiter.clients(scope))
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def time_requests(app, scopes: list) -> list:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    samples = []
+    for scope in scopes:
+        started = time.perf_counter()
+        await app(scope, receive, send)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def empty_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--clients", type=int, default=5000, help="Distinct sessions")
+    parser.add_argument("--addresses", type=int, default=200, help="Distinct IPs the sessions sit behind")
+    args = parser.parse_args()
+
+    scopes = _scopes(args.requests, args.clients, args.addresses)
+    print(f"{args.requests:,} chat requests from {args.clients:,} sessions behind {args.addresses:,} IPs\n")
+    print(f"{'':<34} {'p50':>9} {'p99':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        backends = (("memory", MemoryBuckets()), ("sqlite", SQLiteBuckets(os.path.join(directory, "rl.sqlite3"))))
+        for name, backend in backends:
+            _line(f"check, {name}", time_checks(_limiter(backend), scopes))
+
+        unlimited = RateLimitMiddleware(empty_app, RateLimiter(backend=MemoryBuckets(), enabled=False))
+        baseline = asyncio.run(time_requests(unlimited, scopes))
+        _line("request, limiter off", baseline)
+        for name, backend in backends:
+            samples = asyncio.run(time_requests(RateLimitMiddleware(empty_app, _limiter(backend)), scopes))
+            _line(f"request, {name}", samples)
+            print(f"{'  added (p50)':<34} {(statistics.median(samples) - statistics.median(baseline)) * 1e6:>7.1f}us")
+
+
+if __name__ == "__main__":
+    main()
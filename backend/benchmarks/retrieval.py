@@ -0,0 +1,118 @@
+"""
+Retrieval index benchmark
+
+Builds a synthetic index of random unit vectors (default 1M chunks in one
+subject/level partition, written as several segments to bound memory), then
+reports how long opening it takes, search latency percentiles and recall@k
+of the Hamming pre-filter against an exact scan.
+
+Queries are noisy copies of stored chunks, like a student paraphrasing a
+textbook sentence, so the exact top hit is known.
+
+Usage (from backend/):
+    python -m benchmarks.retrieval
+    python -m benchmarks.retrieval --chunks 200000 --dim 256 --candidates 256 --keep data/bench-index
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.retrieval import MANIFEST, RAG_RERANK_CANDIDATES, VectorIndex, write_segment
+
+
+def build(root: str, chunks: int, dim: int, segment_size: int, dtype: str, rng) -> list:
+    """Writes the synthetic index and returns a sample of (segment number, row, vector) for queries."""
+    partition = os.path.join(root, "physics", "AL")
+    os.makedirs(partition, exist_ok=True)
+    names, samples = [], []
+    documents = [{"source": "synthetic.txt", "title": "Synthetic"}]
+    for number, start in enumerate(range(0, chunks, segment_size)):
+        count = min(segment_size, chunks - start)
+        vectors = rng.standard_normal((count, dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        texts = [f"chunk {start + row}" for row in range(count)]
+        name = f"seg-{number + 1:06d}"
+        write_segment(os.path.join(partition, name), vectors, texts, [(0, start + row) for row in range(count)], documents, dtype)
+        names.append(f"physics/AL/{name}")
+        for row in rng.choice(count, size=min(count, 50), replace=False):
+            samples.append((start + int(row), vectors[row].copy()))
+        del vectors
+    with open(os.path.join(root, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"generation": 1, "dim": dim, "dtype": dtype, "segments": names}, f)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--dtype", choices=["int8", "float16"], default="int8")
+    parser.add_argument("--segment-size", type=int, default=250_000)
+    parser.add_argument("--candidates", type=int, default=RAG_RERANK_CANDIDATES)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.6, help="query = chunk + noise * random unit vector")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--keep", help="build the index here and keep it instead of a temp dir")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    root = args.keep or tempfile.mkdtemp(prefix="lewa-index-")
+    try:
+        started = time.perf_counter()
+        samples = build(root, args.chunks, args.dim, args.segment_size, args.dtype, rng)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index = VectorIndex(root)
+        open_ms = (time.perf_counter() - started) * 1000
+
+        queries = []
+        for _ in range(args.queries):
+            position, vector = samples[rng.integers(len(samples))]
+            noise = rng.standard_normal(args.dim, dtype=np.float32)
+            query = vector + args.noise * noise / np.linalg.norm(noise)
+            queries.append((position, (query / np.linalg.norm(query)).astype(np.float32)))
+
+        index.search(queries[0][1], "physics", "AL", args.k, args.candidates)  # page the files in
+        latencies, found = [], 0
+        for position, query in queries:
+            started = time.perf_counter()
+            hits = index.search(query, "physics", "AL", args.k, args.candidates)
+            latencies.append(time.perf_counter() - started)
+            found += any(hit["position"] == position for hit in hits)
+
+        # Exact recall@k on a few queries: rescoring every row is what the pre-filter avoids
+        exact_queries = queries[:10]
+        overlap = 0
+        for _, query in exact_queries:
+            exact = []
+            for segment in index.partitions[("physics", "AL")]:
+                scores = (segment.vectors.astype(np.float32) @ query) * segment.meta["scale"]
+                top = np.argpartition(scores, -args.k)[-args.k:]
+                exact.extend((float(scores[row]), int(segment.meta["position"][row])) for row in top)
+            exact = {position for _, position in sorted(exact, reverse=True)[:args.k]}
+            approximate = {hit["position"] for hit in index.search(query, "physics", "AL", args.k, args.candidates)}
+            overlap += len(exact & approximate)
+
+        latencies.sort()
+        print(f"chunks:            {index.size:,} x {args.dim} {args.dtype} in {len(index.partitions[('physics', 'AL')])} segments")
+        print(f"build:             {build_seconds:.1f} s")
+        print(f"open:              {open_ms:.1f} ms")
+        print(f"search:            p50 {statistics.median(latencies) * 1000:.1f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms "
+              f"({args.candidates} rerank candidates)")
+        print(f"source chunk hit:  {found / len(queries):.1%} of queries found their source chunk in the top {args.k}")
+        print(f"recall@{args.k}:          {overlap / (len(exact_queries) * args.k):.1%} vs an exact scan")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Search vs. streaming load test
+
+Runs the LEWA app against local stand-ins for SerpApi and Groq, opens a batch
+of subject streams and fires slow searches while they are flowing. Reports the
+worst gap between streamed chunks: with a non-blocking search client it stays
+close to the token interval, with a blocking one it grows to the search latency.
+
+Usage (from backend/):
+    python -m benchmarks.search_load --streams 20 --searches 10 --search-delay 2
+    python -m benchmarks.search_load --blocking   # baseline with a blocking client
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+UPSTREAM_PORT = 8765
+APP_PORT = 8766
+
+# Point the app at the local stand-ins before any app module reads its settings
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("SERPAPI_API_KEY", "bench")
+os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{UPSTREAM_PORT}"
+os.environ["SERPAPI_BASE_URL"] = f"http://127.0.0.1:{UPSTREAM_PORT}"
+# Every stream comes from 127.0.0.1: measure the app, not the per-IP budget
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+import httpx
+import uvicorn
+
+from benchmarks.mock_upstream import MockSettings, build_mock_upstream, serve_in_thread
+
+
+def use_blocking_search():
+    """Swap in the old behaviour: a synchronous HTTP call inside the async handler."""
+    from app.services.search import search_service
+
+    async def blocking_search(params, timeout=None):
+        response = httpx.get(f"{search_service.base_url}/search.json", params=params, timeout=30)
+        return response.json()
+
+    search_service.search = blocking_search
+
+
+async def stream_once(client: httpx.AsyncClient, index: int, gaps: list):
+    # Distinct questions so the answer caches and single-flight don't merge the streams
+    async with client.stream("POST", "/api/mathematics", json={"question": f"2+{index}", "mode": "OL"}) as response:
+        last = time.perf_counter()
+        async for _ in response.aiter_text():
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+
+async def search_once(client: httpx.AsyncClient, index: int, latencies: list):
+    start = time.perf_counter()
+    response = await client.post("/api/research", json={"query": f"GCE 2026 timetable {index}", "num_results": 3})
+    response.raise_for_status()
+    latencies.append(time.perf_counter() - start)
+
+
+async def run(args):
+    from app.main import app
+
+    if args.blocking:
+        use_blocking_search()
+
+    settings = MockSettings(token_latency=args.token_interval, first_token_latency=args.token_interval,
+                            tokens=args.tokens, search_delay=args.search_delay)
+    serve_in_thread(build_mock_upstream(settings), UPSTREAM_PORT)
+    server = uvicorn.Server(uvicorn.Config(app, port=APP_PORT, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    gaps, search_latencies = [], []
+    limits = httpx.Limits(max_connections=args.streams + args.searches)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", timeout=120, limits=limits) as client:
+        streams = [asyncio.create_task(stream_once(client, i, gaps)) for i in range(args.streams)]
+        await asyncio.sleep(args.token_interval * 3)  # let the streams get going first
+        searches = [asyncio.create_task(search_once(client, i, search_latencies)) for i in range(args.searches)]
+        started = time.perf_counter()
+        await asyncio.gather(*streams, *searches)
+        elapsed = time.perf_counter() - started
+
+    server.should_exit = True
+    await server_task
+
+    gaps.sort()
+    print(f"mode:              {'blocking' if args.blocking else 'async'} search client")
+    print(f"streams/searches:  {args.streams}/{args.searches} (search delay {args.search_delay:g}s)")
+    print(f"chunks received:   {len(gaps)}")
+    print(f"inter-chunk p50:   {statistics.median(gaps) * 1000:.1f} ms")
+    print(f"inter-chunk p99:   {gaps[int(len(gaps) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"inter-chunk max:   {gaps[-1] * 1000:.1f} ms")
+    print(f"search latency:    {statistics.mean(search_latencies):.2f} s avg")
+    print(f"wall time:         {elapsed:.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument("--searches", type=int, default=10)
+    parser.add_argument("--search-delay", type=float, default=2.0)
+    parser.add_argument("--token-interval", type=float, default=0.02)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--blocking", action="store_true", help="use a blocking search client as the baseline")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
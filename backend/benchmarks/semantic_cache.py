@@ -0,0 +1,114 @@
+"""
+Semantic cache benchmark
+
+Fills one subject/mode index with synthetic past-paper style questions, then
+measures lookup latency and hit rates for:
+  - reworded repeats of cached questions (should hit)
+  - new questions that differ only in their numbers or topic (should miss)
+
+Usage (from backend/):
+    python -m benchmarks.semantic_cache --entries 100000 --queries 2000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.semantic_cache import SemanticCache
+
+TEMPLATES = [
+    "Solve {a}x^2 + {b}x - {c} = 0",
+    "Find the derivative of {a}x^3 + {b}x",
+    "Calculate the mean of {a}, {b} and {c}",
+    "A car accelerates from rest to {a} m/s in {b} s. Find its acceleration",
+    "Explain the role of {topic} in {context}",
+    "What is the difference between {topic} and {other}?",
+    "Describe the causes of {topic} in {context}",
+]
+TOPICS = ["photosynthesis", "osmosis", "inflation", "erosion", "colonialism", "electrolysis",
+          "respiration", "demand", "supply", "diffusion", "federalism", "oxidation", "refraction"]
+CONTEXTS = ["Cameroon", "West Africa", "plants", "the economy", "the 19th century", "industry"]
+
+
+def make_question(rng: random.Random, topic_pool=TOPICS) -> str:
+    template = rng.choice(TEMPLATES)
+    return template.format(
+        a=rng.randint(1, 300), b=rng.randint(1, 300), c=rng.randint(1, 300),
+        topic=rng.choice(topic_pool), other=rng.choice(topic_pool), context=rng.choice(CONTEXTS),
+    )
+
+
+def reword(rng: random.Random, question: str) -> str:
+    """Surface variations students actually type."""
+    variants = [
+        question.lower(),
+        question.upper(),
+        "Please " + question[0].lower() + question[1:],
+        question.replace("^2", "²").replace("^3", "³").replace(" - ", " − "),
+        question.rstrip("?") + "??",
+        "  ".join(question.split(" ")),
+        "Can you help me: " + question,
+    ]
+    return rng.choice(variants)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=0.92)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cache = SemanticCache(enabled=True, threshold=args.threshold, max_entries=args.entries, dim=args.dim)
+    scope = ("mathematics", "OL", "bench")
+
+    questions = []
+    started = time.perf_counter()
+    for i in range(args.entries):
+        question = make_question(rng)
+        questions.append(question)
+        cache.add(scope, question, f"answer {i}")
+    fill_seconds = time.perf_counter() - started
+    index = cache.indexes[scope]
+
+    def run(batch):
+        hits, latencies = 0, []
+        for question in batch:
+            t0 = time.perf_counter()
+            answer = cache.lookup(scope, question)
+            latencies.append(time.perf_counter() - t0)
+            hits += answer is not None
+        return hits / len(batch), latencies
+
+    cached = {q.lower() for q in questions}
+    repeats = [reword(rng, rng.choice(questions)) for _ in range(args.queries)]
+    novel = []
+    while len(novel) < args.queries:
+        question = make_question(rng, topic_pool=TOPICS + ["mitosis", "devaluation", "tectonics"])
+        if question.lower() not in cached:
+            novel.append(question)
+
+    repeat_rate, repeat_latency = run(repeats)
+    novel_rate, novel_latency = run(novel)
+    latencies = repeat_latency + novel_latency
+
+    print(f"entries:            {index.size} (dim {args.dim}, threshold {args.threshold})")
+    print(f"matrix memory:      {index.vectors.nbytes / 1e6:.1f} MB")
+    print(f"fill rate:          {args.entries / fill_seconds:,.0f} inserts/s")
+    print(f"reworded hit rate:  {repeat_rate:.1%}")
+    print(f"false hit rate:     {novel_rate:.1%}")
+    print(f"lookup p50:         {statistics.median(latencies) * 1000:.2f} ms")
+    print(f"lookup p95:         {percentile(latencies, 95) * 1000:.2f} ms")
+    print(f"lookup p99:         {percentile(latencies, 99) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Solver benchmark
+
+Starts a solver pool, then times a mix of typical OL/AL problems end to end
+(validation, queueing, the worker, the result crossing back): cold start of
+the workers, uncached solve latency percentiles per operation, concurrent
+throughput, and cached lookups. Every problem is solved --repeat times with
+the cache cleared, so percentiles are over real work.
+
+Usage (from backend/):
+    python -m benchmarks.solver
+    python -m benchmarks.solver --workers 2 --repeat 20 --concurrency 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services.solver import SOLVER_CPU_SECONDS, Solver, problem_from_question
+
+PROBLEMS = [
+    {"operation": "solve", "expression": "2x^2 + 5x - 3 = 0"},
+    {"operation": "solve", "expression": "x + 2y = 7; 3x - y = 7"},
+    {"operation": "solve", "expression": "x^3 - 6x^2 + 11x - 6 = 0"},
+    {"operation": "solve", "expression": "2sin(x) = 1"},
+    {"operation": "solve", "expression": "x^2 - 4x < 5"},
+    {"operation": "differentiate", "expression": "x^2 sin x"},
+    {"operation": "differentiate", "expression": "ln(3x^2 + 1) e^(2x)"},
+    {"operation": "integrate", "expression": "x e^x"},
+    {"operation": "integrate", "expression": "x sin x", "lower": "0", "upper": "pi"},
+    {"operation": "integrate", "expression": "1/(x^2 + 4)"},
+    {"operation": "simplify", "expression": "(x^2 - 9)/(x^2 + x - 6)"},
+    {"operation": "evaluate", "expression": "3/4 + 5/6 * 2^3"},
+    {"operation": "matrix", "expression": "[[2, 1, 0], [1, 3, 1], [0, 1, 4]]"},
+    {"operation": "statistics", "expression": "12, 15, 11, 18, 15, 20, 14, 15, 17, 13"},
+]
+QUESTIONS = [
+    "Solve for x: 2x^2 + 5x - 3 = 0",
+    "Differentiate x^3 cos x with respect to x",
+    "Integrate x^2 from 0 to 3",
+    "Find the mean of 4, 8, 15, 16, 23, 42",
+    "Explain how a transformer works",
+]
+
+
+def _percentile(values: list, share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def run(args):
+    solver = Solver(workers=args.workers, cpu_seconds=args.cpu_seconds, timeout=60)
+    started = time.perf_counter()
+    solver.warm()
+    await solver.solve({"operation": "evaluate", "expression": "1 + 1"})
+    print(f"{args.workers} worker(s), {args.cpu_seconds}s CPU per job, {args.repeat} runs per problem\n")
+    print(f"cold start (spawn + SymPy import + first job): {(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+    print(f"{'problem':<52} {'p50':>8} {'p90':>8} {'p99':>8}")
+    by_operation, everything = {}, []
+    for problem in PROBLEMS:
+        latencies = []
+        for _ in range(args.repeat):
+            solver._cache.clear()
+            started = time.perf_counter()
+            await solver.solve(problem)
+            latencies.append(time.perf_counter() - started)
+        by_operation.setdefault(problem["operation"], []).extend(latencies)
+        everything += latencies
+        label = f"{problem['operation']}: {problem['expression']}"[:52]
+        print(f"{label:<52} {statistics.median(latencies) * 1000:>6.1f}ms "
+              f"{_percentile(latencies, 0.9) * 1000:>6.1f}ms {_percentile(latencies, 0.99) * 1000:>6.1f}ms")
+
+    print()
+    for operation, latencies in by_operation.items():
+        print(f"{operation:<52} {statistics.median(latencies) * 1000:>6.1f}ms "
+              f"{_percentile(latencies, 0.9) * 1000:>6.1f}ms {_percentile(latencies, 0.99) * 1000:>6.1f}ms")
+    print(f"{'all problems':<52} {statistics.median(everything) * 1000:>6.1f}ms "
+          f"{_percentile(everything, 0.9) * 1000:>6.1f}ms {_percentile(everything, 0.99) * 1000:>6.1f}ms")
+
+    # Concurrent load: the pool queues what the workers can't take
+    solver._cache.clear()
+    jobs = [PROBLEMS[i % len(PROBLEMS)] for i in range(args.concurrency * 4)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(problem):
+        async with semaphore:
+            solver._cache.clear()
+            await solver.solve(problem)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(problem) for problem in jobs))
+    elapsed = time.perf_counter() - started
+    print(f"\nconcurrency {args.concurrency}: {len(jobs)} problems in {elapsed:.2f}s ({len(jobs) / elapsed:.1f}/s)")
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        await solver.solve(PROBLEMS[0])
+    print(f"cached solve: {(time.perf_counter() - started) * 1000:.1f} us")
+
+    started = time.perf_counter()
+    for _ in range(100):
+        for question in QUESTIONS:
+            problem_from_question(question)
+    print(f"chat problem detection: {(time.perf_counter() - started) / (100 * len(QUESTIONS)) * 1e6:.0f} us per question")
+    solver.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--cpu-seconds", type=int, default=SOLVER_CPU_SECONDS)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Off-topic classifier benchmark
+
+Trains the topic guard from the catalogue and seed questions, then scores a
+held-out set of questions (none of them in the seeds) and reports top-1
+accuracy, how often a question would be redirected when sent to the right
+subject (false redirects, should be ~0) and to a wrong one (caught), plus
+per-question latency.
+
+Usage (from backend/):
+    python -m benchmarks.topic_classifier
+    python -m benchmarks.topic_classifier --min-confidence 0.6 --max-requested 0.1
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.subjects import subject_registry
+from app.services.topic_classifier import TopicGuard
+
+HELD_OUT = {
+    "mathematics": [
+        "Find the roots of x^2 - 7x + 12 = 0",
+        "What is the derivative of ln(x)?",
+        "Evaluate the integral of 2x from 0 to 3",
+        "How many ways can 5 books be arranged on a shelf?",
+        "Find the standard deviation of 2, 4, 4, 4, 5, 5, 7, 9",
+        "Solve 5x - 3 = 2x + 9",
+        "Find the angle between two vectors",
+        "What is the nth term of a geometric progression?",
+        "Show that sin^2 x + cos^2 x = 1",
+        "Factorise x^2 + 5x + 6",
+    ],
+    "english": [
+        "What is an adverb? Give three examples",
+        "How do I write an informal letter to a friend?",
+        "Change this sentence into the passive voice",
+        "What is the plural of child?",
+        "Explain the use of the semicolon",
+        "How do I write a good introduction for an essay?",
+        "What is the difference between affect and effect?",
+        "Give me idioms and their meanings",
+    ],
+    "geography": [
+        "Explain the causes of desertification in northern Cameroon",
+        "What is a volcano and how is it formed?",
+        "Describe the tropical rainforest climate",
+        "What are the uses of rivers?",
+        "Explain the water cycle",
+        "How is a delta formed?",
+        "What are the main cash crops grown in Cameroon?",
+        "Describe the relief of the Cameroon mountain",
+    ],
+    "literature": [
+        "Discuss the theme of love in the play",
+        "How does the poet use personification?",
+        "Who is the antagonist in the novel?",
+        "Explain the use of flashback in the story",
+        "What is the role of the chorus in Greek tragedy?",
+        "Analyse the rhyme scheme of the poem",
+        "Discuss the theme of colonialism in the novel",
+        "What does the symbol of the river represent in the novel?",
+    ],
+    "physics": [
+        "What is the unit of electric current?",
+        "Calculate the work done in lifting a 10 kg box by 2 m",
+        "Explain the difference between conductors and insulators",
+        "What is the wavelength of a wave with frequency 50 Hz and speed 340 m/s?",
+        "State the law of conservation of energy",
+        "How does a convex lens form an image?",
+        "What is terminal velocity?",
+        "Explain nuclear fission",
+    ],
+    "economics": [
+        "What is the law of supply?",
+        "Explain the causes of a budget deficit",
+        "What is a cooperative society?",
+        "Distinguish between a market economy and a planned economy",
+        "What are the functions of commercial banks?",
+        "Explain the concept of division of labour",
+        "What is national income?",
+        "Why do governments impose tariffs on imports?",
+    ],
+    "chemistry": [
+        "What is the atomic number of carbon?",
+        "Explain the difference between a compound and a mixture",
+        "What is the formula of sulphuric acid?",
+        "How do I calculate molar mass?",
+        "Explain fractional distillation of crude oil",
+        "What are alkanes?",
+        "Describe the test for carbon dioxide",
+        "What is a redox reaction?",
+    ],
+    "biology": [
+        "What is the function of red blood cells?",
+        "Explain the process of respiration in cells",
+        "What is a gene?",
+        "Describe the structure of a leaf",
+        "How are seeds dispersed?",
+        "What is homeostasis?",
+        "Explain the role of hormones in the body",
+        "What are the causes of diabetes?",
+    ],
+    "history": [
+        "What were the causes of the Bakweri land problem?",
+        "Explain the role of Um Nyobe in the struggle for independence",
+        "What were the results of the Foumban conference?",
+        "Describe the abolition of the slave trade",
+        "Who was Otto von Bismarck?",
+        "Explain the causes of the Russian Revolution",
+        "What was the significance of the Treaty of Versailles?",
+        "Describe the decolonisation of Africa after 1945",
+    ],
+    "french": [
+        "Conjuguez le verbe finir au futur simple",
+        "How do I say good morning and thank you in French?",
+        "Quel est le féminin de acteur?",
+        "What are reflexive verbs in French?",
+        "Expliquez les adjectifs possessifs",
+        "Traduisez: the children are playing in the garden",
+        "Comment utiliser le passé simple?",
+        "What is the French word for library?",
+    ],
+    "religious_studies": [
+        "Explain the miracle of the feeding of the five thousand",
+        "What is the meaning of the Beatitudes?",
+        "Describe the conversion of Saul",
+        "What does Islam teach about prayer?",
+        "Explain the story of the Exodus",
+        "What is the role of the Holy Spirit?",
+        "Discuss the teachings of Amos on social justice",
+        "What is the Christian view on forgiveness?",
+    ],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-confidence", type=float)
+    parser.add_argument("--max-requested", type=float)
+    args = parser.parse_args()
+
+    guard = TopicGuard(enabled=True)
+    if args.min_confidence is not None:
+        guard.min_confidence = args.min_confidence
+    if args.max_requested is not None:
+        guard.max_requested = args.max_requested
+
+    started = time.perf_counter()
+    guard.train()
+    classifier = guard.model[0]
+    train_seconds = time.perf_counter() - started
+
+    slugs = [subject.slug for subject in subject_registry.all()]
+    rng = random.Random(0)
+    correct = total = false_redirects = caught = wrong_redirects = 0
+    latencies = []
+    for subject, questions in HELD_OUT.items():
+        for question in questions:
+            total += 1
+            probabilities = classifier.predict_proba(question)
+            correct += max(probabilities, key=probabilities.get) == subject
+
+            # Sent to the right subject: must never be redirected
+            started = time.perf_counter()
+            redirect = guard.check(subject, question)
+            latencies.append(time.perf_counter() - started)
+            false_redirects += redirect is not None
+
+            # Sent to a random wrong subject: should be redirected to the right one
+            wrong = rng.choice([slug for slug in slugs if slug != subject])
+            redirect = guard.check(wrong, question)
+            if redirect is not None:
+                right_name = subject_registry.get(subject).name
+                caught += redirect.startswith(f"This looks like a {right_name} question")
+                wrong_redirects += not redirect.startswith(f"This looks like a {right_name} question")
+
+    latencies.sort()
+    print(f"training:          {train_seconds * 1000:.0f} ms")
+    print(f"held-out questions: {total}")
+    print(f"top-1 accuracy:    {correct / total:.1%}")
+    print(f"false redirects:   {false_redirects} ({false_redirects / total:.1%}) when sent to the right subject")
+    print(f"caught:            {caught} ({caught / total:.1%}) when sent to a wrong subject")
+    print(f"wrong target:      {wrong_redirects} redirected to the wrong subject")
+    print(f"check() latency:   p50 {statistics.median(latencies) * 1e6:.0f} us, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
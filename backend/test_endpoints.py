@@ -13,12 +13,17 @@ def test_endpoint(subject, question, mode="OL"):
     
     print(f"Testing {subject.capitalize()} ({mode})...")
     try:
-        response = requests.post(url, json=payload)
+        # Subject endpoints stream plain text, not JSON
+        response = requests.post(url, json=payload, stream=True)
         
         if response.status_code == 200:
-            data = response.json()
+            text = "".join(chunk for chunk in response.iter_content(chunk_size=None, decode_unicode=True))
+            if text.startswith("Error"):
+                print(f"❌ The tutor returned an error")
+                print(f"Error: {text}\n")
+                return False
             print(f"✅ Success!")
-            print(f"Response snippet: {data['response'][:100]}...\n")
+            print(f"Response snippet: {text[:100]}...\n")
             return True
         else:
             print(f"❌ Failed with status code {response.status_code}")
@@ -47,6 +52,7 @@ def main():
         print("✨ All tests passed! The integration is working correctly.")
     else:
         print("⚠️ Some tests failed. Check the server logs and API key.")
+    print("For throughput numbers run: python -m benchmarks.load_test")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import admission_rejected_handler
+from app.services.admission import AdmissionController, AdmissionRejected, ConcurrencyLimiter
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    async def scenario():
+        limiter, admitted = ConcurrencyLimiter("test", max_concurrency=1, max_queue=10), []
+        await limiter.acquire(1)
+
+        async def wait(name):
+            await limiter.acquire(1)
+            admitted.append(name)
+
+        waiters = []
+        for name in "abcd":
+            waiters.append(asyncio.ensure_future(wait(name)))
+            await _settle()
+        for _ in "abcd":
+            limiter.release()
+            await _settle()
+        await asyncio.gather(*waiters)
+        assert admitted == list("abcd")
+        assert limiter.active == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", max_concurrency=1, max_queue=10)
+        await limiter.acquire(1)
+        gone = asyncio.ensure_future(limiter.acquire(1))
+        kept = asyncio.ensure_future(limiter.acquire(1))
+        await _settle()
+        gone.cancel()
+        await _settle()
+        assert limiter.queued == 1
+        limiter.release()
+        await kept
+        assert limiter.active == 1 and limiter.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_and_full_queue_are_rejected_with_retry_after():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", max_concurrency=1, max_queue=1)
+        await limiter.acquire(1)
+        waiting = asyncio.ensure_future(limiter.acquire(0.05))
+        await _settle()
+        with pytest.raises(AdmissionRejected, match="queue is full") as full:
+            await limiter.acquire(1)
+        with pytest.raises(AdmissionRejected, match="timed out") as timed_out:
+            await waiting
+        assert full.value.retry_after >= 1 and timed_out.value.retry_after >= 1
+        assert limiter.rejected == 2 and limiter.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_rejected_admission_gives_back_the_global_slot():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=4, model_max_concurrency=1, max_queue=4, queue_timeout=0.05)
+        ticket = await controller.admit("m", 100)
+        with pytest.raises(AdmissionRejected):
+            await controller.admit("m", 100)
+        assert controller.global_limiter.active == 1
+        ticket.release(100)
+        assert controller.global_limiter.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_token_quota_rejects_what_cannot_fit_before_the_deadline():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=4, queue_timeout=1, tokens_per_minute=1000)
+        (await controller.admit("m", 800)).release(800)
+        with pytest.raises(AdmissionRejected, match="token quota") as rejected:
+            await controller.admit("m", 800)
+        assert 1 <= rejected.value.retry_after <= 60
+
+    asyncio.run(scenario())
+
+
+def test_rejection_is_a_503_with_retry_after():
+    api = FastAPI()
+    api.add_exception_handler(AdmissionRejected, admission_rejected_handler)
+
+    @api.post("/api/chat")
+    async def chat():
+        raise AdmissionRejected("global: queue is full", 2.3)
+
+    response = TestClient(api).post("/api/chat")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
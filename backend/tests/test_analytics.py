@@ -0,0 +1,46 @@
+import json
+import math
+
+import pytest
+
+from app.services.analytics import analyse, compile_expression, pack_points, plot_json
+
+
+def _asymptotes(expression: str, x_min: float, x_max: float, points: int) -> list:
+    result = analyse(compile_expression(expression), x_min, x_max, points)
+    return [round(point["x"], 3) for point in result["discontinuities"] if point["kind"] == "asymptote"]
+
+
+@pytest.mark.parametrize("expression, x_min, x_max, points, poles", [
+    ("1/x^2", -10, 10, 1000, [0.0]),
+    ("1/abs(x)", -10, 10, 1000, [0.0]),
+    ("sec(x)^2", -10, 10, 1000, [-7.854, -4.712, -1.571, 1.571, 4.712, 7.854]),
+    ("tan(x)^2", -5, 5, 1000, [-4.712, -1.571, 1.571, 4.712]),
+    ("tan(x)^2", -5, 5, 100000, [-4.712, -1.571, 1.571, 4.712]),
+    ("1/(x-1)^2", -5, 5, 1000, [1.0]),
+    ("1/(x-1)^2", -5, 5, 100000, [1.0]),
+    # A sample 2e-5 from the pole
+    ("1/x^2", -10, 10.02, 1000, [0.0]),
+])
+def test_even_poles_are_asymptotes(expression, x_min, x_max, points, poles):
+    assert _asymptotes(expression, x_min, x_max, points) == pytest.approx(poles, abs=1e-3)
+
+
+def test_curve_is_broken_at_an_even_pole():
+    result = analyse(compile_expression("1/x^2"), -10, 10, 1000)
+    middle = (result["x"] > -0.02) & (result["x"] < 0.02)
+    assert any(value != value for value in result["y"][middle])  # a NaN separator
+
+
+@pytest.mark.parametrize("expression", ["x^2", "-x^2", "abs(x)", "sin(x)/x", "exp(-x^2/0.0001)"])
+def test_finite_peaks_are_not_asymptotes(expression):
+    assert _asymptotes(expression, -1, 1, 1000) == []
+
+
+@pytest.mark.parametrize("width", [None, 300])
+def test_curves_beyond_the_largest_float_still_plot(width):
+    result = analyse(compile_expression("1e308*x"), -10, 10, 1000, width)
+    assert all(math.isfinite(value) for value in result["y_range"])
+    json.dumps(plot_json(result), allow_nan=False)
+    for encoding in ("f32", "i16"):
+        assert pack_points(result["x"], result["y"], encoding, {}, result["y_range"])
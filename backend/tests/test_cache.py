@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.services import cache
+from app.services.cache import TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def _loader(values: list, calls: list, gate: asyncio.Event = None):
+    async def load():
+        calls.append(len(calls))
+        if gate is not None:
+            await gate.wait()
+        return values[len(calls) - 1]
+    return load
+
+
+def test_concurrent_misses_share_one_load(clock):
+    async def scenario():
+        ttl_cache, calls, gate = TTLCache("test", ttl=60), [], asyncio.Event()
+        waiting = [asyncio.ensure_future(ttl_cache.get_or_load("k", _loader(["v"], calls, gate))) for _ in range(5)]
+        await asyncio.sleep(0)
+        gate.set()
+        assert await asyncio.gather(*waiting) == ["v"] * 5
+        assert len(calls) == 1
+        assert (ttl_cache.misses, ttl_cache.coalesced) == (1, 4)
+
+    asyncio.run(scenario())
+
+
+def test_stale_value_is_served_while_it_refreshes(clock):
+    async def scenario():
+        ttl_cache, calls, gate = TTLCache("test", ttl=60, stale_ttl=30), [], asyncio.Event()
+        load = _loader(["old", "new"], calls, gate)
+        gate.set()
+        assert await ttl_cache.get_or_load("k", load) == "old"
+
+        gate.clear()
+        clock.now += 70
+        # Expired but within stale_ttl: answered at once, one refresh however many callers
+        assert await ttl_cache.get_or_load("k", load) == "old"
+        assert await ttl_cache.get_or_load("k", load) == "old"
+        await asyncio.sleep(0)
+        assert len(calls) == 2
+        gate.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert await ttl_cache.get_or_load("k", load) == "new"
+        assert ttl_cache.stale_hits == 2
+
+    asyncio.run(scenario())
+
+
+def test_entry_past_stale_window_is_loaded_again(clock):
+    async def scenario():
+        ttl_cache, calls = TTLCache("test", ttl=60, stale_ttl=30), []
+        load = _loader(["old", "new"], calls)
+        assert await ttl_cache.get_or_load("k", load) == "old"
+        clock.now += 100
+        assert await ttl_cache.get_or_load("k", load) == "new"
+        assert ttl_cache.misses == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_load_is_not_cached(clock):
+    async def scenario():
+        ttl_cache = TTLCache("test", ttl=60)
+
+        async def fail():
+            raise RuntimeError("upstream down")
+
+        with pytest.raises(RuntimeError):
+            await ttl_cache.get_or_load("k", fail)
+        assert len(ttl_cache) == 0
+        assert await ttl_cache.get_or_load("k", _loader(["v"], [])) == "v"
+
+    asyncio.run(scenario())
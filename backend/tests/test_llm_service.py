@@ -0,0 +1,181 @@
+import asyncio
+
+import groq
+import httpx
+import pytest
+
+from app.services import gemini, resilience
+from app.services.admission import AdmissionController
+from app.services.gemini import GenerationError, LLMService
+from app.services.resilience import CircuitBreaker
+
+
+class _Backend:
+    name = "fake"
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    controller = AdmissionController(max_concurrency=8, model_max_concurrency=1, max_queue=4, queue_timeout=0.2)
+    monkeypatch.setattr(gemini, "admission", controller)
+    return controller
+
+
+def _dropped() -> groq.APIConnectionError:
+    return groq.APIConnectionError(request=httpx.Request("POST", "https://upstream.test"))
+
+
+def _service(replies: dict) -> LLMService:
+    """Service over models "big" then "small"; replies maps a model to its chunks, or an exception to raise."""
+    service = LLMService(backend=_Backend())
+    service.models, service.model = ["big", "small"], "big"
+    service.breakers = {model: CircuitBreaker(model, failure_threshold=1, reset_timeout=30) for model in service.models}
+
+    async def stream(model, messages):
+        reply = replies[model]
+        if isinstance(reply, Exception):
+            raise reply
+        for chunk in reply:
+            yield chunk
+
+    service._stream = stream
+    return service
+
+
+async def _answer(service: LLMService) -> list:
+    ticket = await service.admit("system", "question")
+    return [chunk async for chunk in service.generate_content_stream("system", "question", ticket)]
+
+
+def test_open_breaker_counts_as_a_failure_fallback(admission):
+    async def scenario():
+        service = _service({"big": ["unused"], "small": ["ok"]})
+        service.breakers["big"].record_failure()
+        assert await _answer(service) == ["ok"]
+        assert service.failure_fallbacks == {"small": 1}
+        assert not service.saturation_fallbacks
+
+    asyncio.run(scenario())
+
+
+def test_busy_model_counts_as_a_saturation_fallback(admission):
+    async def scenario():
+        service = _service({"big": ["unused"], "small": ["ok"]})
+        held = await admission.admit("big", 1)
+        assert await _answer(service) == ["ok"]
+        held.release()
+        assert service.saturation_fallbacks == {"small": 1}
+        assert not service.failure_fallbacks
+
+    asyncio.run(scenario())
+
+
+def test_failure_fallback_is_admitted_for_its_own_model(admission):
+    async def scenario():
+        service = _service({"big": RuntimeError("down"), "small": ["ok"]})
+        ticket = await service.admit("system", "question")
+        chunks = []
+        async for chunk in service.generate_content_stream("system", "question", ticket):
+            # Streaming from the fallback holds its slot, not the failed model's
+            assert admission.model_limiters["small"].active == 1
+            assert admission.model_limiters["big"].active == 0
+            chunks.append(chunk)
+        assert chunks == ["ok"]
+        assert admission.global_limiter.active == 0
+        assert admission.model_limiters["small"].active == 0
+
+    asyncio.run(scenario())
+
+
+def test_failure_fallback_waits_in_its_models_queue(admission):
+    async def scenario():
+        service = _service({"big": RuntimeError("down"), "small": ["unused"]})
+        held = await admission.admit("small", 1)
+        chunks = await _answer(service)
+        held.release()
+        assert len(chunks) == 1 and isinstance(chunks[0], GenerationError)
+        assert "timed out" in chunks[0]
+        assert admission.global_limiter.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_breaker_opens_then_lets_one_trial_through(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("m", failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN and not breaker.allow()
+    assert breaker.retry_after() == 30
+
+    now[0] += 30
+    assert breaker.available
+    assert breaker.allow() and breaker.state == breaker.HALF_OPEN
+    # Only the one trial call while half-open
+    assert not breaker.allow() and not breaker.available
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN and breaker.times_opened == 2
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED and breaker.allow()
+
+
+def test_abandoned_trial_frees_the_half_open_breaker(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("m", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record_abandoned()
+    assert breaker.allow()
+
+
+def test_failure_before_the_first_token_is_retried(admission, monkeypatch):
+    monkeypatch.setattr(gemini, "backoff_delay", lambda attempt: 0)
+
+    async def scenario():
+        service = _service({"small": ["unused"]})
+        service.breakers["big"] = CircuitBreaker("big", failure_threshold=5)
+        calls = []
+
+        async def stream(model, messages):
+            calls.append(model)
+            if len(calls) == 1:
+                raise _dropped()
+            yield "ok"
+
+        service._stream = stream
+        assert await _answer(service) == ["ok"]
+        assert calls == ["big", "big"]
+        assert service.retries == {"big": 1}
+        assert service.breakers["big"].failures == 0
+
+    asyncio.run(scenario())
+
+
+def test_failure_after_the_first_token_is_not_retried(admission, monkeypatch):
+    monkeypatch.setattr(gemini, "backoff_delay", lambda attempt: 0)
+
+    async def scenario():
+        service = _service({"small": ["unused"]})
+        service.breakers["big"] = CircuitBreaker("big", failure_threshold=5)
+        calls = []
+
+        async def stream(model, messages):
+            calls.append(model)
+            yield "partial"
+            raise _dropped()
+
+        service._stream = stream
+        chunks = await _answer(service)
+        # Neither the same model nor the fallback may restart an answer already on screen
+        assert chunks[0] == "partial" and isinstance(chunks[1], GenerationError)
+        assert calls == ["big"]
+        assert not service.retries and not service.failure_fallbacks
+
+    asyncio.run(scenario())
@@ -0,0 +1,83 @@
+import sqlite3
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services.rate_limit import Budget, MemoryBuckets, RateLimiter, RateLimitMiddleware, SQLiteBuckets
+
+
+def _client(backend=None, **options) -> TestClient:
+    api = FastAPI()
+
+    @api.post("/api/solve")
+    async def solve():
+        return {"ok": True}
+
+    budgets = {name: Budget("5/60") for name in ("chat", "search", "analytics")}
+    limiter = RateLimiter(budgets=budgets, backend=backend if backend is not None else MemoryBuckets(), enabled=True, **options)
+    return TestClient(RateLimitMiddleware(api, limiter))
+
+
+def _statuses(client: TestClient, headers) -> list:
+    return [client.post("/api/solve", headers=headers()).status_code for _ in range(20)]
+
+
+def test_rotating_unknown_api_keys_are_limited():
+    client = _client(api_keys="good-key")
+    assert _statuses(client, lambda: {"X-API-Key": str(uuid.uuid4())}).count(429) == 15
+    assert _statuses(client, lambda: {"Authorization": f"Bearer {uuid.uuid4()}"}).count(429) == 20
+
+
+def test_configured_api_key_gets_its_own_bucket():
+    client = _client(api_keys="good-key, other-key")
+    assert _statuses(client, lambda: {}).count(429) == 15
+    assert _statuses(client, lambda: {"X-API-Key": "good-key"}).count(429) == 15
+
+
+def test_spoofed_forwarded_for_is_ignored():
+    client = _client(proxy_hops=1)
+    # The proxy appends the real address last; the client controls everything before it
+    statuses = _statuses(client, lambda: {"X-Forwarded-For": f"10.0.0.{uuid.uuid4().int % 250}, 203.0.113.7"})
+    assert statuses.count(429) == 15
+
+
+def test_forged_session_ids_fall_back_to_the_ip_bucket():
+    client = _client()
+    assert _statuses(client, lambda: {"X-Session-Id": uuid.uuid4().hex}).count(429) == 15
+
+
+def test_issued_session_id_raises_the_ip_budget():
+    client = _client(ip_multiplier=10)
+    response = client.post("/api/solve")
+    session = response.headers["x-session-id"]
+    # Five more for this session, the sixth is over its own budget
+    assert _statuses(client, lambda: {"X-Session-Id": session}).count(200) == 5
+    second = client.post("/api/solve").headers["x-session-id"]
+    assert client.post("/api/solve", headers={"X-Session-Id": second}).status_code == 200
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    return MemoryBuckets() if request.param == "memory" else SQLiteBuckets(str(tmp_path / "buckets.sqlite3"))
+
+
+def test_denied_session_leaves_the_shared_ip_bucket_alone(backend):
+    client = _client(backend, ip_multiplier=2)
+    first, second = (client.post("/api/solve").headers["x-session-id"] for _ in range(2))
+    # Ten for the address: five for the first session, fifteen refusals that cost it nothing
+    assert _statuses(client, lambda: {"X-Session-Id": first}).count(200) == 5
+    assert _statuses(client, lambda: {"X-Session-Id": second}).count(200) == 5
+
+
+def test_locked_sqlite_file_lets_requests_through(tmp_path):
+    backend = SQLiteBuckets(str(tmp_path / "buckets.sqlite3"))
+    client = _client(backend)
+    other = sqlite3.connect(str(tmp_path / "buckets.sqlite3"), isolation_level=None)
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        assert client.post("/api/solve").status_code == 200
+    finally:
+        other.execute("ROLLBACK")
+    assert client.app.limiter.errors == 1
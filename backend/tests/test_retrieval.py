@@ -0,0 +1,128 @@
+import json
+import os
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.services import retrieval
+from app.services.lexical import bm25, decode_varints, encode_varints, idf, terms
+from app.services.retrieval import Embedder, VectorIndex, write_segment
+
+CHUNKS = {
+    ("physics", "al"): [
+        ("doc-shm", "Simple harmonic motion: the acceleration is proportional to the displacement."),
+        ("doc-shm", "A pendulum oscillating with small amplitude performs simple harmonic motion."),
+        ("doc-paper", "GCE June 2019 Paper 2 Q3: a mass on a spring oscillates with period 2 s."),
+        ("doc-waves", "Waves transfer energy without transferring matter."),
+        ("doc-waves", "The speed of a wave equals frequency times wavelength."),
+    ],
+    ("chemistry", "al"): [
+        ("doc-acids", "Acids donate protons; bases accept protons."),
+        ("doc-acids", "A spring of fresh water has a pH close to seven."),
+    ],
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    embedder, segments = Embedder(64), []
+    for (subject, level), chunks in CHUNKS.items():
+        ids = sorted({doc for doc, _ in chunks})
+        texts = [text for _, text in chunks]
+        positions = Counter()
+        placed = []
+        for doc, _ in chunks:
+            placed.append((ids.index(doc), positions[doc]))
+            positions[doc] += 1
+        os.makedirs(tmp_path / subject / level)
+        write_segment(str(tmp_path / subject / level / "seg-000001"), embedder.embed_many(texts), texts, placed,
+                      [{"source": doc, "title": doc, "id": doc} for doc in ids])
+        segments.append(f"{subject}/{level}/seg-000001")
+    (tmp_path / retrieval.MANIFEST).write_text(json.dumps({"dim": 64, "segments": segments, "removed": []}))
+    return VectorIndex(str(tmp_path), reload_interval=0)
+
+
+def _publish_removed(index: VectorIndex, removed: list):
+    path = os.path.join(index.root, retrieval.MANIFEST)
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest["removed"] = removed
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+    index.refresh(force=True)
+
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 16383, 16384, 2 ** 28 - 1, 2 ** 28, 2 ** 32 - 1], dtype=np.uint64)
+    data = encode_varints(values)
+    assert len(data) == 1 + 1 + 1 + 2 + 2 + 2 + 3 + 4 + 5 + 5
+    assert decode_varints(data).tolist() == values.tolist()
+
+
+def test_idf_favours_rare_terms_and_stays_positive():
+    assert idf(1, 100) > idf(10, 100) > idf(100, 100) > 0
+
+
+def test_bm25_matches_the_textbook_formula():
+    k1, b, average, weight = 1.2, 0.75, 10.0, 2.0
+    frequencies, lengths = np.array([1.0, 3.0, 3.0]), np.array([10.0, 10.0, 30.0])
+    expected = [weight * f * (k1 + 1) / (f + k1 * (1 - b + b * n / average)) for f, n in zip(frequencies, lengths)]
+    assert np.allclose(bm25(frequencies, lengths, average, weight, k1, b), expected)
+
+
+def test_lexical_scores_match_brute_force_bm25(index):
+    query = list(terms("spring oscillates period"))
+    hits = index.lexical(query, "physics", "al", k=10)
+    texts = [text for _, text in CHUNKS[("physics", "al")]]
+    documents = [list(terms(text)) for text in texts]
+    average = sum(map(len, documents)) / len(documents)
+    expected = {}
+    for text, document in zip(texts, documents):
+        counts = Counter(document)
+        score = sum(
+            bm25(np.array([counts[term]], np.float32), np.array([len(document)], np.float32), average,
+                 idf(sum(term in other for other in documents), len(documents)))[0]
+            for term in set(query) if counts[term]
+        )
+        if score:
+            expected[text] = round(float(score), 4)
+    assert {hit["text"]: hit["score"] for hit in hits} == pytest.approx(expected, abs=1e-3)
+    # The pasted past-paper question comes first, having every query term
+    assert hits[0]["text"].startswith("GCE June 2019") and hits[0]["coverage"] == 1.0
+
+
+def test_stemmed_terms_match_other_word_forms(index):
+    hits = index.lexical(list(terms("oscillation")), "physics", "al")
+    assert len(hits) == 2 and all("oscillat" in hit["text"] for hit in hits)
+
+
+def test_searches_stay_inside_the_requested_partition(index):
+    question = "spring"
+    assert {hit["subject"] for hit in index.lexical(list(terms(question)), "chemistry", "al")} == {"chemistry"}
+    query = Embedder(64).embed(question)
+    assert {hit["subject"] for hit in index.hybrid(query, list(terms(question)), "physics", "al")} == {"physics"}
+
+
+def test_removed_documents_are_never_returned(index):
+    _publish_removed(index, ["doc-paper"])
+    question = "GCE June 2019 Paper 2 Q3 spring"
+    hits = index.hybrid(Embedder(64).embed(question), list(terms(question)), "physics", "al", k=10)
+    assert hits and all(hit["source"] != "doc-paper" for hit in hits)
+    assert all(hit["source"] != "doc-paper" for hit in index.lexical(list(terms(question)), k=10))
+
+
+def test_hybrid_score_is_reciprocal_rank_fusion(index):
+    question = "pendulum simple harmonic motion period"
+    query, query_terms, depth = Embedder(64).embed(question), list(terms(question)), 50
+    vector_ranks = {hit["text"]: rank for rank, hit in enumerate(index.search(query, "physics", "al", k=depth))}
+    lexical_ranks = {hit["text"]: rank for rank, hit in enumerate(index.lexical(query_terms, "physics", "al", k=depth))}
+
+    hits = index.hybrid(query, query_terms, "physics", "al", k=10, depth=depth)
+    assert len(hits) == len(CHUNKS[("physics", "al")])
+    for hit in hits:
+        expected = sum(1.0 / (retrieval.RAG_FUSION_K + ranks[hit["text"]] + 1)
+                       for ranks in (vector_ranks, lexical_ranks) if hit["text"] in ranks)
+        assert hit["score"] == pytest.approx(expected, abs=1e-5)
+        assert (hit["bm25"] is None) == (hit["text"] not in lexical_ranks)
+    assert [hit["score"] for hit in hits] == sorted((hit["score"] for hit in hits), reverse=True)
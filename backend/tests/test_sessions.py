@@ -0,0 +1,78 @@
+from app.services import sessions
+from app.services.admission import estimate_tokens
+from app.services.sessions import SessionStore
+
+KEY = ("session", "physics", "tutor")
+
+
+def _tokens(messages: list) -> int:
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+
+def test_history_is_the_recent_turns_in_order():
+    store = SessionStore(max_turns=4, context_tokens=1000)
+    assert store.history(KEY) == []
+    store.record(KEY, "What is work?", "Force times distance.")
+    store.record(KEY, "And power?", "Work per unit time.")
+    assert store.history(KEY) == [
+        {"role": "user", "content": "What is work?"},
+        {"role": "assistant", "content": "Force times distance."},
+        {"role": "user", "content": "And power?"},
+        {"role": "assistant", "content": "Work per unit time."},
+    ]
+
+
+def test_history_stays_within_the_token_budget():
+    store = SessionStore(max_turns=8, context_tokens=200)
+    for turn in range(8):
+        store.record(KEY, f"Question {turn}?", f"Answer {turn}. " + "x" * 300)
+    history = store.history(KEY)
+    assert _tokens(history) <= 200
+    # Newest turns survive the trim, oldest are dropped
+    assert history[-2]["content"] == "Question 7?"
+    assert all(message["content"] != "Question 0?" for message in history)
+
+
+def test_overlong_latest_answer_is_clipped_not_dropped():
+    store = SessionStore(max_turns=4, context_tokens=100)
+    store.record(KEY, "Explain entropy.", "Entropy measures disorder. " + "y" * 2000)
+    history = store.history(KEY)
+    assert [message["role"] for message in history] == ["user", "assistant"]
+    assert history[1]["content"].startswith("Entropy measures disorder.")
+    assert history[1]["content"].endswith("...")
+    assert _tokens(history) <= 101
+
+
+def test_turns_rolled_out_of_the_ring_are_summarised():
+    store = SessionStore(max_turns=2, context_tokens=1000, summary_tokens=1000)
+    store.record(KEY, "What is a vector? It has parts.", "A quantity with direction. More detail follows.")
+    store.record(KEY, "Second?", "Two.")
+    store.record(KEY, "Third?", "Three.")
+    history = store.history(KEY)
+    assert history[0]["role"] == "system"
+    assert "Student asked: What is a vector? Tutor: A quantity with direction." in history[0]["content"]
+    assert "More detail" not in history[0]["content"]
+    assert [message["content"] for message in history[1:] if message["role"] == "user"] == ["Second?", "Third?"]
+
+
+def test_summary_keeps_its_own_budget():
+    store = SessionStore(max_turns=1, context_tokens=1000, summary_tokens=30)
+    for turn in range(10):
+        store.record(KEY, f"Question number {turn}?", f"Answer number {turn}.")
+    summary = store.history(KEY)[0]["content"]
+    assert "Question number 8?" in summary
+    assert "Question number 0?" not in summary
+    assert estimate_tokens(summary.split("\n", 1)[1]) <= 30
+
+
+def test_idle_and_excess_sessions_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sessions.time, "monotonic", lambda: now[0])
+    store = SessionStore(ttl=60, max_sessions=2)
+    for name in "abc":
+        store.record((name, "physics", "tutor"), "q", "a")
+    assert ("a", "physics", "tutor") not in store and store.evicted == 1
+
+    now[0] += 61
+    assert store.history(("b", "physics", "tutor")) == []
+    assert len(store) == 0 and store.expired == 2
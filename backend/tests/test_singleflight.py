@@ -0,0 +1,99 @@
+import asyncio
+
+from app.services.singleflight import Flight, SingleFlight
+
+
+class _Source:
+    """Upstream generation that yields a chunk each time step() is called."""
+
+    def __init__(self, chunks: list):
+        self.chunks = chunks
+        self.started = 0
+        self.closed = False
+        self._step = asyncio.Event()
+
+    def step(self):
+        self._step.set()
+
+    async def stream(self):
+        self.started += 1
+        try:
+            for chunk in self.chunks:
+                await self._step.wait()
+                self._step.clear()
+                yield chunk
+        finally:
+            self.closed = True
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _collect(chunks) -> list:
+    return [chunk async for chunk in chunks]
+
+
+def test_late_subscriber_gets_the_prefix_then_follows_live():
+    async def scenario():
+        flights, source, completed = SingleFlight(), _Source(["a", "b", "c"]), []
+        first = flights.subscribe("k", source.stream, on_complete=completed.append)
+        first_chunks = asyncio.ensure_future(_collect(first))
+        source.step()
+        await _settle()
+        source.step()
+        await _settle()
+
+        second = flights.subscribe("k", source.stream)
+        assert [await second.__anext__(), await second.__anext__()] == ["a", "b"]
+        source.step()
+        assert await second.__anext__() == "c"
+        assert await first_chunks == ["a", "b", "c"]
+        assert source.started == 1
+        assert (flights.started, flights.joined) == (1, 1)
+        await _settle()
+        assert completed == ["abc"]
+        assert "k" not in flights
+
+    asyncio.run(scenario())
+
+
+def test_generation_stops_when_every_subscriber_leaves():
+    async def scenario():
+        flights, source = SingleFlight(), _Source(["a", "b", "c"])
+        readers = [flights.subscribe("k", source.stream) for _ in range(2)]
+        source.step()
+        for reader in readers:
+            assert await reader.__anext__() == "a"
+        await readers[0].aclose()
+        await _settle()
+        assert not source.closed
+        await readers[1].aclose()
+        await _settle()
+        assert source.closed
+        # The next identical question starts over instead of joining a dead generation
+        assert "k" not in flights
+        restarted = _Source(["x"])
+        reader = flights.subscribe("k", restarted.stream)
+        restarted.step()
+        assert await reader.__anext__() == "x"
+
+    asyncio.run(scenario())
+
+
+def test_lingering_flight_can_be_picked_up_again():
+    async def scenario():
+        source = _Source(["a", "b"])
+        flight = Flight(source.stream(), linger=0.05)
+        reader = flight.subscribe()
+        source.step()
+        assert await reader.__anext__() == "a"
+        await reader.aclose()
+        source.step()
+        await _settle()
+        # Back within the linger window: the whole answer, nothing regenerated
+        assert [chunk async for chunk in flight.subscribe()] == ["a", "b"]
+        assert not flight.abandoned and not flight.failed
+
+    asyncio.run(scenario())
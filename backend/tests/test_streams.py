@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.admission import AdmissionRejected
+from app.services.streams import StreamRegistry
+
+
+async def _source(chunks: list, gate: asyncio.Event = None):
+    for chunk in chunks:
+        if gate is not None:
+            await gate.wait()
+        yield chunk
+
+
+async def _events(registry: StreamRegistry, stream, offset: int = 0) -> list:
+    """(event id, event name, data) for every SSE event, skipping the retry hint."""
+    parsed = []
+    async for text in registry.events(stream, offset):
+        fields = dict(line.split(": ", 1) for line in text.split("\n") if line and not line.startswith("retry"))
+        parsed.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return parsed
+
+
+def test_resume_continues_from_the_offset():
+    async def scenario():
+        registry = StreamRegistry()
+        stream = registry.start(_source(["a", "b", "c"]), usage={"prompt_tokens": 7})
+        events = await _events(registry, stream, offset=2)
+        assert events[0] == (None, "start", {"stream_id": stream.id, "offset": 2})
+        assert events[1] == ("2", "token", {"text": "c"})
+        assert [name for _, name, _ in events[2:]] == ["usage", "done"]
+        assert events[2][2]["prompt_tokens"] == 7
+        assert events[-1][2] == {"offset": 3, "chars": 3}
+        assert registry.resumed == 1
+
+    asyncio.run(scenario())
+
+
+def test_generation_outlives_a_dropped_connection():
+    async def scenario():
+        registry, gate = StreamRegistry(resume_window=5), asyncio.Event()
+        stream = registry.start(_source(["a", "b", "c"], gate))
+        reader = registry.events(stream)
+        await reader.__anext__()
+        gate.set()
+        assert '"text":"a"' in await reader.__anext__()
+        await reader.aclose()
+        # Nobody is reading, yet the answer is completed for the reconnect
+        await stream.flight.task
+        tokens = [data["text"] for _, name, data in await _events(registry, registry.get(stream.id), 1) if name == "token"]
+        assert tokens == ["b", "c"]
+
+    asyncio.run(scenario())
+
+
+def test_live_streams_are_never_evicted():
+    async def scenario():
+        registry, gates = StreamRegistry(max_streams=2), [asyncio.Event(), asyncio.Event()]
+        live = [registry.start(_source(["a"], gate)) for gate in gates]
+        with pytest.raises(AdmissionRejected) as rejected:
+            registry.start(_source(["b"]))
+        assert rejected.value.retry_after > 0 and registry.rejected == 1
+
+        gates[0].set()
+        await live[0].flight.task
+        # The finished buffer makes room; the one still generating stays
+        registry.start(_source(["c"]))
+        assert registry.get(live[0].id) is None and registry.get(live[1].id) is live[1]
+        assert registry.expired == 1
+        gates[1].set()
+
+    asyncio.run(scenario())
+
+
+def test_reserved_slot_survives_a_slow_answer():
+    async def scenario():
+        registry = StreamRegistry(max_streams=1)
+        with registry.reservation():
+            # Another request arriving while this answer is prepared is turned away, not this one
+            with pytest.raises(AdmissionRejected):
+                registry.start(_source(["a"]))
+            stream = registry.start(_source(["b"]), reserved=True)
+        await stream.flight.task
+        assert len(registry) == 1
+        assert registry.stats()["reserved"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_failed_preparation_frees_its_reservation():
+    async def scenario():
+        registry = StreamRegistry(max_streams=1)
+        with pytest.raises(RuntimeError):
+            with registry.reservation():
+                raise RuntimeError("admission failed")
+        stream = registry.start(_source(["a"]))
+        await stream.flight.task
+
+    asyncio.run(scenario())
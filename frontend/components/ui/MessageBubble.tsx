@@ -21,12 +21,33 @@ export const MessageBubble: React.FC<MessageBubbleProps> = ({ message, currentCo
       color: message.type === 'user' ? '#ffffff' : currentColors.text,
       boxShadow: `0 2px 8px ${currentColors.shadow}`,
     },
+    citations: {
+      marginTop: '12px',
+      paddingTop: '8px',
+      borderTop: `1px solid ${currentColors.shadow}`,
+      fontSize: '0.85em',
+    },
   };
 
   return (
     <div style={styles.message}>
       <div style={styles.messageBubble}>
         {message.content}
+        {message.citations && message.citations.length > 0 && (
+          <div style={styles.citations}>
+            {message.citations.map(citation => (
+              <div key={citation.n}>
+                [{citation.n}]{' '}
+                {citation.link ? (
+                  <a href={citation.link} target="_blank" rel="noopener noreferrer" style={{ color: 'inherit' }}>
+                    {citation.title || citation.link}
+                  </a>
+                ) : citation.title}
+                {citation.date ? ` (${citation.date})` : ''}
+              </div>
+            ))}
+          </div>
+        )}
       </div>
     </div>
   );
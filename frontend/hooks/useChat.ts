@@ -1,7 +1,31 @@
 'use client'
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import { Message, Subject, Mode } from '../types/index';
 
+const API_URL = 'http://127.0.0.1:8000';
+const RESUME_ATTEMPTS = 3;
+const RESUME_DELAY_MS = 1000;
+
+interface StreamEvent {
+  id: number | null;
+  name: string;
+  data: any;
+}
+
+// One Server-Sent Event block ("id: ...\nevent: ...\ndata: ...") from the backend
+const parseEvent = (block: string): StreamEvent | null => {
+  let id: number | null = null;
+  let name = 'message';
+  let data = '';
+  for (const line of block.split('\n')) {
+    if (line.startsWith('id: ')) id = Number(line.slice(4));
+    else if (line.startsWith('event: ')) name = line.slice(7);
+    else if (line.startsWith('data: ')) data += line.slice(6);
+  }
+  if (!data) return null;
+  return { id, name, data: JSON.parse(data) };
+};
+
 export const useChat = () => {
   const [selectedSubject, setSelectedSubject] = useState<Subject | null>(null);
   const [selectedMode, setSelectedMode] = useState<Mode>(null);
@@ -10,6 +34,8 @@ export const useChat = () => {
 
   const [isLoading, setIsLoading] = useState(false);
   const [activeTool, setActiveTool] = useState<string | null>(null);
+  // Issued by the backend on the first answer; identifies this tab to its per-student rate limits
+  const sessionId = useRef<string | null>(null);
 
   const handleSubjectSelect = (subject: Subject) => {
     setSelectedSubject(subject);
@@ -48,56 +74,37 @@ export const useChat = () => {
     setIsLoading(true);
 
     try {
-      let finalQuestion = content;
-
-      // Handle Researcher Tool
-      if (activeTool === 'researcher') {
-        const searchResponse = await fetch('http://127.0.0.1:8000/api/research', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ query: content, num_results: 3 }),
-        });
+      // One request: the backend runs the tool searches, builds the context and streams the answer
+      const response = await fetch(`${API_URL}/api/chat`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          ...(sessionId.current ? { 'X-Session-Id': sessionId.current } : {}),
+        },
+        body: JSON.stringify({
+          subject: selectedSubject.id,
+          mode: selectedMode,
+          question: content,
+          tools: activeTool === 'researcher' || activeTool === 'messenger' ? [activeTool] : [],
+        }),
+      });
 
-        if (searchResponse.ok) {
-          const searchData = await searchResponse.json();
-          const snippets = searchData.results.map((r: any) => `- ${r.title}: ${r.snippet}`).join('\n');
-          finalQuestion = `[CONTEXT FROM WEB SEARCH]:\n${snippets}\n\n[USER QUESTION]:\n${content}\n\nPlease use the above context to answer the user's question.`;
-        } else {
-          console.error("Research tool failed, proceeding without search results.");
-        }
-      }
+      sessionId.current = response.headers.get('X-Session-Id') ?? sessionId.current;
 
-      // Handle Messenger Tool (GCE Announcements)
-      else if (activeTool === 'messenger') {
-        const messengerResponse = await fetch('http://127.0.0.1:8000/api/messenger', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ query: content, num_results: 3 }),
-        });
-
-        if (messengerResponse.ok) {
-          const messengerData = await messengerResponse.json();
-          const snippets = messengerData.results.map((r: any) => `- [${r.date}] ${r.title}: ${r.snippet}`).join('\n');
-          finalQuestion = `[CONTEXT FROM GCE ANNOUNCEMENTS]:\n${snippets}\n\n[USER QUESTION]:\n${content}\n\nPlease use the above announcements to answer the user's question about the GCE Board.`;
-        } else {
-          console.error("Messenger tool failed, proceeding without announcements.");
-        }
+      if (response.status === 429) {
+        const retryAfter = response.headers.get('Retry-After') ?? 'a few';
+        setMessages(prev => [...prev, {
+          type: 'bot',
+          content: `You're asking questions faster than I can answer them. Please try again in ${retryAfter} seconds.`,
+          timestamp: new Date(),
+        }]);
+        return;
       }
 
-      // Call the subject endpoint
-      const response = await fetch(`http://127.0.0.1:8000/api/${selectedSubject.id}`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ question: finalQuestion, mode: selectedMode }),
-      });
-
       if (!response.ok || !response.body) {
         throw new Error(`API Request failed with status ${response.status}`);
       }
 
-      const reader = response.body.getReader();
-      const decoder = new TextDecoder();
-
       // Initialize empty bot message
       setMessages(prev => [...prev, {
         type: 'bot',
@@ -105,24 +112,76 @@ export const useChat = () => {
         timestamp: new Date(),
       }]);
 
-      let botResponse = '';
-
-      while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-
-        const chunk = decoder.decode(value);
-        botResponse += chunk;
-
-        // Update the last message (bot's message) with new content
+      const updateBotMessage = (update: Partial<Message>) => {
         setMessages(prev => {
           const newMessages = [...prev];
           const lastMessage = newMessages[newMessages.length - 1];
           if (lastMessage.type === 'bot') {
-            lastMessage.content = botResponse;
+            newMessages[newMessages.length - 1] = { ...lastMessage, ...update };
           }
           return newMessages;
         });
+      };
+
+      const streamId = response.headers.get('X-Stream-Id');
+      let botResponse = '';
+      let received = 0;  // events with an id, the resume offset
+      let finished = false;
+
+      const readEvents = async (body: ReadableStream<Uint8Array>) => {
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+
+          buffer += decoder.decode(value, { stream: true });
+          const blocks = buffer.split('\n\n');
+          buffer = blocks.pop() ?? '';
+
+          for (const block of blocks) {
+            const event = parseEvent(block);
+            if (!event) continue;
+            if (event.id !== null) received = event.id + 1;
+
+            if (event.name === 'token') {
+              botResponse += event.data.text;
+              updateBotMessage({ content: botResponse });
+            } else if (event.name === 'citations') {
+              updateBotMessage({ citations: event.data.citations });
+            } else if (event.name === 'error') {
+              botResponse += botResponse ? `\n\n${event.data.message}` : event.data.message;
+              updateBotMessage({ content: botResponse });
+              finished = true;
+            } else if (event.name === 'done') {
+              finished = true;
+            }
+          }
+        }
+      };
+
+      try {
+        await readEvents(response.body);
+      } catch (error) {
+        console.error('Stream interrupted:', error);
+      }
+
+      // A dropped connection doesn't stop the answer: pick it up from the server-side buffer
+      for (let attempt = 0; !finished && streamId && attempt < RESUME_ATTEMPTS; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, RESUME_DELAY_MS * (attempt + 1)));
+        try {
+          const resumed = await fetch(`${API_URL}/api/streams/${streamId}?offset=${received}`);
+          if (resumed.status === 404) break;
+          if (resumed.ok && resumed.body) await readEvents(resumed.body);
+        } catch (error) {
+          console.error('Resume failed:', error);
+        }
+      }
+
+      if (!finished) {
+        throw new Error('The answer stream ended early');
       }
 
     } catch (error) {
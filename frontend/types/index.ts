@@ -5,10 +5,19 @@ export interface Subject {
   color: string;
 }
 
+export interface Citation {
+  n: number;
+  tool: 'researcher' | 'messenger';
+  title: string | null;
+  link: string | null;
+  date?: string;
+}
+
 export interface Message {
   type: 'user' | 'bot';
   content: string;
   timestamp: Date;
+  citations?: Citation[];
 }
 
 export interface Tool {